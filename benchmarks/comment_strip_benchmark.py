@@ -0,0 +1,151 @@
+"""Comment stripping benchmark: the regex scanner against the previous character loop.
+
+The corpus is the Python standard library (or --corpus DIR). Both implementations strip the
+comments of every file in memory, and the speedup is the ratio of their total times. With
+--end-to-end the corpus is also copied to a temporary directory and rewritten in place with
+remove_python_comments, which uses the process pool.
+
+Usage:
+    python benchmarks/comment_strip_benchmark.py
+    python benchmarks/comment_strip_benchmark.py --corpus path/to/project --end-to-end
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import sysconfig
+import tempfile
+import time
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from agent.tools.comment_stripper import strip_python_comments  # noqa: E402
+from agent.tools.file_utils import remove_python_comments  # noqa: E402
+
+
+# The character loop remove_comments_from_python_code used before, kept here for comparison.
+def legacy_remove_comments(code: str) -> str:
+    """
+    Removes comments from Python code while preserving docstrings.
+
+    Args:
+        code (str): The Python code to process
+
+    Returns:
+        str: The code with comments removed
+    """
+    # State tracking
+    in_string = False
+    string_char = None
+    triple_quotes = False
+    i = 0
+    result = []
+
+    while i < len(code):
+        # Check for string start/end
+        if not in_string and (code[i] == "'" or code[i] == '"'):
+            in_string = True
+            string_char = code[i]
+
+            # Check for triple quotes
+            if i + 2 < len(code) and code[i:i+3] == string_char * 3:
+                triple_quotes = True
+                result.append(code[i:i+3])
+                i += 3
+                continue
+            else:
+                triple_quotes = False
+                result.append(code[i])
+                i += 1
+                continue
+
+        # Check for string end
+        elif in_string and code[i] == string_char:
+            if triple_quotes and i + 2 < len(code) and code[i:i+3] == string_char * 3:
+                result.append(code[i:i+3])
+                in_string = False
+                triple_quotes = False
+                i += 3
+                continue
+            elif not triple_quotes:
+                result.append(code[i])
+                in_string = False
+                i += 1
+                continue
+            else:
+                result.append(code[i])
+                i += 1
+                continue
+
+        # Handle comments - only if not in a string
+        elif not in_string and code[i] == '#':
+            # Skip until end of line
+            while i < len(code) and code[i] != '\n':
+                i += 1
+            continue
+
+        # Add character to result
+        result.append(code[i])
+        i += 1
+
+    return ''.join(result)
+
+
+def load_corpus(corpus: str) -> List[str]:
+    sources = []
+    for root, dir_names, file_names in os.walk(corpus):
+        dir_names[:] = [d for d in dir_names if d not in ("__pycache__", "site-packages")]
+        for name in file_names:
+            if name.endswith(".py"):
+                try:
+                    with open(os.path.join(root, name), "r", encoding="utf-8") as f:
+                        sources.append(f.read())
+                except (OSError, UnicodeDecodeError):
+                    continue
+    return sources
+
+
+def time_all(func, sources: List[str]) -> float:
+    start = time.perf_counter()
+    for source in sources:
+        func(source)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=sysconfig.get_paths()["stdlib"], help="directory of Python files")
+    parser.add_argument("--end-to-end", action="store_true", help="also rewrite a copy of the corpus on disk")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size for --end-to-end")
+    args = parser.parse_args()
+
+    sources = load_corpus(args.corpus)
+    megabytes = sum(len(source) for source in sources) / 1e6
+    print(f"{len(sources)} files, {megabytes:.1f} MB from {args.corpus}")
+
+    legacy = time_all(legacy_remove_comments, sources)
+    scanner = time_all(strip_python_comments, sources)
+    print(f"  {'legacy':<10} {legacy * 1000:10.1f} ms {megabytes / legacy:8.1f} MB/s")
+    print(f"  {'regex':<10} {scanner * 1000:10.1f} ms {megabytes / scanner:8.1f} MB/s")
+    print(f"  speedup {legacy / scanner:.1f}x")
+
+    if args.end_to_end:
+        with tempfile.TemporaryDirectory() as temporary_dir:
+            copy = os.path.join(temporary_dir, "corpus")
+            shutil.copytree(args.corpus, copy, ignore=shutil.ignore_patterns("__pycache__", "site-packages"))
+            devnull = open(os.devnull, "w")
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                start = time.perf_counter()
+                processed, errors = remove_python_comments(copy, max_workers=args.workers)
+                elapsed = time.perf_counter() - start
+            finally:
+                sys.stdout = stdout
+                devnull.close()
+            print(f"  end-to-end {elapsed * 1000:10.1f} ms for {processed} files ({errors} errors)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""Diff benchmark: generate_diff (Myers and patience) against difflib and the previous greedy matcher.
+
+Synthetic source files of 10k-100k lines get about 1% of their lines edited (replaced,
+inserted, deleted) plus one moved block. Each implementation is timed on the same pair, and
+the size of its output (number of +/- lines) shows how tight the hunks are.
+
+Usage:
+    python benchmarks/diff_benchmark.py
+    python benchmarks/diff_benchmark.py --sizes 10000 100000 --skip-legacy
+"""
+
+import argparse
+import difflib
+import os
+import random
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from agent.tools.diff_utils import generate_diff  # noqa: E402
+
+
+# The greedy matcher generate_diff used before the Myers engine, kept here for comparison.
+def legacy_generate_diff(original_lines: List[str], modified_lines: List[str], 
+                 original_file: str = "a", modified_file: str = "b") -> str:
+    """
+    Generates a unified diff between two sets of lines.
+
+    Args:
+        original_lines (List[str]): Original file content as a list of lines.
+        modified_lines (List[str]): Modified file content as a list of lines.
+        original_file (str): Name of the original file for the diff header.
+        modified_file (str): Name of the modified file for the diff header.
+
+    Returns:
+        str: Unified diff notation content.
+    """
+    # Simple diff header
+    diff_header = f"--- {original_file}\n+++ {modified_file}\n"
+
+    # Find the differences and generate chunks
+    chunks = []
+    i = 0
+    j = 0
+
+    # Ensure lines end with newline
+    original_lines = [line if line.endswith('\n') else line + '\n' for line in original_lines]
+    modified_lines = [line if line.endswith('\n') else line + '\n' for line in modified_lines]
+
+    while i < len(original_lines) or j < len(modified_lines):
+        # Find a difference
+        if (i >= len(original_lines) or j >= len(modified_lines) or 
+            original_lines[i] != modified_lines[j]):
+
+            # Start a new chunk
+            original_start = i + 1  # 1-based indexing for diff
+            modified_start = j + 1
+
+            # Collect the changes
+            chunk_lines = []
+
+            # Add context lines before (if available)
+            context_before = 3
+            for k in range(max(0, i - context_before), i):
+                if k < len(original_lines) and k < len(modified_lines):
+                    chunk_lines.append(" " + original_lines[k].rstrip('\n'))
+
+            # Track original and modified positions
+            orig_i = i
+            mod_j = j
+
+            # Process differences
+            while (orig_i < len(original_lines) or mod_j < len(modified_lines)):
+                if (orig_i >= len(original_lines) or mod_j >= len(modified_lines) or 
+                    original_lines[orig_i] != modified_lines[mod_j]):
+
+                    # Add deletions from original
+                    while orig_i < len(original_lines) and (mod_j >= len(modified_lines) or 
+                                                          original_lines[orig_i] != modified_lines[mod_j]):
+                        chunk_lines.append("-" + original_lines[orig_i].rstrip('\n'))
+                        orig_i += 1
+
+                    # Add additions from modified
+                    while mod_j < len(modified_lines) and (orig_i >= len(original_lines) or 
+                                                         original_lines[orig_i] != modified_lines[mod_j]):
+                        chunk_lines.append("+" + modified_lines[mod_j].rstrip('\n'))
+                        mod_j += 1
+                else:
+                    # Found matching lines, add context and break
+                    break
+
+            # Add context lines after (if available)
+            context_after = 3
+            context_count = 0
+            while (orig_i < len(original_lines) and mod_j < len(modified_lines) and 
+                   original_lines[orig_i] == modified_lines[mod_j] and 
+                   context_count < context_after):
+                chunk_lines.append(" " + original_lines[orig_i].rstrip('\n'))
+                orig_i += 1
+                mod_j += 1
+                context_count += 1
+
+            # Update positions for next iteration
+            i = orig_i
+            j = mod_j
+
+            # Create the chunk header
+            original_count = orig_i - original_start + 1
+            modified_count = mod_j - modified_start + 1
+            chunk_header = f"@@ -{original_start},{original_count} +{modified_start},{modified_count} @@\n"
+
+            # Add the chunk
+            if chunk_lines:
+                chunks.append(chunk_header + "\n".join(chunk_lines) + "\n")
+        else:
+            # Lines match, move to next line
+            i += 1
+            j += 1
+
+    # Combine all chunks
+    return diff_header + "".join(chunks)
+
+
+def make_files(line_count: int, seed: int = 0):
+    """Returns (original, modified) lines that look like source code, with ~1% edits and a moved block."""
+    rng = random.Random(seed)
+    original = [f"    value_{i} = compute({rng.randrange(1000)}, {i % 7})\n" if i % 10 else "\n"
+                for i in range(line_count)]
+    modified = list(original)
+
+    for _ in range(line_count // 100):
+        position = rng.randrange(len(modified))
+        edit = rng.random()
+        if edit < 0.4:
+            modified[position] = f"    changed_{position} = {rng.random():.6f}\n"
+        elif edit < 0.7:
+            modified.insert(position, f"    inserted_{position} = True\n")
+        else:
+            del modified[position]
+
+    # Move a 50-line block from the first quarter to the last quarter.
+    start = line_count // 8
+    block = modified[start:start + 50]
+    del modified[start:start + 50]
+    modified[3 * line_count // 4:3 * line_count // 4] = block
+    return original, modified
+
+
+def changed_lines(diff_text: str) -> int:
+    return sum(1 for line in diff_text.splitlines()
+               if line[:1] in "+-" and not line.startswith(("+++", "---")))
+
+
+def run(name: str, func, original: List[str], modified: List[str]) -> None:
+    start = time.perf_counter()
+    diff_text = func(original, modified)
+    elapsed = time.perf_counter() - start
+    print(f"  {name:<10} {elapsed * 1000:10.1f} ms {changed_lines(diff_text):10d} changed lines")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 30_000, 100_000])
+    parser.add_argument("--skip-legacy", action="store_true", help="do not run the previous greedy matcher")
+    args = parser.parse_args()
+
+    implementations = [
+        ("myers", lambda a, b: generate_diff(a, b, algorithm="myers")),
+        ("patience", lambda a, b: generate_diff(a, b, algorithm="patience")),
+        ("difflib", lambda a, b: "".join(difflib.unified_diff(a, b, "a", "b"))),
+    ]
+    if not args.skip_legacy:
+        implementations.append(("legacy", legacy_generate_diff))
+
+    for size in args.sizes:
+        original, modified = make_files(size)
+        print(f"{size} lines:")
+        for name, func in implementations:
+            run(name, func, original, modified)
+
+
+if __name__ == "__main__":
+    main()
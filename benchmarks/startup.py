@@ -0,0 +1,93 @@
+"""Startup benchmark: how long a fresh process takes to import the agent.
+
+Each statement is timed in a new interpreter so nothing is cached between runs.
+Pass --baseline <git-ref> to time the same statements on another revision (checked
+out in a temporary git worktree) and print the improvement.
+
+Usage:
+    python benchmarks/startup.py
+    python benchmarks/startup.py --baseline HEAD~1 --runs 7
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STATEMENTS = {
+    "import agent": "import agent",
+    "import configs": "from agent.core import configs",
+    "configs.graph": "from agent.core.configs import graph",
+}
+
+# Provider clients validate that a key is set; the benchmark never calls them.
+DUMMY_KEYS = ["GROQ_API_KEY", "TOGETHER_API_KEY", "GOOGLE_API_KEY", "OPENAI_API_KEY", "OPENROUTER_API_KEY"]
+
+TIMER = (
+    "import time, sys, io\n"
+    "start = time.perf_counter()\n"
+    "stdout, sys.stdout = sys.stdout, io.StringIO()\n"
+    "{statement}\n"
+    "sys.stdout = stdout\n"
+    "print(time.perf_counter() - start)\n"
+)
+
+
+def time_statement(repo_root: str, statement: str, runs: int) -> float:
+    """Returns the median wall time, in seconds, of running `statement` in a fresh interpreter."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([os.path.join(repo_root, "src"), repo_root])
+    env["PYTHONDONTWRITEBYTECODE"] = "0"
+    for key in DUMMY_KEYS:
+        env.setdefault(key, "benchmark")
+
+    timings = []
+    # One warm-up run so both revisions start with compiled bytecode on disk.
+    for run in range(runs + 1):
+        output = subprocess.run(
+            [sys.executable, "-c", TIMER.format(statement=statement)],
+            cwd=repo_root, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        if run > 0:
+            timings.append(float(output.strip().splitlines()[-1]))
+    return statistics.median(timings)
+
+
+def measure(repo_root: str, runs: int) -> dict:
+    return {name: time_statement(repo_root, statement, runs) for name, statement in STATEMENTS.items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="timed runs per statement (median is reported)")
+    parser.add_argument("--baseline", help="git revision to compare against, e.g. HEAD~1")
+    args = parser.parse_args()
+
+    current = measure(REPO_ROOT, args.runs)
+
+    if not args.baseline:
+        for name, seconds in current.items():
+            print(f"{name:<16} {seconds * 1000:8.1f} ms")
+        return
+
+    with tempfile.TemporaryDirectory() as worktree_parent:
+        worktree = os.path.join(worktree_parent, "baseline")
+        subprocess.run(["git", "worktree", "add", "--detach", worktree, args.baseline],
+                       cwd=REPO_ROOT, check=True, capture_output=True)
+        try:
+            baseline = measure(worktree, args.runs)
+        finally:
+            subprocess.run(["git", "worktree", "remove", "--force", worktree], cwd=REPO_ROOT, capture_output=True)
+
+    print(f"{'statement':<16} {args.baseline:>12} {'current':>12} {'speedup':>8}")
+    for name in STATEMENTS:
+        print(f"{name:<16} {baseline[name] * 1000:9.1f} ms {current[name] * 1000:9.1f} ms "
+              f"{baseline[name] / current[name]:7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Walk benchmark: walk_project against the os.walk loops the file tools used before.
+
+Builds a synthetic JavaScript-heavy project (a small source tree next to a large
+node_modules and .git) and times three ways of finding its files:
+
+- "unpruned": plain os.walk, as concat_agent_metadata did.
+- "basename": os.walk with exact-basename filtering, as the other walkers did.
+- "walk_project": the shared scandir walker with default ignores and .gitignore.
+
+It then times concat_agent_metadata on its first call, on repeated calls (directory
+mtimes are revalidated) and with the index marked as watched (nothing is revalidated).
+
+Usage:
+    python benchmarks/walk_benchmark.py
+    python benchmarks/walk_benchmark.py --packages 5000 --keep /tmp/walk-project
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from agent.tools.file_utils import DEFAULT_IGNORE_PATTERNS, concat_agent_metadata  # noqa: E402
+from agent.tools.ignore_walker import walk_project  # noqa: E402
+from agent.tools.metadata_index import get_metadata_index  # noqa: E402
+
+
+def make_project(root: str, packages: int) -> None:
+    for index in range(200):
+        directory = os.path.join(root, "src", f"module_{index % 20}")
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+            with open(os.path.join(directory, "agent_metadata.md"), "w") as f:
+                f.write(f"module {index % 20}\n")
+        with open(os.path.join(directory, f"file_{index}.ts"), "w") as f:
+            f.write("export {};\n")
+    for index in range(packages):
+        directory = os.path.join(root, "node_modules", f"package_{index}", "lib")
+        os.makedirs(directory)
+        for name in ("index.js", "util.js", "package.json", "README.md"):
+            open(os.path.join(directory, name), "w").close()
+    for index in range(packages // 2):
+        directory = os.path.join(root, ".git", "objects", f"{index % 256:02x}")
+        os.makedirs(directory, exist_ok=True)
+        open(os.path.join(directory, f"{index:038x}"), "w").close()
+    with open(os.path.join(root, ".gitignore"), "w") as f:
+        f.write("node_modules/\n*.log\ncoverage/\n")
+
+
+def unpruned(root: str) -> int:
+    return sum(len(file_names) for _, _, file_names in os.walk(root))
+
+
+def basename(root: str) -> int:
+    count = 0
+    for _, dir_names, file_names in os.walk(root, topdown=True):
+        dir_names[:] = [d for d in dir_names if d not in DEFAULT_IGNORE_PATTERNS]
+        count += sum(1 for name in file_names if name not in DEFAULT_IGNORE_PATTERNS)
+    return count
+
+
+def shared(root: str) -> int:
+    return sum(len(file_names) for _, _, file_names in walk_project(root, DEFAULT_IGNORE_PATTERNS))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--packages", type=int, default=3000, help="number of node_modules packages")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--keep", help="build the project here and keep it")
+    args = parser.parse_args()
+
+    root = args.keep or tempfile.mkdtemp(prefix="walk-benchmark-")
+    try:
+        if not os.path.exists(os.path.join(root, "src")):
+            make_project(root, args.packages)
+        for name, func in (("unpruned", unpruned), ("basename", basename), ("walk_project", shared)):
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                count = func(root)
+                timings.append(time.perf_counter() - start)
+            print(f"  {name:<14} {min(timings) * 1000:10.2f} ms {count:8d} files")
+
+        start = time.perf_counter()
+        concat_agent_metadata(root)
+        print(f"  {'metadata cold':<14} {(time.perf_counter() - start) * 1000:10.2f} ms")
+        for name in ("metadata warm", "metadata watched"):
+            if name == "metadata watched":
+                get_metadata_index(root, DEFAULT_IGNORE_PATTERNS).watched = True
+            start = time.perf_counter()
+            for _ in range(100):
+                concat_agent_metadata(root)
+            print(f"  {name:<14} {(time.perf_counter() - start) * 10_000:10.2f} us")
+    finally:
+        if not args.keep:
+            shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
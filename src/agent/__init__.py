@@ -1,30 +1,69 @@
 """New LangGraph Agent.
 
 This module defines a custom graph.
+
+Importing the package is cheap and has no side effects: the names below are resolved on
+first access (`agent.State`, `from agent import llm_call`), which imports the submodule
+that defines them.
 """
 
-# Core components
-from .core.agent import llm_call, should_continue, tool_node, segment_into_steps
-from .core.graph import llm_file_explore, llm_call_evaluator, build_context, make_plan
-from .core.state import State
-from .models.task_models import Task, TaskList
-
-# Tools
-from .tools.llm_tools import llm_with_tools, str_replace, run_bash_command, create_file, view_file
-from .tools.file_utils import get_project_structure_as_string, concat_files_in_str, concat_folder_to_file
-
-# Models
-from .models.models import SearchFilePathsList, FileReflectionList, EnhanceTextInstruction, Route
-from .models.schemas import SearchQueryList, Reflection
-
-# Prompts
-from .prompts.prompts import (
-    file_planner_instructions,
-    file_reflection_instructions,
-    final_instruction,
-    final_context_instruction,
-    make_plan_instruction,
-    get_current_date,
-    agent_instruction,
-    segment_plan_into_steps
-)
+import importlib
+
+# Public name -> submodule that defines it.
+_LAZY_ATTRIBUTES = {
+    # Core components
+    "llm_call": ".core.agent",
+    "should_continue": ".core.agent",
+    "tool_node": ".core.agent",
+    "segment_into_steps": ".core.agent",
+    "llm_file_explore": ".core.graph",
+    "llm_call_evaluator": ".core.graph",
+    "build_context": ".core.graph",
+    "make_plan": ".core.graph",
+    "State": ".core.state",
+    "Task": ".models.task_models",
+    "TaskList": ".models.task_models",
+
+    # Tools
+    "llm_with_tools": ".tools.llm_tools",
+    "str_replace": ".tools.llm_tools",
+    "run_bash_command": ".tools.llm_tools",
+    "create_file": ".tools.llm_tools",
+    "view_file": ".tools.llm_tools",
+    "get_project_structure_as_string": ".tools.file_utils",
+    "concat_files_in_str": ".tools.file_utils",
+    "concat_folder_to_file": ".tools.file_utils",
+
+    # Models
+    "SearchFilePathsList": ".models.models",
+    "FileReflectionList": ".models.models",
+    "EnhanceTextInstruction": ".models.models",
+    "Route": ".models.models",
+    "SearchQueryList": ".models.schemas",
+    "Reflection": ".models.schemas",
+
+    # Prompts
+    "file_planner_instructions": ".prompts.prompts",
+    "file_reflection_instructions": ".prompts.prompts",
+    "final_instruction": ".prompts.prompts",
+    "final_context_instruction": ".prompts.prompts",
+    "make_plan_instruction": ".prompts.prompts",
+    "get_current_date": ".prompts.prompts",
+    "segment_plan_into_steps": ".prompts.prompts",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    # Cache on the package so later lookups skip __getattr__.
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
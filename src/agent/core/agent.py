@@ -1,45 +1,96 @@
 from __future__ import annotations
 
+import asyncio
 import os
+import uuid
+from functools import lru_cache
 from typing import Literal
 
 from langchain_core.messages import SystemMessage, ToolMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
 from langgraph.constants import END
 
+from bash_client.pool import DEFAULT_EXECUTOR_KEY, executor_key
 from .state import State
-from ..tools.llm_tools import llm_with_tools, tools_by_name
-from ..prompts.prompts import agent_instruction
-from .ai_models import kimi_llm, gpt5
+from ..tools.llm_tools import get_llm_with_tools, tools_by_name
+from ..tools.tool_executor import execute_tool_calls
+from ..prompts.prompts import agent_system_instruction, agent_step_instruction, summarize_history_instruction
+from . import ai_models
+from .compaction import HistoryCompactor, render_turns_for_summary
 from ..models.step_models import Step, StepList
 
 
-def segment_into_steps(state: State):
-    """
-    Segment the plan into steps.
-    """
+def _segment_prompt(state: State) -> str:
     plan = state["plan"]
     agent_metadata = state.get("agent_metadata", "")
 
     from ..prompts.prompts import segment_plan_into_steps
-    formatted_prompt = segment_plan_into_steps.format(
+    return segment_plan_into_steps.format(
         plan=plan,
         agent_metadata=agent_metadata,
     )
 
-    structured_llm = gpt5.with_structured_output(StepList)
-
-    print("Invoking LLM to segment plan into steps...")
-    result = structured_llm.invoke(formatted_prompt)
 
+def _segment_update(state: State, result: StepList):
     # Initialize step_message_indices with the first step starting at index 0
     step_message_indices = {0: len(state.get("messages", []))}
 
     return {"steps": result.steps, "current_step_index": 0, "step_message_indices": step_message_indices}
 
 
-def llm_call(state: State):
-    """LLM decides whether to call a tool or not using agent_instruction"""
+def segment_into_steps(state: State):
+    """
+    Segment the plan into steps.
+    """
+    formatted_prompt = _segment_prompt(state)
+
+    structured_llm = ai_models.get_model("gpt5").with_structured_output(StepList)
+
+    print("Invoking LLM to segment plan into steps...")
+    result = structured_llm.invoke(formatted_prompt)
+
+    return _segment_update(state, result)
+
+
+async def segment_into_steps_async(state: State):
+    """Async version of `segment_into_steps`."""
+    formatted_prompt = _segment_prompt(state)
+
+    structured_llm = ai_models.get_model("gpt5").with_structured_output(StepList)
+
+    print("Invoking LLM to segment plan into steps...")
+    result = await structured_llm.ainvoke(formatted_prompt)
 
+    return _segment_update(state, result)
+
+
+def _summarize_turns(messages: list) -> str:
+    formatted_prompt = summarize_history_instruction.format(history=render_turns_for_summary(messages))
+    print("Invoking LLM to summarize the earlier actions of the step...")
+    return ai_models.get_model("kimi_llm").invoke(formatted_prompt).content
+
+
+# Summarizing costs an extra LLM call, so it is opt-in; digesting old tool outputs is always on.
+history_compactor = HistoryCompactor(
+    summarizer=_summarize_turns if os.getenv("AGENT_SUMMARIZE_HISTORY") else None,
+)
+
+
+@lru_cache(maxsize=32)
+def _agent_system_message(project_structure: str, plan: str) -> SystemMessage:
+    # Rendered once per run instead of once per turn; the strings' hashes are cached by Python.
+    return SystemMessage(content=agent_system_instruction.format(
+        project_structure=project_structure,
+        plan=plan,
+    ))
+
+
+def _agent_messages(state: State) -> list:
+    """
+    Chat messages for the agent: a stable system prefix, the step instruction, then the turns of
+    the current step (AI tool calls and their ToolMessages), so each turn only appends. Once the
+    step grows past the threshold, `history_compactor` shortens its older turns.
+    """
     # Get the current step and previous steps
     steps = state.get("steps", [])
     current_step_index = state.get("current_step_index", 0)
@@ -59,15 +110,32 @@ def llm_call(state: State):
     start_index = step_message_indices.get(current_step_index, 0)
     current_step_messages = all_messages[start_index:]
 
-    formatted_instruction = agent_instruction.format(
+    step_message = HumanMessage(content=agent_step_instruction.format(
         current_step=current_step,
         previous_steps=previous_steps,
-        plan=state.get("plan", ""),
-        action_history="\n".join([str(msg) for msg in current_step_messages]),
-        project_structure=state.get("project_structure", ""),
-    )
+    ))
+
+    return [
+        _agent_system_message(state.get("project_structure", ""), state.get("plan", "")),
+        step_message,
+        *history_compactor.compact(current_step_messages),
+    ]
+
+
+def llm_call(state: State):
+    """LLM decides whether to call a tool or not using the agent chat messages"""
+    messages = get_llm_with_tools().invoke(_agent_messages(state))
+
+    return {
+        "messages": [messages]
+    }
+
 
-    messages = llm_with_tools.invoke(formatted_instruction)
+async def llm_call_async(state: State):
+    """Async version of `llm_call`."""
+    # Compaction may call the summarizer, so the messages are built in a worker thread.
+    agent_messages = await asyncio.to_thread(_agent_messages, state)
+    messages = await get_llm_with_tools().ainvoke(agent_messages)
 
     return {
         "messages": [messages]
@@ -95,15 +163,27 @@ def should_continue(state: State) -> Literal["environment", "next_step", "push_t
     return "push_to_git"
 
 
-def tool_node(state: dict):
+def tool_node(state: dict, config: RunnableConfig):
     """Performs the tool call"""
 
-    result = []
-    for tool_call in state["messages"][-1].tool_calls:
-        tool = tools_by_name[tool_call["name"]]
-        observation = tool.invoke(tool_call["args"])
-        result.append(ToolMessage(content=observation, tool_call_id=tool_call["id"]))
-    return {"messages": result}
+    # Tools see the run's project path, so shell commands start in the project directory.
+    # The node's run_id is dropped so each tool call is traced as its own run.
+    tool_config = {key: value for key, value in config.items() if key != "run_id"}
+
+    # The run's shell is keyed by its thread or run id. LangGraph does not pass the run id
+    # to nodes, so a run without a thread id gets a key of its own, kept in the state for its
+    # later tool calls and for push_to_git, which closes the shell when the run ends.
+    update = {}
+    run_key = state.get("executor_key") or executor_key(config)
+    if run_key == DEFAULT_EXECUTOR_KEY:
+        run_key = uuid.uuid4().hex
+        update["executor_key"] = run_key
+    tool_config["configurable"] = {**config.get("configurable", {}), "project_path": state.get("project_path"),
+                                   "executor_key": run_key}
+
+    # Independent calls run concurrently; the messages come back in the original order.
+    result = execute_tool_calls(state["messages"][-1].tool_calls, tools_by_name, config=tool_config)
+    return {"messages": result, **update}
 
 
 def next_step(state: State):
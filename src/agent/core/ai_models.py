@@ -1,68 +1,126 @@
-import os
+"""Chat models used by the graph nodes.
 
-from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_groq import ChatGroq
+Models are created lazily: importing this module does not import any provider SDK. The
+first access to `kimi_llm`, `gemini_flash_lite`, `gpt5`, `deepseek_llm` or
+`open_router_model` (as a module attribute or through `get_model`) imports the provider
+package, builds the client and keeps it for the rest of the process.
 
-load_dotenv()
-api_key = os.getenv("GROQ_API_KEY")
-kimi_llm = ChatGroq(
-    model="moonshotai/kimi-k2-instruct",
-    temperature=0,
-    max_tokens=None,
-    timeout=None,
-    max_retries=2,
-    api_key=api_key,
-)
-
-from langchain_together import ChatTogether
-
-api_key = os.getenv("TOGETHER_API_KEY")
-
-deepseek_llm = ChatTogether(
-    model="deepseek-ai/DeepSeek-R1",
-    temperature=0,
-    max_tokens=1000000,
-    timeout=None,
-    max_retries=2,
-    api_key=api_key,
-)
-
-api_key = os.getenv("GOOGLE_API_KEY")
-
-gemini_flash_lite = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash-lite-preview-06-17",
-    api_key=api_key,
-)
-
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import PromptTemplate
-from langchain.chains import LLMChain
+Nodes should look models up when they run, with `get_model("gpt5")`. Module attributes
+(`ai_models.gpt5`) work too, but not inside node bodies: LangGraph inspects the attribute
+accesses of node functions when it compiles a graph, which would build every client early.
+"""
+
+import os
+import threading
 from os import getenv
+
 from dotenv import load_dotenv
 
 load_dotenv()
 
-template = """Question: {question}
-Answer: Let's think step by step."""
-
-prompt = PromptTemplate(template=template, input_variables=["question"])
-
 model1 = "qwen/qwen3-coder:free"
 model2 = "qwen/qwen3-235b-a22b-thinking-2507"
 model3= "openai/gpt-oss-120b"
 model4= "openai/gpt-5"
-open_router_model = ChatOpenAI(
-  api_key=getenv("OPENROUTER_API_KEY"),
-  base_url="https://openrouter.ai/api/v1",
-  model=model4,
-  # default_headers={
-  #   "HTTP-Referer": getenv("YOUR_SITE_URL"),
-  #   "X-Title": getenv("YOUR_SITE_NAME"),
-  # }
-)
-
-gpt5 = ChatOpenAI(
-    model="gpt-4.1-2025-04-14",
-    api_key=getenv("OPENAI_API_KEY"),
-)
+
+
+def _make_kimi_llm():
+    from langchain_groq import ChatGroq
+
+    return ChatGroq(
+        model="moonshotai/kimi-k2-instruct",
+        temperature=0,
+        max_tokens=None,
+        timeout=None,
+        max_retries=2,
+        api_key=os.getenv("GROQ_API_KEY"),
+    )
+
+
+def _make_deepseek_llm():
+    from langchain_together import ChatTogether
+
+    return ChatTogether(
+        model="deepseek-ai/DeepSeek-R1",
+        temperature=0,
+        max_tokens=1000000,
+        timeout=None,
+        max_retries=2,
+        api_key=os.getenv("TOGETHER_API_KEY"),
+    )
+
+
+def _make_gemini_flash_lite():
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    return ChatGoogleGenerativeAI(
+        model="gemini-2.5-flash-lite-preview-06-17",
+        api_key=os.getenv("GOOGLE_API_KEY"),
+    )
+
+
+def _make_open_router_model():
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(
+      api_key=getenv("OPENROUTER_API_KEY"),
+      base_url="https://openrouter.ai/api/v1",
+      model=model4,
+      # default_headers={
+      #   "HTTP-Referer": getenv("YOUR_SITE_URL"),
+      #   "X-Title": getenv("YOUR_SITE_NAME"),
+      # }
+    )
+
+
+def _make_gpt5():
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(
+        model="gpt-4.1-2025-04-14",
+        api_key=getenv("OPENAI_API_KEY"),
+    )
+
+
+MODEL_FACTORIES = {
+    "kimi_llm": _make_kimi_llm,
+    "deepseek_llm": _make_deepseek_llm,
+    "gemini_flash_lite": _make_gemini_flash_lite,
+    "open_router_model": _make_open_router_model,
+    "gpt5": _make_gpt5,
+}
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def get_model(name: str):
+    """
+    Returns the named chat model, building it on first use.
+
+    Args:
+        name (str): One of the keys of MODEL_FACTORIES.
+
+    Returns:
+        BaseChatModel: The shared client for that model.
+    """
+    model = _models.get(name)
+    if model is not None:
+        return model
+
+    if name not in MODEL_FACTORIES:
+        raise KeyError(f"Unknown model: {name}")
+
+    with _models_lock:
+        model = _models.get(name)
+        if model is None:
+            model = MODEL_FACTORIES[name]()
+            _models[name] = model
+    return model
+
+
+def __getattr__(name: str):
+    # Module attributes such as `ai_models.gpt5` resolve through the lazy registry.
+    if name in MODEL_FACTORIES:
+        return get_model(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
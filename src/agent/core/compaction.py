@@ -0,0 +1,200 @@
+"""Compaction of the agent's per-step message history.
+
+Inside one step the history grows with every tool call, and large `view_file` or
+`run_bash_command` outputs would otherwise be resent on every turn. Once the history of
+the current step crosses a size threshold, `HistoryCompactor` replaces older tool outputs
+with a head-and-tail digest and, if a summarizer is configured, replaces the oldest turns
+with summaries. Turns are summarized in fixed chunks counted from the start of the step, so
+a chunk is summarized once and its summary message stays the same on every later turn. The
+most recent turns are always sent as they are.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+
+DEFAULT_MAX_HISTORY_CHARS = int(os.getenv("AGENT_MAX_HISTORY_CHARS", "60000"))
+DEFAULT_KEEP_RECENT_TURNS = 3
+DEFAULT_SUMMARY_CHUNK_TURNS = 4
+DIGEST_HEAD_CHARS = 1000
+DIGEST_TAIL_CHARS = 500
+
+_MAX_CACHED_SUMMARIES = 256
+
+
+def _content_length(message: BaseMessage) -> int:
+    return len(message.content) if isinstance(message.content, str) else len(str(message.content))
+
+
+def _split_turns(messages: List[BaseMessage]) -> List[List[BaseMessage]]:
+    """Groups messages into turns: an AI message followed by the tool results it asked for."""
+    turns: List[List[BaseMessage]] = []
+    for message in messages:
+        if isinstance(message, ToolMessage) and turns:
+            turns[-1].append(message)
+        else:
+            turns.append([message])
+    return turns
+
+
+def digest_tool_message(message: ToolMessage) -> ToolMessage:
+    """
+    Replaces a long tool output with its head and tail.
+
+    Args:
+        message (ToolMessage): The tool result.
+
+    Returns:
+        ToolMessage: The same message if it is short, otherwise a copy with a digest as content.
+    """
+    content = message.content if isinstance(message.content, str) else str(message.content)
+    if len(content) <= DIGEST_HEAD_CHARS + DIGEST_TAIL_CHARS:
+        return message
+
+    omitted = len(content) - DIGEST_HEAD_CHARS - DIGEST_TAIL_CHARS
+    digest = (
+        f"{content[:DIGEST_HEAD_CHARS]}\n"
+        f"... [{omitted} characters of this earlier tool output omitted to keep the history short] ...\n"
+        f"{content[-DIGEST_TAIL_CHARS:]}"
+    )
+    return message.model_copy(update={"content": digest})
+
+
+class HistoryCompactor:
+    """
+    Keeps the per-step history under a size threshold.
+
+    Args:
+        max_chars (int): Size of the step history above which older turns are compacted.
+        keep_recent_turns (int): Number of most recent turns that are never compacted.
+        summarizer (Callable, optional): Turns a list of messages into a short summary. When set,
+                                         the oldest chunks of turns are replaced by one summary
+                                         message each if digesting tool outputs was not enough.
+        summary_chunk_turns (int): Number of turns summarized together.
+    """
+
+    def __init__(self, max_chars: int = DEFAULT_MAX_HISTORY_CHARS,
+                 keep_recent_turns: int = DEFAULT_KEEP_RECENT_TURNS,
+                 summarizer: Optional[Callable[[List[BaseMessage]], str]] = None,
+                 summary_chunk_turns: int = DEFAULT_SUMMARY_CHUNK_TURNS):
+        self.max_chars = max_chars
+        self.keep_recent_turns = keep_recent_turns
+        self.summarizer = summarizer
+        self.summary_chunk_turns = max(summary_chunk_turns, 1)
+        self.compactions = 0
+        self.summaries = 0
+        self.chars_before = 0
+        self.chars_after = 0
+        # Summaries keyed by the ids of the messages of their chunk, so a chunk is summarized once.
+        self._summaries: "OrderedDict[Tuple[str, ...], str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def compact(self, messages: List[BaseMessage]) -> List[BaseMessage]:
+        """
+        Returns the step history to send to the model, compacted if it is over the threshold.
+
+        The messages stored in the graph state are not modified.
+
+        Args:
+            messages (List[BaseMessage]): The messages of the current step, oldest first.
+
+        Returns:
+            List[BaseMessage]: The messages to send.
+        """
+        total_chars = sum(_content_length(message) for message in messages)
+        if total_chars <= self.max_chars:
+            return messages
+
+        turns = _split_turns(messages)
+        split_at = max(len(turns) - self.keep_recent_turns, 0)
+        older, recent = turns[:split_at], turns[split_at:]
+        if not older:
+            return messages
+
+        digested = [[digest_tool_message(message) if isinstance(message, ToolMessage) else message for message in turn]
+                    for turn in older]
+        recent_messages = [message for turn in recent for message in turn]
+        compacted_chars = sum(_content_length(message) for turn in digested for message in turn)
+        compacted_chars += sum(_content_length(message) for message in recent_messages)
+
+        # Whole chunks from the start of the step; a chunk summarized once keeps its summary.
+        summary_messages = []
+        summarized_turns = 0
+        if self.summarizer is not None:
+            chunk_turns = self.summary_chunk_turns
+            for start in range(0, len(older) - len(older) % chunk_turns, chunk_turns):
+                chunk = [message for turn in older[start:start + chunk_turns] for message in turn]
+                summary = self._cached_summary(chunk)
+                if summary is None and compacted_chars > self.max_chars:
+                    summary = self._summarize(chunk)
+                if summary is None:
+                    break
+                summary_message = HumanMessage(content=f"Summary of the earlier actions in this step:\n{summary}")
+                summary_messages.append(summary_message)
+                summarized_turns = start + chunk_turns
+                compacted_chars += _content_length(summary_message) - sum(
+                    _content_length(message) for turn in digested[start:summarized_turns] for message in turn)
+
+        compacted_older = summary_messages + [message for turn in digested[summarized_turns:] for message in turn]
+
+        with self._lock:
+            self.compactions += 1
+            self.chars_before += total_chars
+            self.chars_after += compacted_chars
+        print(f"Compacted step history from {total_chars} to {compacted_chars} characters")
+        return compacted_older + recent_messages
+
+    @staticmethod
+    def _summary_key(messages: List[BaseMessage]) -> Tuple[str, ...]:
+        return tuple(message.id or str(index) for index, message in enumerate(messages))
+
+    def _cached_summary(self, messages: List[BaseMessage]) -> Optional[str]:
+        key = self._summary_key(messages)
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is not None:
+                self._summaries.move_to_end(key)
+            return summary
+
+    def _summarize(self, messages: List[BaseMessage]) -> Optional[str]:
+        key = self._summary_key(messages)
+        try:
+            summary = self.summarizer(messages)
+        except Exception as e:
+            print(f"Error summarizing the step history: {e}")
+            return None
+
+        with self._lock:
+            self.summaries += 1
+            self._summaries[key] = summary
+            if len(self._summaries) > _MAX_CACHED_SUMMARIES:
+                self._summaries.popitem(last=False)
+        return summary
+
+    def metrics(self) -> dict:
+        """Counters since the compactor was created, including the characters saved."""
+        with self._lock:
+            return {
+                "compactions": self.compactions,
+                "summaries": self.summaries,
+                "chars_before": self.chars_before,
+                "chars_after": self.chars_after,
+                "chars_saved": self.chars_before - self.chars_after,
+            }
+
+
+def render_turns_for_summary(messages: List[BaseMessage]) -> str:
+    """Plain-text rendering of turns for a summarization prompt, with tool outputs digested."""
+    lines = []
+    for message in messages:
+        if isinstance(message, AIMessage):
+            calls = ", ".join(f"{call['name']}({call['args']})" for call in message.tool_calls)
+            lines.append(f"Assistant: {message.content} {calls}".strip())
+        elif isinstance(message, ToolMessage):
+            lines.append(f"Tool result: {digest_tool_message(message).content}")
+        else:
+            lines.append(f"{message.type}: {message.content}")
+    return "\n".join(lines)
@@ -1,19 +1,36 @@
+import os
+import threading
+import time
+
 from langgraph.constants import START, END
 from langgraph.graph import StateGraph
 from typing import Literal
 
-from src.agent.core.state import State
-from src.agent.core.agent import llm_call, tool_node, should_continue, segment_into_steps, next_step
-from src.agent.core.graph import llm_file_explore, llm_call_evaluator, build_context, make_plan, determine_input_type, \
-    answer_question, push_to_git
+from langchain_core.runnables import RunnableLambda
+
+from agent.core import ai_models
+from agent.core.state import State
+from agent.core.agent import llm_call, tool_node, should_continue, segment_into_steps, next_step, llm_call_async, \
+    segment_into_steps_async
+from agent.core.graph import llm_file_explore, llm_call_evaluator, build_context, make_plan, determine_input_type, \
+    answer_question, push_to_git, llm_file_explore_async, llm_call_evaluator_async, build_context_async, \
+    make_plan_async, determine_input_type_async, answer_question_async, push_to_git_async
+from agent.tools.file_utils import get_project_structure_as_string
+from agent.tools.project_watcher import ensure_watched
+from agent.tools.llm_tools import get_llm_with_tools
+
+
+def _node(func, afunc):
+    """Node that awaits `afunc` when the graph runs async (ainvoke/astream, the LangGraph server) and calls `func` otherwise."""
+    return RunnableLambda(func, afunc=afunc, name=func.__name__)
 
 
 def exploration():
     graph = StateGraph(State)
-    graph.add_node("llm_file_explore", llm_file_explore)
-    graph.add_node("llm_call_evaluator", llm_call_evaluator)
-    graph.add_node("build_context", build_context)
-    graph.add_node("make_plan", make_plan)
+    graph.add_node("llm_file_explore", _node(llm_file_explore, llm_file_explore_async))
+    graph.add_node("llm_call_evaluator", _node(llm_call_evaluator, llm_call_evaluator_async))
+    graph.add_node("build_context", _node(build_context, build_context_async))
+    graph.add_node("make_plan", _node(make_plan, make_plan_async))
 
     graph.add_edge(START, "llm_file_explore")
     graph.add_edge("llm_file_explore", "llm_call_evaluator")
@@ -26,10 +43,10 @@ def exploration():
 def exploration_and_plan():
     graph = StateGraph(State)
 
-    graph.add_node("llm_file_explore", llm_file_explore)
-    graph.add_node("llm_call_evaluator", llm_call_evaluator)
-    graph.add_node("build_context", build_context)
-    graph.add_node("make_plan", make_plan)
+    graph.add_node("llm_file_explore", _node(llm_file_explore, llm_file_explore_async))
+    graph.add_node("llm_call_evaluator", _node(llm_call_evaluator, llm_call_evaluator_async))
+    graph.add_node("build_context", _node(build_context, build_context_async))
+    graph.add_node("make_plan", _node(make_plan, make_plan_async))
 
     graph.add_edge(START, "llm_file_explore")
     graph.add_edge("llm_file_explore", "llm_call_evaluator")
@@ -43,13 +60,13 @@ def exploration_and_plan():
 def make_plan_run():
     graph = StateGraph(State)
     graph.add_edge(START, "make_plan")
-    graph.add_node("make_plan", make_plan)
+    graph.add_node("make_plan", _node(make_plan, make_plan_async))
     return graph
 
 
 def step_creation_part():
     graph = StateGraph(State)
-    graph.add_node("segment_to_step", segment_into_steps)
+    graph.add_node("segment_to_step", _node(segment_into_steps, segment_into_steps_async))
     graph.add_edge(START, "segment_to_step")
     graph.add_edge("segment_to_step", END)
     return graph
@@ -57,9 +74,9 @@ def step_creation_part():
 
 def action():
     graph = StateGraph(State)
-    graph.add_node("llm_call", llm_call)
+    graph.add_node("llm_call", _node(llm_call, llm_call_async))
     graph.add_node("environment", tool_node)
-    graph.add_node("segment_into_steps", segment_into_steps)
+    graph.add_node("segment_into_steps", _node(segment_into_steps, segment_into_steps_async))
     graph.add_node("next_step", next_step)
 
 
@@ -88,36 +105,50 @@ def route_input(state: State) -> Literal["question", "task"]:
     return input_type
 
 
+def join_exploration(state: State):
+    """Join point for the input-type and file-exploration branches"""
+    return {}
+
+
 def explore_plan_action():
     graph = StateGraph(State)
 
     # Add nodes for input type determination and question answering
-    graph.add_node("determine_input_type", determine_input_type)
-    graph.add_node("answer_question", answer_question)
+    graph.add_node("determine_input_type", _node(determine_input_type, determine_input_type_async))
+    graph.add_node("answer_question", _node(answer_question, answer_question_async))
+    graph.add_node("join_exploration", join_exploration)
 
     # Add nodes for task processing
-    graph.add_node("llm_call", llm_call)
+    graph.add_node("llm_call", _node(llm_call, llm_call_async))
     graph.add_node("environment", tool_node)
-    graph.add_node("segment_into_steps", segment_into_steps)
+    graph.add_node("segment_into_steps", _node(segment_into_steps, segment_into_steps_async))
     graph.add_node("next_step", next_step)
-    graph.add_node("llm_file_explore", llm_file_explore)
-    graph.add_node("llm_call_evaluator", llm_call_evaluator)
-    graph.add_node("build_context", build_context)
-    graph.add_node("make_plan", make_plan)
-    graph.add_node("push_to_git", push_to_git)
+    graph.add_node("llm_file_explore", _node(llm_file_explore, llm_file_explore_async))
+    graph.add_node("llm_call_evaluator", _node(llm_call_evaluator, llm_call_evaluator_async))
+    graph.add_node("build_context", _node(build_context, build_context_async))
+    graph.add_node("make_plan", _node(make_plan, make_plan_async))
+    graph.add_node("push_to_git", _node(push_to_git, push_to_git_async))
 
 
-    # Start with file exploration
+    # Classification only needs the user task, so it starts at the same time as file exploration
+    graph.add_edge(START, "determine_input_type")
     graph.add_edge(START, "llm_file_explore")
-    graph.add_edge("llm_file_explore", "llm_call_evaluator")
-    graph.add_edge("llm_call_evaluator", "build_context")
 
-    # After context is built, determine input type
-    graph.add_edge("build_context", "determine_input_type")
+    # Wait for both branches, then questions skip the reflection passes and go straight to the context
+    graph.add_edge(["determine_input_type", "llm_file_explore"], "join_exploration")
+    graph.add_conditional_edges(
+        "join_exploration",
+        route_input,
+        {
+            "question": "build_context",
+            "task": "llm_call_evaluator",
+        },
+    )
+    graph.add_edge("llm_call_evaluator", "build_context")
 
-    # Add conditional edges based on input type
+    # Once the context is built, route on the input type
     graph.add_conditional_edges(
-        "determine_input_type",
+        "build_context",
         route_input,
         {
             "question": "answer_question",
@@ -147,5 +178,89 @@ def explore_plan_action():
     return graph
 
 
-optimizer_builder = exploration()
-graph = optimizer_builder.compile()
+GRAPH_BUILDERS = {
+    "exploration": exploration,
+    "exploration_and_plan": exploration_and_plan,
+    "make_plan_run": make_plan_run,
+    "step_creation_part": step_creation_part,
+    "action": action,
+    "explore_plan_action": explore_plan_action,
+}
+
+# Models the graph nodes call; prewarm builds their clients before the first request.
+PREWARM_MODELS = ("kimi_llm", "gemini_flash_lite", "gpt5")
+
+_compiled_graphs = {}
+_compiled_graphs_lock = threading.Lock()
+
+
+def get_graph(name: str = "exploration"):
+    """
+    Returns the named graph, compiled once per process.
+
+    Args:
+        name (str): One of the keys of GRAPH_BUILDERS.
+
+    Returns:
+        CompiledStateGraph: The shared compiled graph.
+    """
+    compiled = _compiled_graphs.get(name)
+    if compiled is not None:
+        return compiled
+
+    if name not in GRAPH_BUILDERS:
+        raise KeyError(f"Unknown graph: {name}")
+
+    with _compiled_graphs_lock:
+        compiled = _compiled_graphs.get(name)
+        if compiled is None:
+            compiled = GRAPH_BUILDERS[name]().compile()
+            _compiled_graphs[name] = compiled
+    return compiled
+
+
+def prewarm(graph_names=None, project_path: str = None):
+    """
+    Does the one-time setup work up front so the first request does not pay for it.
+
+    Compiles the graphs, builds the model clients (and the tool-bound model) and, if a
+    project path is given, scans it into the project tree cache and, with
+    AGENT_WATCH_PROJECTS set, starts watching it.
+
+    Args:
+        graph_names (Iterable[str], optional): Graphs to compile. Defaults to all of GRAPH_BUILDERS.
+        project_path (str, optional): Project whose structure should be cached.
+    """
+    start = time.perf_counter()
+    for name in graph_names or GRAPH_BUILDERS:
+        get_graph(name)
+    for model_name in PREWARM_MODELS:
+        ai_models.get_model(model_name)
+    get_llm_with_tools()
+    if project_path:
+        get_project_structure_as_string(project_path)
+        ensure_watched(project_path)
+    print(f"Prewarmed the agent in {time.perf_counter() - start:.2f}s")
+
+
+# Graphs served by the LangGraph server (see langgraph.json): module attribute -> graph name.
+SERVED_GRAPHS = {
+    "graph": "exploration",
+    "explore_plan_action_graph": "explore_plan_action",
+}
+
+
+def __getattr__(name: str):
+    # `configs.graph` and `from agent.core.configs import graph` compile on first access, not at import.
+    if name in SERVED_GRAPHS:
+        return get_graph(SERVED_GRAPHS[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Set AGENT_PREWARM=1 (and optionally AGENT_PREWARM_PROJECT_PATH) to prewarm in the background at startup.
+if os.getenv("AGENT_PREWARM"):
+    threading.Thread(
+        target=prewarm,
+        kwargs={"project_path": os.getenv("AGENT_PREWARM_PROJECT_PATH")},
+        name="agent-prewarm",
+        daemon=True,
+    ).start()
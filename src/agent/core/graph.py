@@ -1,16 +1,27 @@
 from __future__ import annotations
 
+import asyncio
 import os
+import re
+import time
+from typing import AsyncIterable, Iterable
 
 from dotenv import load_dotenv
 from langchain_core.messages import HumanMessage
+from langgraph.config import get_stream_writer
 from pydantic import BaseModel, Field
 
-from .ai_models import kimi_llm, gemini_flash_lite, open_router_model, gpt5
+from bash_client.pool import bash_executor_pool
+from . import ai_models
+from .llm_cache import cached_model
 from .state import State
 from ..prompts.prompts import final_context_instruction, make_plan_instruction, input_type_determination_prompt, \
     answer_question_prompt, commit_message_instruction
-from ..tools.file_utils import get_project_structure_as_string, concat_files_in_str, concat_agent_metadata
+from ..tools.cache_invalidation import invalidate_path
+from ..tools.context_builder import ContextBuilder
+from ..tools.context_packer import DEFAULT_CONTEXT_TOKEN_BUDGET, block_content, estimate_tokens, pack_context
+from ..tools.file_utils import get_project_structure_as_string, concat_agent_metadata, split_file_blocks
+from ..tools.project_watcher import ensure_watched
 from ..models.models import FileReflectionList, SearchFilePathsList
 from ..prompts.prompts import file_planner_instructions, file_reflection_instructions
 from ..utils.git_tools import git_commit_push
@@ -19,58 +30,150 @@ load_dotenv()
 
 
 
-def llm_file_explore(state: State):
+class _ModelCall:
     """
-    Transcribes audio, then uses the text to find relevant files.
+    A model call yielded by a node's steps.
+
+    The steps hold everything a node does apart from calling the model, so a sync node and its
+    async twin share them: `_run_steps` answers each call with `invoke`, `_arun_steps` with `ainvoke`.
     """
-    user_task = state["user_task"]
+
+    def __init__(self, runnable, prompt):
+        self.runnable = runnable
+        self.prompt = prompt
+
+    def run(self):
+        return self.runnable.invoke(self.prompt)
+
+    async def arun(self):
+        return await self.runnable.ainvoke(self.prompt)
+
+
+class _StreamToFile(_ModelCall):
+    """A streamed model call whose output goes to a file and the "custom" stream; the steps receive the full text."""
+
+    def __init__(self, model, prompt, file_name: str, node: str):
+        super().__init__(model, prompt)
+        self.file_name = file_name
+        self.node = node
+
+    def run(self) -> str:
+        return _stream_to_file(self.runnable.stream(self.prompt), self.file_name, self.node)
+
+    async def arun(self) -> str:
+        return await _astream_to_file(self.runnable.astream(self.prompt), self.file_name, self.node)
+
+
+def _advance(steps, result=None, error: Exception | None = None):
+    """Resumes a node's steps with the last call's result or error; returns (finished, next call or node update)."""
+    try:
+        return False, steps.throw(error) if error is not None else steps.send(result)
+    except StopIteration as stop:
+        return True, stop.value
+
+
+def _run_steps(steps):
+    """Runs a node's steps, answering each model call they yield with a blocking call."""
+    finished, call = _advance(steps)
+    while not finished:
+        try:
+            result, error = call.run(), None
+        except Exception as e:
+            result, error = None, e
+        finished, call = _advance(steps, result, error)
+    return call
+
+
+async def _arun_steps(steps):
+    """Async version of `_run_steps`: the steps' own work (file reads, tree walks) runs in a worker thread."""
+    finished, call = await asyncio.to_thread(_advance, steps)
+    while not finished:
+        try:
+            result, error = await call.arun(), None
+        except Exception as e:
+            result, error = None, e
+        finished, call = await asyncio.to_thread(_advance, steps, result, error)
+    return call
+
+
+def _context_update(context_builder: ContextBuilder):
+    # The block sizes travel with the context, so later nodes can split it again exactly.
+    return {"context": context_builder.render(), "context_block_sizes": context_builder.block_sizes,
+            "all_file_paths": set(context_builder.file_paths)}
+
+
+def _file_explore_steps(state: State):
     project_path = state["project_path"]
+    # With AGENT_WATCH_PROJECTS set, later nodes and runs read the project from caches kept hot by a watcher.
+    ensure_watched(project_path)
 
     project_structure = get_project_structure_as_string(project_path)
-    structured_llm = gemini_flash_lite.with_structured_output(SearchFilePathsList)
+    structured_llm = cached_model(ai_models.get_model("gemini_flash_lite")).with_structured_output(SearchFilePathsList)
 
     formatted_prompt = file_planner_instructions.format(
-        user_task=user_task,
+        user_task=state["user_task"],
         project_structure=project_structure,
         project_path=project_path,
     )
 
     print("Invoking LLM to find relevant file paths...")
-    result: SearchFilePathsList = structured_llm.invoke(formatted_prompt)
+    result: SearchFilePathsList = yield _ModelCall(structured_llm, formatted_prompt)
     filtered_file_paths = [path for path in result.file_paths if not path.endswith('.env')]
-    context = concat_files_in_str(filtered_file_paths)
-    return {"context": context, "all_file_paths": set(filtered_file_paths), "project_path": project_path,
-            "project_structure": project_structure}
 
+    context_builder = ContextBuilder()
+    context_builder.add_files(filtered_file_paths)
+    return {**_context_update(context_builder), "project_path": project_path, "project_structure": project_structure}
 
-def llm_call_evaluator(state: State):
-    """LLM evaluates the files in context and suggests additions/removals"""
-    user_task = state["user_task"]
-    project_path = state["project_path"]
-    context = state["context"]
-    all_file_paths = state["all_file_paths"]
 
-    # Filter out .env files from all_file_paths
-    all_file_paths = {path for path in all_file_paths if not path.endswith('.env')}
+def llm_file_explore(state: State):
+    """
+    Transcribes audio, then uses the text to find relevant files.
+    """
+    return _run_steps(_file_explore_steps(state))
 
-    project_structure = get_project_structure_as_string(project_path)
-    count = 0
 
-    while True:
-        structured_llm = gemini_flash_lite.with_structured_output(FileReflectionList)
+async def llm_file_explore_async(state: State):
+    """Async version of `llm_file_explore`; the tree walk and file reads run in a worker thread."""
+    return await _arun_steps(_file_explore_steps(state))
+
+
+def _apply_reflection(context_builder: ContextBuilder, result: FileReflectionList, removed_file_paths: set) -> bool:
+    """Applies one pass of the model's suggestions; returns False once nothing changes."""
+    # Files the model asked to drop are not re-added in a later pass.
+    removed = context_builder.remove_files(result.remove_file_paths or [])
+    removed_file_paths.update(removed)
+
+    new_files = [file_path for file_path in result.additional_file_paths
+                 if file_path not in context_builder and file_path not in removed_file_paths]
+    filtered_new_files = [path for path in new_files if not path.endswith('.env') and "agent_metadata.md" not in path]
+    added = context_builder.add_files(filtered_new_files)
+
+    return len(added) > 0 or len(removed) > 0
+
+
+def _evaluator_steps(state: State):
+    # Reuse the blocks already loaded by llm_file_explore; later passes only read or drop what changed.
+    context_builder = ContextBuilder.from_context(state["context"], state.get("context_block_sizes") or {})
+
+    # Filter out .env files
+    context_builder.remove_files([path for path in context_builder.file_paths if path.endswith('.env')])
+    removed_file_paths = set()
+
+    project_structure = get_project_structure_as_string(state["project_path"])
+    result = None
+
+    # At most three reflection passes.
+    for _ in range(3):
+        structured_llm = ai_models.get_model("gemini_flash_lite").with_structured_output(FileReflectionList)
         formatted_prompt = file_reflection_instructions.format(
             user_task=state["user_task"],
             project_structure=project_structure,
-            context=context,
-            project_path=project_path,
-
+            context=context_builder.render(),
+            project_path=state["project_path"],
         )
-        count += 1
-        if count > 3:
-            return {"context": context}
 
         try:
-            result: FileReflectionList = structured_llm.invoke(formatted_prompt)
+            result: FileReflectionList = yield _ModelCall(structured_llm, formatted_prompt)
             print(result)
 
             if result is None or result.additional_file_paths is None:
@@ -78,18 +181,38 @@ def llm_call_evaluator(state: State):
         except Exception as e:
             print(f"Error in llm_call_evaluator: {e}")
             break
-        new_files = [file_path for file_path in result.additional_file_paths if file_path not in all_file_paths]
 
-        if len(new_files) == 0:
+        if not _apply_reflection(context_builder, result, removed_file_paths):
             break
-        else:
-            filtered_new_files = [path for path in new_files if not path.endswith('.env') and "agent_metadata.md" not in path]
-            all_file_paths.update(set(filtered_new_files))
-            context = concat_files_in_str(list(all_file_paths))
 
     print("*************************************")
-    print(all_file_paths)
-    return {"file_reflection": result, "context": context}
+    print(context_builder.file_paths)
+    # Files the reflection passes asked for on top of the explored ones get the token budget first.
+    explored_file_paths = state.get("context_block_sizes") or {}
+    priority_file_paths = [path for path in context_builder.file_paths if path not in explored_file_paths]
+    return {"file_reflection": result, **_context_update(context_builder), "priority_file_paths": priority_file_paths}
+
+
+def llm_call_evaluator(state: State):
+    """LLM evaluates the files in context and suggests additions/removals"""
+    return _run_steps(_evaluator_steps(state))
+
+
+async def llm_call_evaluator_async(state: State):
+    """Async version of `llm_call_evaluator`; file reads run in a worker thread."""
+    return await _arun_steps(_evaluator_steps(state))
+
+
+def _requested_file_paths(state: State, file_paths) -> list:
+    """The files the user task names, by absolute path or by path relative to the project."""
+    user_task = state.get("user_task") or ""
+    project_path = state.get("project_path")
+    requested = []
+    for file_path in file_paths:
+        names = {file_path, os.path.relpath(file_path, project_path)} if project_path else {file_path}
+        if any(re.search(rf"(?<![\w.-]){re.escape(name)}(?![\w/-])", user_task) for name in names):
+            requested.append(file_path)
+    return requested
 
 
 def build_context(state: State):
@@ -100,6 +223,24 @@ def build_context(state: State):
 
     agent_metadata = concat_agent_metadata(project_path)
 
+    # The structure and metadata are sent as they are; the files get what is left of the token budget.
+    budget_tokens = state.get("context_token_budget") or DEFAULT_CONTEXT_TOKEN_BUDGET
+    overhead_tokens = estimate_tokens(project_structure) + estimate_tokens(agent_metadata)
+    block_sizes = state.get("context_block_sizes") or {}
+    files = [(file_path, block_content(file_path, block))
+             for file_path, block in split_file_blocks(context, block_sizes)] if block_sizes else []
+    if files:
+        # Files the user named come first, then the ones the reflection passes added.
+        priority_paths = _requested_file_paths(state, [file_path for file_path, _ in files])
+        priority_paths += state.get("priority_file_paths") or []
+        packed = pack_context(files, max(budget_tokens - overhead_tokens, 0), priority_paths)
+        context = packed.context
+        context_tokens = overhead_tokens + packed.used_tokens
+        omitted = [packed_file.file_path for packed_file in packed.files if packed_file.mode != "full"]
+        print(f"Packed {len(files)} files into {packed.used_tokens}/{packed.budget_tokens} tokens, reduced: {omitted}")
+    else:
+        context_tokens = overhead_tokens + estimate_tokens(context)
+
     final_context = final_context_instruction.format(
         context=context,
         project_structure=project_structure,
@@ -109,20 +250,23 @@ def build_context(state: State):
     output_path = os.path.join(os.getcwd(), 'context.txt')
     with open(output_path, 'w', encoding='utf-8') as output_file:
         output_file.write(final_context)
-    return {"context": final_context, "agent_metadata": agent_metadata}
+    invalidate_path(output_path)
+    return {"context": final_context, "agent_metadata": agent_metadata, "context_tokens": context_tokens}
 
 
-def determine_input_type(state: State):
-    """Determine if the user input is a question or a task using the Kimi model"""
-    user_input = state["user_task"]
+async def build_context_async(state: State):
+    """Async version of `build_context`; it only does file work, so it runs in a worker thread."""
+    return await asyncio.to_thread(build_context, state)
+
 
+def _input_type_steps(state: State):
     # Format the prompt with the user input
     formatted_prompt = input_type_determination_prompt.format(
-        user_input=user_input
+        user_input=state["user_task"]
     )
 
     print("Invoking LLM to determine if input is a question or task...")
-    result = kimi_llm.invoke(formatted_prompt)
+    result = yield _ModelCall(cached_model(ai_models.get_model("kimi_llm")), formatted_prompt)
 
     # Parse the response to determine if it's a question or task
     response_text = result.content.lower()
@@ -138,66 +282,181 @@ def determine_input_type(state: State):
     return {"input_type": input_type}
 
 
-def answer_question(state: State):
-    """Answer a question using the Kimi model"""
-    user_input = state["user_task"]
-    context = state.get("context", "")
+def determine_input_type(state: State):
+    """Determine if the user input is a question or a task using the Kimi model"""
+    return _run_steps(_input_type_steps(state))
+
+
+async def determine_input_type_async(state: State):
+    """Async version of `determine_input_type`."""
+    return await _arun_steps(_input_type_steps(state))
+
+
+# The async nodes write streamed output to disk in batches of this many characters, or at least this often.
+STREAM_FILE_BATCH_CHARS = 4096
+STREAM_FILE_BATCH_SECONDS = 0.25
+
+
+def _token_writer():
+    """LangGraph's custom stream writer, or a no-op when the node is called outside a graph run."""
+    try:
+        return get_stream_writer()
+    except RuntimeError:
+        return lambda chunk: None
+
+
+def _chunk_text(chunk) -> str:
+    return chunk.content if isinstance(chunk.content, str) else ""
+
+
+def _write_and_flush(output_file, text: str) -> None:
+    output_file.write(text)
+    output_file.flush()
+
+
+def _stream_to_file(chunks: Iterable, file_name: str, node: str) -> str:
+    """
+    Writes streamed model output to a file in the working directory as it arrives.
+
+    Every chunk is also pushed to the graph's "custom" stream as {"node": ..., "token": ...},
+    so callers using `graph.stream(..., stream_mode="custom")` see tokens as they are generated.
+
+    Args:
+        chunks (Iterable): The chunks from `model.stream(...)`.
+        file_name (str): Output file, relative to the working directory.
+        node (str): Node name attached to each streamed token.
 
+    Returns:
+        str: The full generated text.
+    """
+    writer = _token_writer()
+    parts = []
+    output_path = os.path.join(os.getcwd(), file_name)
+    with open(output_path, 'w', encoding='utf-8') as output_file:
+        for chunk in chunks:
+            text = _chunk_text(chunk)
+            if not text:
+                continue
+            output_file.write(text)
+            output_file.flush()
+            writer({"node": node, "token": text})
+            parts.append(text)
+    invalidate_path(output_path)
+    return "".join(parts)
+
+
+async def _astream_to_file(chunks: AsyncIterable, file_name: str, node: str) -> str:
+    """
+    Async version of `_stream_to_file`, for the chunks from `model.astream(...)`.
+
+    Tokens reach the "custom" stream as they arrive. The file is opened, written and closed in
+    worker threads, in batches of STREAM_FILE_BATCH_CHARS characters or STREAM_FILE_BATCH_SECONDS
+    seconds, so the event loop never waits for the disk.
+    """
+    writer = _token_writer()
+    parts = []
+    pending = []
+    pending_chars = 0
+    output_path = os.path.join(os.getcwd(), file_name)
+    output_file = await asyncio.to_thread(open, output_path, 'w', encoding='utf-8')
+    try:
+        last_write = time.monotonic()
+        async for chunk in chunks:
+            text = _chunk_text(chunk)
+            if not text:
+                continue
+            writer({"node": node, "token": text})
+            parts.append(text)
+            pending.append(text)
+            pending_chars += len(text)
+            if pending_chars >= STREAM_FILE_BATCH_CHARS or time.monotonic() - last_write >= STREAM_FILE_BATCH_SECONDS:
+                await asyncio.to_thread(_write_and_flush, output_file, "".join(pending))
+                pending.clear()
+                pending_chars = 0
+                last_write = time.monotonic()
+        if pending:
+            await asyncio.to_thread(_write_and_flush, output_file, "".join(pending))
+    finally:
+        await asyncio.to_thread(output_file.close)
+    await asyncio.to_thread(invalidate_path, output_path)
+    return "".join(parts)
+
+
+def _answer_steps(state: State):
     # Format the prompt with the user input and context
     formatted_prompt = answer_question_prompt.format(
-        user_input=user_input,
-        context=context
+        user_input=state["user_task"],
+        context=state.get("context", "")
     )
 
     print("Invoking LLM to answer the question...")
-    result = kimi_llm.invoke(formatted_prompt)
+    content = yield _StreamToFile(ai_models.get_model("kimi_llm"), formatted_prompt, 'answer.md', "answer_question")
 
-    # Save the answer to a file
-    output_path = os.path.join(os.getcwd(), 'answer.md')
-    with open(output_path, 'w', encoding='utf-8') as output_file:
-        output_file.write(result.content)
+    return {"messages": [HumanMessage(content=content)], "answer": content}
 
-    return {"messages": [HumanMessage(content=result.content)], "answer": result.content}
 
+def answer_question(state: State):
+    """Answer a question using the Kimi model, streaming the answer into answer.md"""
+    return _run_steps(_answer_steps(state))
 
-def make_plan(state: State):
-    """Plan the changes"""
-    user_task = state["user_task"]
-    context = state["context"]
-    agent_metadata = state["agent_metadata"]
 
+async def answer_question_async(state: State):
+    """Async version of `answer_question`."""
+    return await _arun_steps(_answer_steps(state))
 
+
+def _plan_steps(state: State):
     instruction = make_plan_instruction.format(
-        user_task=user_task,
-        context=context,
-        agent_metadata=agent_metadata
+        user_task=state["user_task"],
+        context=state["context"],
+        agent_metadata=state["agent_metadata"]
     )
+    print(f"Invoking LLM to make a plan with ~{estimate_tokens(instruction)} prompt tokens...")
 
-    result = gpt5.invoke(instruction)
-    output_path = os.path.join(os.getcwd(), 'example.md')
-    with open(output_path, 'w', encoding='utf-8') as output_file:
-        output_file.write(result.content)
+    content = yield _StreamToFile(ai_models.get_model("gpt5"), instruction, 'example.md', "make_plan")
+    plan = content.split("</think>")[-1]
 
-    plan = result.content.split("</think>")[-1]
+    return {"messages": [HumanMessage(content=content)], "plan": plan}
 
-    return {"messages": [HumanMessage(content=result.content)], "plan": plan}
+
+def make_plan(state: State):
+    """Plan the changes, streaming the plan into example.md"""
+    return _run_steps(_plan_steps(state))
+
+
+async def make_plan_async(state: State):
+    """Async version of `make_plan`."""
+    return await _arun_steps(_plan_steps(state))
 
 class CommitMessage(BaseModel):
     message: str = Field(..., description="Commit message")
 
 
-def push_to_git(state: State):
-    """Push to git"""
-    user_task = state["user_task"]
+def _release_run_executor(state: State) -> None:
+    """Closes the shell of a run that had no thread id; threads keep theirs for the next turn."""
+    if state.get("executor_key"):
+        bash_executor_pool.release(state["executor_key"])
 
 
-    structured_model = gemini_flash_lite.with_structured_output(CommitMessage)
+def _push_to_git_steps(state: State):
+    _release_run_executor(state)
+    structured_model = cached_model(ai_models.get_model("gemini_flash_lite")).with_structured_output(CommitMessage)
     formatted_prompt = commit_message_instruction.format(
-        user_task=user_task,
+        user_task=state["user_task"],
     )
 
-    commit_message = structured_model.invoke(formatted_prompt)
+    commit_message = yield _ModelCall(structured_model, formatted_prompt)
 
     git_commit_push("/home/nnikolovskii/notes", commit_message.message)
 
     return {}
+
+
+def push_to_git(state: State):
+    """Push to git"""
+    return _run_steps(_push_to_git_steps(state))
+
+
+async def push_to_git_async(state: State):
+    """Async version of `push_to_git`; the git commands run in a worker thread."""
+    return await _arun_steps(_push_to_git_steps(state))
@@ -0,0 +1,170 @@
+"""Persistent response cache for the chat models.
+
+`SQLiteLLMCache` implements LangChain's `BaseCache`, so a cache hit is answered by the chat
+model itself and never reaches the network. Entries are keyed by a hash of the model
+configuration (model name, parameters, bound tools or structured-output schema) and the
+prompt, expire after a TTL, and the least recently used entries are evicted once the
+database grows past its size budget.
+
+Caching is opt-in per node: wrap a model with `cached_model(...)` where the same prompt is
+expected to produce the same answer (classification, file exploration, commit messages).
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+
+DEFAULT_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(os.getcwd(), ".llm_cache.sqlite3"))
+DEFAULT_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+DEFAULT_MAX_CACHE_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+
+class SQLiteLLMCache(BaseCache):
+    """
+    LangChain cache stored in a SQLite database.
+
+    Args:
+        database_path (str): Path of the SQLite file. It is created on first use.
+        ttl_seconds (float, optional): Entries older than this are ignored and deleted. None keeps them forever.
+        max_bytes (int): Once the stored responses exceed this, the least recently used are evicted.
+    """
+
+    def __init__(self, database_path: str = DEFAULT_CACHE_PATH,
+                 ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS,
+                 max_bytes: int = DEFAULT_MAX_CACHE_BYTES):
+        self.database_path = database_path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            directory = os.path.dirname(self.database_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.database_path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+            connection.commit()
+            self._connection = connection
+        return self._connection
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        """Returns the cached generations for this prompt and model configuration, if any."""
+        key = self._key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                connection.commit()
+                self.misses += 1
+                return None
+            connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            connection.commit()
+            self.hits += 1
+
+        try:
+            return loads(row[0])
+        except Exception as e:
+            print(f"Error loading cached LLM response: {e}")
+            return None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        """Stores the generations for this prompt and model configuration."""
+        try:
+            value = dumps(list(return_val))
+        except Exception as e:
+            print(f"Error serializing LLM response for the cache: {e}")
+            return
+
+        key = self._key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), now, now),
+            )
+            self._evict(connection)
+            connection.commit()
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        if self.ttl_seconds is not None:
+            connection.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+
+        total_size = connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total_size <= self.max_bytes:
+            return
+
+        excess = total_size - self.max_bytes
+        evicted_keys = []
+        for key, size in connection.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            evicted_keys.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        connection.executemany("DELETE FROM responses WHERE key = ?", evicted_keys)
+
+    def clear(self, **kwargs: Any) -> None:
+        """Deletes every cached response."""
+        with self._lock:
+            connection = self._connect()
+            connection.execute("DELETE FROM responses")
+            connection.commit()
+
+
+llm_response_cache = SQLiteLLMCache()
+
+# id(model) -> (model, cached copy); the model is kept so its id cannot be reused.
+_cached_models: Dict[int, Tuple[Any, Any]] = {}
+_cached_models_lock = threading.Lock()
+
+
+def cached_model(model, cache: Optional[BaseCache] = None):
+    """
+    Returns a copy of a chat model that answers repeated prompts from the response cache.
+
+    The original model is left uncached. Set LLM_CACHE_DISABLED=1 to bypass the cache everywhere.
+
+    Args:
+        model (BaseChatModel): The model to wrap, e.g. `kimi_llm` or `gemini_flash_lite`.
+        cache (BaseCache, optional): Cache to use. Defaults to the shared SQLite cache.
+
+    Returns:
+        BaseChatModel: The cached copy, created once per model.
+    """
+    if os.getenv("LLM_CACHE_DISABLED"):
+        return model
+
+    cache = llm_response_cache if cache is None else cache
+    key = id(model) if cache is llm_response_cache else None
+    with _cached_models_lock:
+        if key is not None and key in _cached_models:
+            return _cached_models[key][1]
+        copy = model.model_copy(update={"cache": cache})
+        if key is not None:
+            _cached_models[key] = (model, copy)
+        return copy
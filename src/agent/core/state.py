@@ -4,6 +4,7 @@ from typing import Annotated, TypedDict, List, Dict
 
 from langgraph.graph import add_messages
 
+from ..models.step_models import Step
 from ..models.task_models import Task
 
 
@@ -12,6 +13,8 @@ class State(TypedDict):
     messages: Annotated[list, add_messages]
     project_path: str
     context: str
+    context_block_sizes: Dict[str, int]
+    priority_file_paths: List[str]
     user_task: str
     all_file_paths: Annotated[set, lambda x, y: x.union(y)]
     project_structure: str
@@ -19,6 +22,12 @@ class State(TypedDict):
     tasks: List[Task]
     current_task_index: int
     task_message_indices: Dict[int, int]
+    steps: List[Step]
+    current_step_index: int
+    step_message_indices: Dict[int, int]
     input_type: str
     answer: str
     agent_metadata: str
+    context_token_budget: int
+    context_tokens: int
+    executor_key: str
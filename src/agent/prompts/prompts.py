@@ -131,24 +131,32 @@ segment_plan_into_steps = """Below is a given plan of actions. Your job is to de
 {plan}
 """
 
-agent_instruction = """You are a helpful assistant which job is to complete the user's task. You will be given the current step that you have to complete, all the previous steps you have completed, and the whole plan you have generated before starting anything.
+# The agent's prompt, split into chat messages. The system message is identical for every turn of a
+# run, so providers can cache it as a prompt prefix; the action history is sent as the chat messages
+# that follow the step instruction.
+agent_system_instruction = """You are a helpful assistant which job is to complete the user's task. You will be given the current step that you have to complete, all the previous steps you have completed, and the whole plan you have generated before starting anything.
 You will also be given tools if you need to use them.
-Below you will be given your action history of the current step for you to know the progress and which step you are at.
-
-# Current step:
-{current_step}
-
-# Previous finished steps:
-{previous_steps}
+The messages after the current step are your action history of the current step for you to know the progress and which step you are at.
 
 # Folder structure:
 {project_structure}
 
 # Plan:
 {plan}
+"""
+
+agent_step_instruction = """# Current step:
+{current_step}
+
+# Previous finished steps:
+{previous_steps}
+"""
+
+summarize_history_instruction = """Summarize the actions below that an agent performed while working on one step of a plan.
+Keep every fact the agent will need to continue: files it viewed or changed, commands it ran and their important results, and errors it hit. Be concise.
 
-# Action history:
-{action_history}
+# Actions:
+{history}
 """
 
 commit_message_instruction = """Generate a commit message that will be used to commit the changes to the Git repository.
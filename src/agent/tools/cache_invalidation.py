@@ -0,0 +1,37 @@
+"""Keeps the file caches in step with the agent's own writes.
+
+A filesystem watcher reports changes asynchronously, so a node that renders the tree or
+reads a file right after a tool wrote to it could still see the old state. Every code path
+that writes into a project calls `invalidate_path` before it returns; the watcher, when
+there is one, still reports the same change later, which costs one more directory listing.
+A shell command can change anything, so after one the whole project is revalidated.
+"""
+
+from .file_cache import file_content_cache
+from .metadata_index import invalidate_metadata_indexes
+from .tree_cache import invalidate_tree_snapshots
+
+
+def invalidate_path(path: str) -> None:
+    """
+    Drops what the content, tree and metadata caches know about a path that was just written.
+
+    Args:
+        path (str): The file that was created, modified or replaced.
+    """
+    file_content_cache.invalidate(path)
+    invalidate_tree_snapshots(path)
+    invalidate_metadata_indexes(path)
+
+
+def invalidate_directory(path: str) -> None:
+    """
+    Drops what the tree and metadata caches know about everything under a directory.
+
+    File contents are validated by mtime and size on every read, so they need no invalidation.
+
+    Args:
+        path (str): The directory in which something may have changed, e.g. where a shell command ran.
+    """
+    invalidate_tree_snapshots(path, recursive=True)
+    invalidate_metadata_indexes(path, recursive=True)
@@ -0,0 +1,152 @@
+"""Removal of comments from Python source files.
+
+`strip_python_comments` scans the source with one compiled regular expression that matches
+string literals (single, triple-quoted, with prefixes and escapes) and comments. Strings
+are copied unchanged and comments are dropped, so a '#' inside a string or docstring is
+never touched. `strip_comments_in_files` runs it over many files in a process pool and
+replaces each changed file atomically.
+"""
+
+import os
+import re
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from .cache_invalidation import invalidate_path
+
+# Below this many files a process pool costs more to start than it saves.
+MIN_FILES_FOR_POOL = 32
+_POOL_CHUNK_SIZE = 16
+
+# String prefixes (r, b, f, u) do not change where a literal ends: even in raw strings a
+# backslash keeps the next quote from closing it, so they need no special handling. The
+# literals use the "unrolled loop" form, which cannot backtrack catastrophically. Every
+# alternative starts with a literal character and none is wrapped in a group, which lets the
+# regex engine skip ahead to the next quote or '#' instead of trying each position.
+_TRIPLE_DOUBLE = r'"""[^"\\]*(?:(?:\\.|"(?!""))[^"\\]*)*"""'
+_TRIPLE_SINGLE = r"'''[^'\\]*(?:(?:\\.|'(?!''))[^'\\]*)*'''"
+_DOUBLE = r'"[^"\\\n]*(?:\\.[^"\\\n]*)*"'
+_SINGLE = r"'[^'\\\n]*(?:\\.[^'\\\n]*)*'"
+_STRING_OR_COMMENT = re.compile(
+    f"{_TRIPLE_DOUBLE}|{_TRIPLE_SINGLE}|{_DOUBLE}|{_SINGLE}|#[^\\r\\n]*",
+    re.DOTALL,
+)
+_CODING_COOKIE = re.compile(r"#.*?coding[:=][ \t]*[-\w.]+")
+_WHITESPACE_ONLY_LINE = re.compile(r"\n[ \t]+\n")
+_REPEATED_EMPTY_LINES = re.compile(r"\n\n\n+")
+
+
+def _is_directive(comment: str, start: int) -> bool:
+    """True for a shebang or encoding declaration, which change how the file is run or read."""
+    return (start == 0 and comment.startswith("#!")) or bool(_CODING_COOKIE.match(comment))
+
+
+def strip_python_comments(code: str) -> str:
+    """
+    Removes comments from Python code while preserving strings and docstrings.
+
+    Whitespace before a removed comment is dropped with it. A shebang line and an encoding
+    declaration are kept. f-strings are treated like other literals, which is exact up to
+    Python 3.11; the 3.12 syntax that reuses the outer quote inside a replacement field is not
+    recognized.
+
+    Args:
+        code (str): The Python code to process
+
+    Returns:
+        str: The code with comments removed
+    """
+    # Directives are only recognized on the first two lines.
+    first_line_end = code.find("\n")
+    directive_end = code.find("\n", first_line_end + 1) if first_line_end != -1 else len(code)
+    if directive_end == -1:
+        directive_end = len(code)
+
+    pieces = []
+    position = 0
+    for match in _STRING_OR_COMMENT.finditer(code):
+        start = match.start()
+        if code[start] != "#":
+            continue
+        if start < directive_end and _is_directive(match.group(), start):
+            continue
+        pieces.append(code[position:start].rstrip(" \t"))
+        position = match.end()
+    if not pieces:
+        return code
+    pieces.append(code[position:])
+    return "".join(pieces)
+
+
+def clean_empty_lines(code: str) -> str:
+    """Turns whitespace-only lines into empty lines, collapses runs of empty lines and trims the ends."""
+    code = _WHITESPACE_ONLY_LINE.sub("\n\n", code)
+    # Applied twice because adjacent whitespace-only lines share their newlines.
+    code = _WHITESPACE_ONLY_LINE.sub("\n\n", code)
+    code = _REPEATED_EMPTY_LINES.sub("\n\n", code)
+    return code.strip("\n") + "\n"
+
+
+def _write_atomic(file_path: str, content: str) -> None:
+    """Writes through a temporary file in the same directory, so readers never see a partial file."""
+    directory = os.path.dirname(os.path.abspath(file_path))
+    descriptor, temporary_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".py")
+    try:
+        with os.fdopen(descriptor, "w", encoding="utf-8") as f:
+            f.write(content)
+        shutil.copymode(file_path, temporary_path)
+        os.replace(temporary_path, file_path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+
+def strip_comments_in_file(file_path: str, clean_empty: bool = True) -> Tuple[str, Optional[str]]:
+    """
+    Removes the comments from one file in place.
+
+    Returns:
+        Tuple[str, Optional[str]]: The path and an error message, or None if it succeeded.
+    """
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            content = f.read()
+
+        modified_content = strip_python_comments(content)
+        if clean_empty:
+            modified_content = clean_empty_lines(modified_content)
+
+        if modified_content != content:
+            _write_atomic(file_path, modified_content)
+        return file_path, None
+    except Exception as e:
+        return file_path, str(e)
+
+
+def strip_comments_in_files(file_paths: List[str], clean_empty: bool = True,
+                            max_workers: Optional[int] = None) -> List[Tuple[str, Optional[str]]]:
+    """
+    Removes the comments from many files, in a process pool when there are enough of them.
+
+    Args:
+        file_paths (List[str]): The Python files to rewrite.
+        clean_empty (bool): Also collapse empty lines, see `clean_empty_lines`.
+        max_workers (int, optional): Pool size. Defaults to the number of CPUs.
+
+    Returns:
+        List[Tuple[str, Optional[str]]]: (path, error or None) per file, in input order.
+    """
+    if len(file_paths) < MIN_FILES_FOR_POOL or max_workers == 1:
+        results = [strip_comments_in_file(path, clean_empty) for path in file_paths]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(strip_comments_in_file, file_paths, [clean_empty] * len(file_paths),
+                                    chunksize=_POOL_CHUNK_SIZE))
+
+    # The workers cannot reach this process's caches, so the rewritten files are reported here.
+    for path, error in results:
+        if error is None:
+            invalidate_path(path)
+    return results
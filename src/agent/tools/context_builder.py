@@ -0,0 +1,122 @@
+"""Incremental assembly of the file context sent to the LLM.
+
+`ContextBuilder` keeps one rendered block per file, in order. Adding files only reads
+the new ones and removing files only drops their blocks, so a reflection pass costs
+work proportional to what changed rather than to the whole context.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .file_utils import (
+    iter_path_blocks,
+    split_file_blocks,
+)
+
+
+class ContextBuilder:
+    """
+    Ordered, editable collection of file blocks in the `concat_files_in_str` format.
+
+    Args:
+        max_file_size (int, optional): Per-file size budget passed to the loader. None disables the limit.
+        max_total_size (int, optional): Files that would push the context over this are skipped.
+                                        None disables the limit.
+    """
+
+    def __init__(self, max_file_size: Optional[int] = None, max_total_size: Optional[int] = None):
+        self.max_file_size = max_file_size
+        self.max_total_size = max_total_size
+        self.total_size = 0
+        self._blocks: Dict[str, str] = {}
+        self._rendered: Optional[str] = ""
+
+    @classmethod
+    def from_context(cls, context: str, block_sizes: Dict[str, int], **kwargs) -> "ContextBuilder":
+        """
+        Rebuilds a builder from a rendered context and its `block_sizes`, without touching disk.
+
+        See `split_file_blocks` for how the blocks are located.
+
+        Args:
+            context (str): A string returned by `render()`.
+            block_sizes (Dict[str, int]): The builder's `block_sizes` at the time.
+
+        Returns:
+            ContextBuilder: A builder whose `render()` returns `context`.
+        """
+        builder = cls(**kwargs)
+        for file_path, block in split_file_blocks(context, block_sizes):
+            builder._blocks[file_path] = block
+            builder.total_size += len(block)
+
+        builder._rendered = None
+        return builder
+
+    @property
+    def file_paths(self) -> List[str]:
+        """Paths currently in the context, in order."""
+        return list(self._blocks)
+
+    @property
+    def block_sizes(self) -> Dict[str, int]:
+        """Path -> length of its block, in order; keep it with the rendered context to split it again."""
+        return {file_path: len(block) for file_path, block in self._blocks.items()}
+
+    def __contains__(self, file_path: str) -> bool:
+        return file_path in self._blocks
+
+    def add_files(self, file_paths: Iterable[str]) -> List[str]:
+        """
+        Appends blocks for the given files, reading only files not already in the context.
+
+        Args:
+            file_paths (Iterable[str]): Paths to add.
+
+        Returns:
+            List[str]: The paths that were actually added.
+        """
+        new_paths = [path for path in dict.fromkeys(file_paths) if path not in self._blocks]
+        if not new_paths:
+            return []
+
+        remaining = None if self.max_total_size is None else max(self.max_total_size - self.total_size, 0)
+        added = []
+        for file_path, block in iter_path_blocks(new_paths, self.max_file_size, remaining):
+            self._blocks[file_path] = block
+            self.total_size += len(block)
+            added.append(file_path)
+
+        if added:
+            self._rendered = None
+        return added
+
+    def remove_files(self, file_paths: Iterable[str]) -> List[str]:
+        """
+        Drops the blocks of the given files.
+
+        Args:
+            file_paths (Iterable[str]): Paths to remove. Paths not in the context are ignored.
+
+        Returns:
+            List[str]: The paths that were actually removed.
+        """
+        removed = []
+        for file_path in file_paths:
+            block = self._blocks.pop(file_path, None)
+            if block is not None:
+                self.total_size -= len(block)
+                removed.append(file_path)
+
+        if removed:
+            self._rendered = None
+        return removed
+
+    def items(self) -> List[Tuple[str, str]]:
+        """(file path, block) pairs currently in the context, in order."""
+        return list(self._blocks.items())
+
+    def render(self) -> str:
+        """Returns the context string; memoized until the next add or remove."""
+        if self._rendered is None:
+            self._rendered = "".join(self._blocks.values())
+        return self._rendered
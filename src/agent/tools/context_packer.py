@@ -0,0 +1,186 @@
+"""Token-budgeted packing of file context.
+
+`pack_context` fills a token budget with file blocks in priority order: files the caller marks
+as priority first, then the rest in context order. Files that do not fit whole fall back to an
+outline (definition lines only) or to a truncated head, whichever fits with more content, and
+the result reports how many tokens were used so callers can cap latency and cost per request.
+"""
+
+import hashlib
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Iterable, List, Literal, Tuple
+
+from pydantic import BaseModel, Field
+
+from .file_utils import FILE_TITLE_FORMAT, format_file_block
+
+DEFAULT_CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "100000"))
+
+# Below this many tokens a truncated file is not worth including.
+MIN_TRUNCATED_TOKENS = 200
+
+_TOKEN_PIECE_PATTERN = re.compile(r"\w+|[^\w\s]")
+_OUTLINE_PATTERN = re.compile(
+    r"^\s*(?:@\w+|(?:async\s+)?def\s|class\s|(?:export\s+)?(?:default\s+)?(?:async\s+)?function\b|"
+    r"export\s|interface\s|type\s+\w+\s*=|enum\s|struct\s|impl\b|fn\s|func\s|"
+    r"(?:public|private|protected)\s|import\s|from\s+\S+\s+import\s)"
+)
+_MARKDOWN_HEADING_PATTERN = re.compile(r"^#{1,6}\s")
+
+_MAX_CACHED_ESTIMATES = 50_000
+_token_estimates: "OrderedDict[bytes, int]" = OrderedDict()
+_token_estimates_lock = threading.Lock()
+
+
+class PackedFile(BaseModel):
+    file_path: str = Field(description="Path of the file.")
+    mode: Literal["full", "outline", "truncated", "omitted"] = Field(
+        description="How much of the file made it into the context."
+    )
+    tokens: int = Field(description="Estimated tokens of the file's block in the packed context.")
+
+
+class PackedContext(BaseModel):
+    context: str = Field(description="The packed context string.")
+    used_tokens: int = Field(description="Estimated tokens of the packed context.")
+    budget_tokens: int = Field(description="The token budget the context was packed into.")
+    files: List[PackedFile] = Field(description="Outcome for each input file, in input order.")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimates the number of tokens in a text without running a real tokenizer.
+
+    Every word or punctuation mark is at least one token and long runs average about four
+    characters per token, so the estimate is the larger of the two. Results are cached by
+    content hash, so re-estimating an unchanged file only costs a hash.
+
+    Args:
+        text (str): The text to estimate.
+
+    Returns:
+        int: Estimated token count.
+    """
+    if not text:
+        return 0
+
+    digest = hashlib.blake2b(text.encode("utf-8", errors="surrogatepass"), digest_size=16).digest()
+    with _token_estimates_lock:
+        cached = _token_estimates.get(digest)
+        if cached is not None:
+            _token_estimates.move_to_end(digest)
+            return cached
+
+    estimate = _estimate_tokens_uncached(text)
+
+    with _token_estimates_lock:
+        _token_estimates[digest] = estimate
+        if len(_token_estimates) > _MAX_CACHED_ESTIMATES:
+            _token_estimates.popitem(last=False)
+    return estimate
+
+
+def _estimate_tokens_uncached(text: str) -> int:
+    pieces = sum(1 for _ in _TOKEN_PIECE_PATTERN.finditer(text))
+    return max(math.ceil(len(text) / 4), pieces)
+
+
+def outline_text(file_path: str, content: str) -> str:
+    """
+    Keeps only the lines that outline a file: imports, definitions and markdown headings.
+
+    Args:
+        file_path (str): Path of the file, used to pick the outline rules.
+        content (str): The file content.
+
+    Returns:
+        str: The outline, or an empty string if nothing looked like a definition.
+    """
+    pattern = _MARKDOWN_HEADING_PATTERN if file_path.lower().endswith((".md", ".markdown")) else _OUTLINE_PATTERN
+    lines = [line for line in content.splitlines() if pattern.match(line)]
+    return "\n".join(lines)
+
+
+def _truncate_to_tokens(content: str, max_tokens: int) -> str:
+    """
+    Cuts `content` at a line boundary so that it fits roughly in `max_tokens`.
+
+    A prefix is estimated as the larger of its length / 4 and the number of token pieces that
+    start in it, so the longest prefix that fits ends at 4 * `max_tokens` characters or where
+    piece number `max_tokens + 1` starts, whichever comes first. One scan finds that piece.
+    """
+    length = min(len(content), 4 * max(max_tokens, 0))
+    for count, match in enumerate(_TOKEN_PIECE_PATTERN.finditer(content, 0, length)):
+        if count == max_tokens:
+            length = match.start()
+            break
+
+    head = content[:length]
+    line_end = head.rfind("\n")
+    return head[:line_end] if line_end > 0 else head
+
+
+def block_content(file_path: str, block: str) -> str:
+    """Strips the title and trailing separator that `format_file_block` put around a file's content."""
+    content = block[len(FILE_TITLE_FORMAT.format(file_path=file_path)) + 1:]
+    return content[:-2] if content.endswith("\n\n") else content
+
+
+def pack_context(files: List[Tuple[str, str]], budget_tokens: int = DEFAULT_CONTEXT_TOKEN_BUDGET,
+                 priority_paths: Iterable[str] = ()) -> PackedContext:
+    """
+    Packs file contents into a token budget, highest priority first.
+
+    Each file is included whole if it fits. Otherwise, of its outline and a truncated head of at
+    least MIN_TRUNCATED_TOKENS tokens, the one that fits with more content is used, and if
+    neither fits the file is omitted.
+    The packed blocks keep the order of `files`; priority only decides who gets the budget first.
+
+    Args:
+        files (List[Tuple[str, str]]): (file path, content) pairs in context order.
+        budget_tokens (int, optional): Token budget for the whole context.
+                                       Defaults to DEFAULT_CONTEXT_TOKEN_BUDGET.
+        priority_paths (Iterable[str], optional): Files to pack before all others, most important
+                                                  first, e.g. the files the user asked for.
+                                                  The other files follow in context order.
+
+    Returns:
+        PackedContext: The packed context string and a per-file report.
+    """
+    rank = {file_path: index for index, file_path in enumerate(dict.fromkeys(priority_paths))}
+    packing_order = sorted(range(len(files)), key=lambda index: (rank.get(files[index][0], len(rank)), index))
+    blocks = [""] * len(files)
+    report = [None] * len(files)
+    used_tokens = 0
+
+    for index in packing_order:
+        file_path, content = files[index]
+        remaining = budget_tokens - used_tokens
+        title_tokens = estimate_tokens(format_file_block(file_path, ""))
+
+        candidates = [("full", content)]
+        if remaining - title_tokens < estimate_tokens(content):
+            candidates = []
+            outline = outline_text(file_path, content)
+            if outline:
+                candidates.append(("outline", f"{outline}\n... [outline only: full file omitted to fit the token budget]"))
+            if remaining - title_tokens >= MIN_TRUNCATED_TOKENS:
+                head = _truncate_to_tokens(content, remaining - title_tokens - 20)
+                candidates.append(("truncated", f"{head}\n... [truncated to fit the token budget]"))
+
+        fitting = [(title_tokens + estimate_tokens(text), mode, text) for mode, text in candidates]
+        fitting = [candidate for candidate in fitting if candidate[0] <= remaining]
+        if fitting:
+            # The candidate with the most tokens carries the most of the file.
+            block_tokens, mode, text = max(fitting, key=lambda candidate: candidate[0])
+            blocks[index] = format_file_block(file_path, text)
+            used_tokens += block_tokens
+            report[index] = PackedFile(file_path=file_path, mode=mode, tokens=block_tokens)
+        else:
+            report[index] = PackedFile(file_path=file_path, mode="omitted", tokens=0)
+
+    return PackedContext(context="".join(blocks), used_tokens=used_tokens, budget_tokens=budget_tokens, files=report)
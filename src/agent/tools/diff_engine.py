@@ -0,0 +1,272 @@
+"""Line diff algorithms used by `diff_utils.generate_diff`.
+
+Lines are interned to integer ids first, so every comparison in the inner loops is an int
+comparison instead of a string comparison. Two algorithms are available:
+
+- "myers": Myers' O(ND) algorithm in its linear-space (middle snake) form. It finds a
+  shortest edit script, so hunks are as small as possible.
+- "patience": patience diff. It anchors on lines that occur exactly once in both files
+  and runs Myers between the anchors. The result is often easier to read when blocks of
+  code move or are reordered, at the cost of not always being minimal.
+
+Both return matching blocks in the same form as `difflib.SequenceMatcher.get_matching_blocks`
+(without the trailing sentinel): a list of (i, j, size) triples, increasing in i and j.
+"""
+
+from bisect import bisect_left
+from typing import Dict, Hashable, List, Sequence, Tuple
+
+ALGORITHMS = ("myers", "patience")
+
+Block = Tuple[int, int, int]
+
+
+def intern_lines(original: Sequence[Hashable], modified: Sequence[Hashable]) -> Tuple[List[int], List[int]]:
+    """Maps equal lines to equal small integers so the diff compares ints instead of strings."""
+    ids: Dict[Hashable, int] = {}
+    original_ids = [ids.setdefault(line, len(ids)) for line in original]
+    modified_ids = [ids.setdefault(line, len(ids)) for line in modified]
+    return original_ids, modified_ids
+
+
+def _middle_snake(a: List[int], a_lo: int, a_hi: int, b: List[int], b_lo: int, b_hi: int) -> Tuple[int, int, int, int]:
+    """
+    Finds the middle snake of a shortest edit script between a[a_lo:a_hi] and b[b_lo:b_hi].
+
+    Returns (x, y, u, v): the snake runs diagonally from (x, y) to (u, v) in absolute indices.
+    """
+    n = a_hi - a_lo
+    m = b_hi - b_lo
+    delta = n - m
+    odd = delta & 1
+    max_d = (n + m + 1) // 2
+    offset = max_d + 1
+    forward = [0] * (2 * offset + 1)
+    backward = [0] * (2 * offset + 1)
+
+    for d in range(max_d + 1):
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and forward[offset + k - 1] < forward[offset + k + 1]):
+                x = forward[offset + k + 1]
+            else:
+                x = forward[offset + k - 1] + 1
+            y = x - k
+            start_x, start_y = x, y
+            while x < n and y < m and a[a_lo + x] == b[b_lo + y]:
+                x += 1
+                y += 1
+            forward[offset + k] = x
+            if odd and -(d - 1) <= delta - k <= d - 1 and x + backward[offset + delta - k] >= n:
+                return a_lo + start_x, b_lo + start_y, a_lo + x, b_lo + y
+
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and backward[offset + k - 1] < backward[offset + k + 1]):
+                x = backward[offset + k + 1]
+            else:
+                x = backward[offset + k - 1] + 1
+            y = x - k
+            start_x, start_y = x, y
+            while x < n and y < m and a[a_hi - 1 - x] == b[b_hi - 1 - y]:
+                x += 1
+                y += 1
+            backward[offset + k] = x
+            if not odd and -d <= delta - k <= d and x + forward[offset + delta - k] >= n:
+                return a_hi - x, b_hi - y, a_hi - start_x, b_hi - start_y
+
+    raise AssertionError("no middle snake found")
+
+
+def _myers_pairs(a: List[int], a_lo: int, a_hi: int, b: List[int], b_lo: int, b_hi: int,
+                 pairs: List[Tuple[int, int]]) -> None:
+    """Appends the matched (i, j) line pairs of a shortest edit script, in order."""
+    # Common prefix and suffix need no search.
+    while a_lo < a_hi and b_lo < b_hi and a[a_lo] == b[b_lo]:
+        pairs.append((a_lo, b_lo))
+        a_lo += 1
+        b_lo += 1
+    suffix_start = a_hi
+    while a_lo < a_hi and b_lo < b_hi and a[a_hi - 1] == b[b_hi - 1]:
+        a_hi -= 1
+        b_hi -= 1
+
+    if a_lo < a_hi and b_lo < b_hi:
+        x, y, u, v = _middle_snake(a, a_lo, a_hi, b, b_lo, b_hi)
+        _myers_pairs(a, a_lo, x, b, b_lo, y, pairs)
+        pairs.extend((x + step, y + step) for step in range(u - x))
+        _myers_pairs(a, u, a_hi, b, v, b_hi, pairs)
+
+    pairs.extend((a_hi + step, b_hi + step) for step in range(suffix_start - a_hi))
+
+
+def _pairs_to_blocks(pairs: List[Tuple[int, int]]) -> List[Block]:
+    blocks: List[Block] = []
+    for i, j in pairs:
+        if blocks:
+            last_i, last_j, size = blocks[-1]
+            if last_i + size == i and last_j + size == j:
+                blocks[-1] = (last_i, last_j, size + 1)
+                continue
+        blocks.append((i, j, 1))
+    return blocks
+
+
+def myers_blocks(a: List[int], b: List[int], a_lo: int = 0, a_hi: int = None,
+                 b_lo: int = 0, b_hi: int = None) -> List[Block]:
+    """
+    Matching blocks of a shortest edit script between two id sequences (Myers, linear space).
+
+    Args:
+        a (List[int]): Interned original lines.
+        b (List[int]): Interned modified lines.
+        a_lo, a_hi, b_lo, b_hi (int, optional): Restrict the diff to a[a_lo:a_hi] and b[b_lo:b_hi].
+
+    Returns:
+        List[Tuple[int, int, int]]: (i, j, size) blocks with a[i:i+size] == b[j:j+size].
+    """
+    a_hi = len(a) if a_hi is None else a_hi
+    b_hi = len(b) if b_hi is None else b_hi
+    pairs: List[Tuple[int, int]] = []
+    _myers_pairs(a, a_lo, a_hi, b, b_lo, b_hi, pairs)
+    return _pairs_to_blocks(pairs)
+
+
+def _unique_common_anchors(a: List[int], a_lo: int, a_hi: int, b: List[int], b_lo: int, b_hi: int) -> List[Tuple[int, int]]:
+    """Longest increasing sequence of (i, j) pairs for lines that occur exactly once on both sides."""
+    counts: Dict[int, List[int]] = {}
+    for i in range(a_lo, a_hi):
+        entry = counts.get(a[i])
+        if entry is None:
+            counts[a[i]] = [1, i, 0, -1]
+        else:
+            entry[0] += 1
+    for j in range(b_lo, b_hi):
+        entry = counts.get(b[j])
+        if entry is not None:
+            entry[2] += 1
+            entry[3] = j
+
+    candidates = sorted((entry[1], entry[3]) for entry in counts.values() if entry[0] == 1 and entry[2] == 1)
+
+    # Patience sorting on j gives the longest increasing subsequence.
+    pile_tops: List[int] = []
+    pile_items: List[int] = []
+    back_links: List[int] = []
+    for index, (_, j) in enumerate(candidates):
+        pile = bisect_left(pile_tops, j)
+        back_links.append(pile_items[pile - 1] if pile else -1)
+        if pile == len(pile_tops):
+            pile_tops.append(j)
+            pile_items.append(index)
+        else:
+            pile_tops[pile] = j
+            pile_items[pile] = index
+
+    anchors: List[Tuple[int, int]] = []
+    index = pile_items[-1] if pile_items else -1
+    while index != -1:
+        anchors.append(candidates[index])
+        index = back_links[index]
+    anchors.reverse()
+    return anchors
+
+
+def _patience_pairs(a: List[int], a_lo: int, a_hi: int, b: List[int], b_lo: int, b_hi: int,
+                    pairs: List[Tuple[int, int]]) -> None:
+    while a_lo < a_hi and b_lo < b_hi and a[a_lo] == b[b_lo]:
+        pairs.append((a_lo, b_lo))
+        a_lo += 1
+        b_lo += 1
+    suffix_start = a_hi
+    while a_lo < a_hi and b_lo < b_hi and a[a_hi - 1] == b[b_hi - 1]:
+        a_hi -= 1
+        b_hi -= 1
+
+    if a_lo < a_hi and b_lo < b_hi:
+        anchors = _unique_common_anchors(a, a_lo, a_hi, b, b_lo, b_hi)
+        if anchors:
+            previous_i, previous_j = a_lo, b_lo
+            for i, j in anchors:
+                _patience_pairs(a, previous_i, i, b, previous_j, j, pairs)
+                pairs.append((i, j))
+                previous_i, previous_j = i + 1, j + 1
+            _patience_pairs(a, previous_i, a_hi, b, previous_j, b_hi, pairs)
+        else:
+            _myers_pairs(a, a_lo, a_hi, b, b_lo, b_hi, pairs)
+
+    pairs.extend((a_hi + step, b_hi + step) for step in range(suffix_start - a_hi))
+
+
+def patience_blocks(a: List[int], b: List[int]) -> List[Block]:
+    """Matching blocks from patience diff, falling back to Myers where there are no unique anchors."""
+    pairs: List[Tuple[int, int]] = []
+    _patience_pairs(a, 0, len(a), b, 0, len(b), pairs)
+    return _pairs_to_blocks(pairs)
+
+
+def matching_blocks(original: Sequence[Hashable], modified: Sequence[Hashable], algorithm: str = "myers") -> List[Block]:
+    """
+    Matching blocks between two line sequences.
+
+    Args:
+        original (Sequence): Original lines.
+        modified (Sequence): Modified lines.
+        algorithm (str): "myers" (minimal) or "patience".
+
+    Returns:
+        List[Tuple[int, int, int]]: (i, j, size) blocks, increasing in i and j.
+    """
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Unknown diff algorithm: {algorithm}. Expected one of {ALGORITHMS}")
+    a, b = intern_lines(original, modified)
+    if algorithm == "patience":
+        return patience_blocks(a, b)
+    return myers_blocks(a, b)
+
+
+def grouped_opcodes(blocks: List[Block], original_length: int, modified_length: int,
+                    context: int = 3) -> List[List[Tuple[str, int, int, int, int]]]:
+    """
+    Groups the edits between matching blocks into hunks with `context` lines around them.
+
+    Returns:
+        List of hunks, each a list of (tag, i1, i2, j1, j2) opcodes as in difflib, where tag is
+        "equal", "delete", "insert" or "replace".
+    """
+    opcodes = []
+    i = j = 0
+    for block_i, block_j, size in blocks + [(original_length, modified_length, 0)]:
+        if i < block_i and j < block_j:
+            opcodes.append(("replace", i, block_i, j, block_j))
+        elif i < block_i:
+            opcodes.append(("delete", i, block_i, j, block_j))
+        elif j < block_j:
+            opcodes.append(("insert", i, block_i, j, block_j))
+        if size:
+            opcodes.append(("equal", block_i, block_i + size, block_j, block_j + size))
+        i, j = block_i + size, block_j + size
+
+    hunks = []
+    current = []
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag != "equal":
+            current.append((tag, i1, i2, j1, j2))
+            continue
+        if not current:
+            # Leading context of the first hunk.
+            if i2 - i1 > context:
+                i1, j1 = i2 - context, j2 - context
+            current.append((tag, i1, i2, j1, j2))
+            continue
+        if i2 - i1 > 2 * context:
+            current.append((tag, i1, i1 + context, j1, j1 + context))
+            hunks.append(current)
+            current = [(tag, i2 - context, i2, j2 - context, j2)]
+        else:
+            current.append((tag, i1, i2, j1, j2))
+
+    if current and not (len(current) == 1 and current[0][0] == "equal"):
+        tag, i1, i2, j1, j2 = current[-1]
+        if tag == "equal" and i2 - i1 > context:
+            current[-1] = (tag, i1, i1 + context, j1, j1 + context)
+        hunks.append(current)
+    return hunks
@@ -1,6 +1,9 @@
-import os
 from pathlib import Path
-from typing import List, Dict, Tuple, Union
+from typing import List, Union
+
+from .cache_invalidation import invalidate_path
+from .diff_engine import grouped_opcodes, matching_blocks
+from .patch_applier import DEFAULT_MAX_OFFSET, PatchReport, apply_hunks
 
 def apply_diff_changes(file_path: str, diff_content: str) -> bool:
     """
@@ -18,38 +21,60 @@ def apply_diff_changes(file_path: str, diff_content: str) -> bool:
     Returns:
         bool: True if changes were applied successfully, False otherwise.
     """
+    return patch_file(file_path, diff_content).success
+
+
+def patch_file(file_path: str, diff_content: str, max_offset: int = DEFAULT_MAX_OFFSET) -> PatchReport:
+    """
+    Applies a unified diff to a file and reports what happened to each hunk.
+
+    Hunks are located by their context lines near the line in their header, so diffs with
+    slightly wrong line numbers still apply. The file is only written if every hunk applied.
+
+    Args:
+        file_path (str): Path to the file to be modified.
+        diff_content (str): The unified diff.
+        max_offset (int): How many lines away from its header a hunk may be found.
+
+    Returns:
+        PatchReport: The outcome of each hunk; `success` is True if the file was written.
+    """
     path = Path(file_path)
 
     if not path.exists():
         print(f"File does not exist: {path}")
-        return False
+        return PatchReport(error=f"File does not exist: {path}")
 
     if not path.is_file():
         print(f"Path is not a regular file: {path}")
-        return False
+        return PatchReport(error=f"Path is not a regular file: {path}")
 
     try:
         # Read the original file content
-        with open(path, 'r', encoding='utf-8') as file:
+        with open(path, 'r', encoding='utf-8', newline='') as file:
             original_lines = file.readlines()
 
-        # Parse the diff content and apply changes
-        modified_lines = parse_and_apply_diff(original_lines, diff_content)
+        modified_lines, report = apply_hunks(original_lines, diff_content, max_offset)
 
-        if modified_lines is None:
-            print(f"Failed to parse diff content for file: {path}")
-            return False
+        if not report.success:
+            print(f"Failed to apply diff to file {path}:\n{report.summary()}")
+            return report
+        if not report.hunks:
+            print(f"No changes to apply to file: {path}")
+            return report
 
         # Write the modified content back to the file
-        with open(path, 'w', encoding='utf-8') as file:
+        with open(path, 'w', encoding='utf-8', newline='') as file:
             file.writelines(modified_lines)
+        invalidate_path(str(path))
 
-        print(f"Successfully applied diff changes to file: {path}")
-        return True
+        print(f"Successfully applied diff changes to file: {path}\n{report.summary()}")
+        return report
 
     except Exception as e:
         print(f"Error applying diff changes to file {path}: {str(e)}")
-        return False
+        return PatchReport(error=f"Error applying diff changes to file {path}: {e}")
+
 
 def parse_and_apply_diff(original_lines: List[str], diff_content: str) -> Union[List[str], None]:
     """
@@ -60,105 +85,14 @@ def parse_and_apply_diff(original_lines: List[str], diff_content: str) -> Union[
         diff_content (str): Diff notation content describing the changes.
 
     Returns:
-        Union[List[str], None]: Modified lines if successful, None if parsing failed.
+        Union[List[str], None]: Modified lines if successful, None if parsing failed or a hunk did not apply.
     """
-    # Make a copy of the original lines to modify
-    modified_lines = original_lines.copy()
-
-    # Split the diff content into lines
-    diff_lines = diff_content.splitlines()
-
-    # Process the diff lines
-    i = 0
-    while i < len(diff_lines):
-        line = diff_lines[i]
-
-        # Look for diff header lines like "@@ -a,b +c,d @@"
-        if line.startswith("@@"):
-            # Parse the header to get line numbers
-            try:
-                header_parts = line.split("@@")[1].strip().split(" ")
-                original_range = header_parts[0]
-                modified_range = header_parts[1] if len(header_parts) > 1 else ""
-
-                # Parse original range (format: -a,b)
-                if original_range.startswith("-"):
-                    original_start, original_count = map(int, original_range[1:].split(","))
-                    # Adjust to 0-based indexing
-                    original_start -= 1
-                else:
-                    print(f"Invalid original range format: {original_range}")
-                    return None
-
-                # Parse modified range (format: +c,d)
-                if modified_range.startswith("+"):
-                    modified_start, modified_count = map(int, modified_range[1:].split(","))
-                    # Adjust to 0-based indexing
-                    modified_start -= 1
-                else:
-                    print(f"Invalid modified range format: {modified_range}")
-                    return None
-
-                # Process the changes in this chunk
-                i += 1
-                changes = []
-                while i < len(diff_lines) and not diff_lines[i].startswith("@@"):
-                    changes.append(diff_lines[i])
-                    i += 1
-
-                # Apply the changes to the modified_lines
-                modified_lines = apply_chunk_changes(modified_lines, original_start, changes)
-
-                # Continue to the next chunk
-                continue
-
-            except Exception as e:
-                print(f"Error parsing diff header: {line}, Error: {str(e)}")
-                return None
-
-        # Skip any other lines (like file names or comments)
-        i += 1
-
+    modified_lines, report = apply_hunks(original_lines, diff_content)
+    if not report.success:
+        print(report.summary())
+        return None
     return modified_lines
 
-def apply_chunk_changes(lines: List[str], start_line: int, changes: List[str]) -> List[str]:
-    """
-    Applies a chunk of diff changes to the lines.
-
-    Args:
-        lines (List[str]): Current file content as a list of lines.
-        start_line (int): Starting line number (0-based) for the changes.
-        changes (List[str]): List of change lines from the diff.
-
-    Returns:
-        List[str]: Modified lines after applying the changes.
-    """
-    result = lines[:start_line]
-
-    i = start_line
-    j = 0
-
-    while j < len(changes):
-        change = changes[j]
-
-        if change.startswith("+"):
-            # Addition: add the new line
-            result.append(change[1:] + "\n" if not change[1:].endswith("\n") else change[1:])
-        elif change.startswith("-"):
-            # Deletion: skip the original line
-            i += 1
-        else:
-            # Context line: keep the original line
-            result.append(lines[i])
-            i += 1
-
-        j += 1
-
-    # Add remaining lines
-    result.extend(lines[i:])
-
-    return result
-
 def create_diff(original_file: str, modified_file: str) -> str:
     """
     Creates a diff between two files.
@@ -187,8 +121,9 @@ def create_diff(original_file: str, modified_file: str) -> str:
         print(f"Error creating diff: {str(e)}")
         return ""
 
-def generate_diff(original_lines: List[str], modified_lines: List[str], 
-                 original_file: str = "a", modified_file: str = "b") -> str:
+def generate_diff(original_lines: List[str], modified_lines: List[str],
+                 original_file: str = "a", modified_file: str = "b",
+                 algorithm: str = "myers", context: int = 3) -> str:
     """
     Generates a unified diff between two sets of lines.
 
@@ -197,6 +132,8 @@ def generate_diff(original_lines: List[str], modified_lines: List[str],
         modified_lines (List[str]): Modified file content as a list of lines.
         original_file (str): Name of the original file for the diff header.
         modified_file (str): Name of the modified file for the diff header.
+        algorithm (str): "myers" for a minimal diff or "patience" for one anchored on unique lines.
+        context (int): Number of unchanged lines shown around each change.
 
     Returns:
         str: Unified diff notation content.
@@ -204,84 +141,29 @@ def generate_diff(original_lines: List[str], modified_lines: List[str],
     # Simple diff header
     diff_header = f"--- {original_file}\n+++ {modified_file}\n"
 
-    # Find the differences and generate chunks
-    chunks = []
-    i = 0
-    j = 0
-
     # Ensure lines end with newline
     original_lines = [line if line.endswith('\n') else line + '\n' for line in original_lines]
     modified_lines = [line if line.endswith('\n') else line + '\n' for line in modified_lines]
 
-    while i < len(original_lines) or j < len(modified_lines):
-        # Find a difference
-        if (i >= len(original_lines) or j >= len(modified_lines) or 
-            original_lines[i] != modified_lines[j]):
-
-            # Start a new chunk
-            original_start = i + 1  # 1-based indexing for diff
-            modified_start = j + 1
-
-            # Collect the changes
-            chunk_lines = []
-
-            # Add context lines before (if available)
-            context_before = 3
-            for k in range(max(0, i - context_before), i):
-                if k < len(original_lines) and k < len(modified_lines):
-                    chunk_lines.append(" " + original_lines[k].rstrip('\n'))
-
-            # Track original and modified positions
-            orig_i = i
-            mod_j = j
-
-            # Process differences
-            while (orig_i < len(original_lines) or mod_j < len(modified_lines)):
-                if (orig_i >= len(original_lines) or mod_j >= len(modified_lines) or 
-                    original_lines[orig_i] != modified_lines[mod_j]):
-
-                    # Add deletions from original
-                    while orig_i < len(original_lines) and (mod_j >= len(modified_lines) or 
-                                                          original_lines[orig_i] != modified_lines[mod_j]):
-                        chunk_lines.append("-" + original_lines[orig_i].rstrip('\n'))
-                        orig_i += 1
-
-                    # Add additions from modified
-                    while mod_j < len(modified_lines) and (orig_i >= len(original_lines) or 
-                                                         original_lines[orig_i] != modified_lines[mod_j]):
-                        chunk_lines.append("+" + modified_lines[mod_j].rstrip('\n'))
-                        mod_j += 1
-                else:
-                    # Found matching lines, add context and break
-                    break
-
-            # Add context lines after (if available)
-            context_after = 3
-            context_count = 0
-            while (orig_i < len(original_lines) and mod_j < len(modified_lines) and 
-                   original_lines[orig_i] == modified_lines[mod_j] and 
-                   context_count < context_after):
-                chunk_lines.append(" " + original_lines[orig_i].rstrip('\n'))
-                orig_i += 1
-                mod_j += 1
-                context_count += 1
-
-            # Update positions for next iteration
-            i = orig_i
-            j = mod_j
-
-            # Create the chunk header
-            original_count = orig_i - original_start + 1
-            modified_count = mod_j - modified_start + 1
-            chunk_header = f"@@ -{original_start},{original_count} +{modified_start},{modified_count} @@\n"
-
-            # Add the chunk
-            if chunk_lines:
-                chunks.append(chunk_header + "\n".join(chunk_lines) + "\n")
-        else:
-            # Lines match, move to next line
-            i += 1
-            j += 1
+    blocks = matching_blocks(original_lines, modified_lines, algorithm)
+
+    chunks = []
+    for hunk in grouped_opcodes(blocks, len(original_lines), len(modified_lines), context):
+        first, last = hunk[0], hunk[-1]
+        original_count = last[2] - first[1]
+        modified_count = last[4] - first[3]
+        # Empty ranges point at the line before them, as in standard unified diffs.
+        original_start = first[1] + 1 if original_count else first[1]
+        modified_start = first[3] + 1 if modified_count else first[3]
+
+        chunk_lines = [f"@@ -{original_start},{original_count} +{modified_start},{modified_count} @@\n"]
+        for tag, i1, i2, j1, j2 in hunk:
+            if tag == "equal":
+                chunk_lines.extend(" " + line for line in original_lines[i1:i2])
+                continue
+            chunk_lines.extend("-" + line for line in original_lines[i1:i2])
+            chunk_lines.extend("+" + line for line in modified_lines[j1:j2])
+        chunks.append("".join(chunk_lines))
 
     # Combine all chunks
     return diff_header + "".join(chunks)
@@ -349,4 +231,5 @@ diff = """--- a/src/pages/ResearchTasksPage.tsx
                                                      </div>
                                                  )}"""
 
-apply_diff_changes("/home/nnikolovskii/dev/reliabl.it/frontend/src/pages/ResearchTasksPage.tsx", diff)
\ No newline at end of file
+if __name__ == "__main__":
+    apply_diff_changes("/home/nnikolovskii/dev/reliabl.it/frontend/src/pages/ResearchTasksPage.tsx", diff)
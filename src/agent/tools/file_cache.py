@@ -0,0 +1,111 @@
+"""Process-wide cache of decoded file contents.
+
+Entries are keyed by (path, kind) and validated against the file's mtime and size on
+every lookup, so a file is read and decoded at most once per change no matter how many
+graph nodes or tools ask for it. Eviction is least-recently-used, bounded by the total
+size of the cached text.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+DEFAULT_MAX_CACHE_BYTES = 128 * 1024 * 1024
+
+
+class FileContentCache:
+    """
+    LRU cache of decoded file contents, bounded by total size.
+
+    Args:
+        max_bytes (int): Upper bound on the summed length of all cached contents.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        # (abs path, kind) -> (mtime_ns, size, content)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[int, int, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_load(self, file_path: str, kind: str, loader: Callable[[str], Optional[str]]) -> Optional[str]:
+        """
+        Returns the cached content of a file, calling `loader` only if the file changed.
+
+        Args:
+            file_path (str): Path to the file.
+            kind (str): How the content was decoded, e.g. "text" or "pdf".
+            loader (Callable): Reads and decodes the file. Exceptions propagate to the caller
+                               and nothing is cached.
+
+        Returns:
+            str: The decoded content, or whatever `loader` returned if it was None.
+        """
+        key = (os.path.abspath(file_path), kind)
+        stat = os.stat(file_path)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+
+        content = loader(file_path)
+        if content is not None:
+            self._store(key, stat.st_mtime_ns, stat.st_size, content)
+        return content
+
+    def read_text(self, file_path: str) -> str:
+        """
+        Reads a UTF-8 text file through the cache.
+
+        Raises:
+            OSError, UnicodeDecodeError: Same as reading the file with `open`.
+        """
+        return self.get_or_load(file_path, "text", _read_text)
+
+    def invalidate(self, file_path: str) -> None:
+        """Drops every cached entry for a file, e.g. right after a tool wrote to it."""
+        path = os.path.abspath(file_path)
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == path]:
+                self._drop(key)
+
+    def clear(self) -> None:
+        """Drops all cached entries and resets the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def _store(self, key: Tuple[str, str], mtime_ns: int, size: int, content: str) -> None:
+        if len(content) > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (mtime_ns, size, content)
+            self.current_bytes += len(content)
+
+            while self.current_bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._drop(oldest_key)
+
+    def _drop(self, key: Tuple[str, str]) -> None:
+        _, _, content = self._entries.pop(key)
+        self.current_bytes -= len(content)
+
+
+def _read_text(file_path: str) -> str:
+    with open(file_path, 'r', encoding='utf-8') as file:
+        return file.read()
+
+
+file_content_cache = FileContentCache()
@@ -1,6 +1,19 @@
+import codecs
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
-from typing import List
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from pypdf import PdfReader
+
+from .cache_invalidation import invalidate_path
+from .comment_stripper import strip_comments_in_files, strip_python_comments
+from .file_cache import file_content_cache
+from .ignore_walker import walk_project
+from .metadata_index import get_metadata_index
+from .tree_cache import get_tree_snapshot
 
 DEFAULT_IGNORE_PATTERNS = {'.git', '.venv', ".idea", ".pytest_cache",
                            '.git', '__pycache__', ".angular",
@@ -8,10 +21,11 @@ DEFAULT_IGNORE_PATTERNS = {'.git', '.venv', ".idea", ".pytest_cache",
                            ".chainlit", ".files", ".junie", ".langgraph_api", ".env", "agent_metadata.md"}
 
 
-def get_project_structure_as_string(folder_path, ignore_patterns=None):
+def get_project_structure_as_string(folder_path, ignore_patterns=None, use_gitignore=True):
     """
     Generates a tree-like string representation of the project structure for the given folder path,
-    excluding files and folders that match the ignore patterns by their basename.
+    excluding files and folders that match the ignore patterns by their basename, and what the
+    project's .gitignore files ignore.
 
     How to use `ignore_patterns`:
     - To ignore ".venv" IN ADDITION to default ignores ('.git', '__pycache__', '.DS_Store'):
@@ -21,11 +35,13 @@ def get_project_structure_as_string(folder_path, ignore_patterns=None):
     - To ignore NOTHING (show all, overriding defaults):
       pass ignore_patterns=set()
     - If `ignore_patterns` is None (default), ProjectHelper.DEFAULT_IGNORE_PATTERNS is used.
+    - Patterns may also be globs in .gitignore syntax, e.g. "*.pyc" or "build/*.js".
 
     Args:
         folder_path (str): The path to the root folder of the project.
         ignore_patterns (set, optional): A set of file or folder basenames to ignore.
                                         Defaults to ProjectHelper.DEFAULT_IGNORE_PATTERNS.
+        use_gitignore (bool, optional): Apply the .gitignore files under folder_path. Defaults to True.
 
     Returns:
         str: A formatted tree-like string representation of the project structure.
@@ -39,58 +55,10 @@ def get_project_structure_as_string(folder_path, ignore_patterns=None):
     if not os.path.isdir(folder_path):
         return f"Error: The path '{folder_path}' is not a directory."
 
-    project_root_name = folder_path
-
-    output_lines = [f"└── {project_root_name}/"]
-
-    structure_map = {}
-
-    for current_root, dir_names, file_names in os.walk(folder_path, topdown=True):
-
-        dir_names[:] = [d for d in dir_names if d not in final_ignore_patterns]
-
-        children_of_current_root = []
-
-        for name in sorted(dir_names):
-            children_of_current_root.append((name, True))
-
-        for name in sorted(file_names):
-            if name not in final_ignore_patterns:
-                children_of_current_root.append((name, False))
-
-        if children_of_current_root:
-            structure_map[current_root] = children_of_current_root
-
-    def generate_tree_lines(dir_path_to_scan, current_prefix=""):
-        lines = []
-
-        children = structure_map.get(dir_path_to_scan, [])
-
-        for index, (name, is_directory) in enumerate(children):
-            is_last_item = (index == len(children) - 1)
-
-            connector = "└── " if is_last_item else "├── "
-
-            prefix_for_next_level = current_prefix + ("    " if is_last_item else "│   ")
-
-            display_name = f"{name}/" if is_directory else name
-            lines.append(f"{current_prefix}{connector}{display_name}")
-
-            if is_directory:
-                full_child_dir_path = os.path.join(dir_path_to_scan, name)
-                lines.extend(generate_tree_lines(full_child_dir_path, prefix_for_next_level))
-        return lines
+    # The snapshot is kept per root path and only rescans directories whose mtime changed.
+    snapshot = get_tree_snapshot(folder_path, final_ignore_patterns, use_gitignore)
+    return snapshot.render(display_root=folder_path)
 
-    tree_item_lines = generate_tree_lines(folder_path, "")
-    output_lines.extend(tree_item_lines)
-
-    return "\n".join(output_lines)
-
-
-from pathlib import Path
-from typing import List
-import re
-from pypdf import PdfReader
 
 def read_file(file_path: str) -> str | None:
     """
@@ -113,8 +81,7 @@ def read_file(file_path: str) -> str | None:
         return None
 
     try:
-        with open(path, 'r', encoding='utf-8') as file:
-            return file.read()
+        return file_content_cache.read_text(file_path)
     except Exception as e:
         print(f"Error reading text file {path}: {str(e)}")
         return None
@@ -140,84 +107,369 @@ def read_pdf(file_path: str) -> str | None:
         return None
 
     try:
-        reader = PdfReader(path)
-        text_content = ""
-        for page in reader.pages:
-            # Extract text from each page, add a newline for separation
-            extracted_text = page.extract_text()
-            if extracted_text: # Only add if text was actually extracted
-                text_content += extracted_text + "\n"
-        return text_content.strip() # Remove trailing newline if any
+        return file_content_cache.get_or_load(file_path, "pdf", _extract_pdf_text)
     except Exception as e:
         print(f"Error reading PDF file {path}: {str(e)}")
         return None
 
-def concat_files_in_str(file_paths: List[str]) -> str:
+def _extract_pdf_text(file_path: str) -> str:
+    reader = PdfReader(file_path)
+    pages_text = []
+    for page in reader.pages:
+        # Extract text from each page, add a newline for separation
+        extracted_text = page.extract_text()
+        if extracted_text: # Only add if text was actually extracted
+            pages_text.append(extracted_text + "\n")
+    return "".join(pages_text).strip() # Remove trailing newline if any
+
+FILE_TITLE_FORMAT = """================================================
+FILE: {file_path}
+================================================"""
+
+# Suggested budgets for the file loaders, in characters of decoded text (bytes for plain ASCII
+# sources). They are opt-in: without them the loaders copy every file whole, as they always have.
+DEFAULT_MAX_FILE_SIZE = 2 * 1024 * 1024
+DEFAULT_MAX_TOTAL_SIZE = 32 * 1024 * 1024
+DEFAULT_LOADER_WORKERS = 8
+
+
+def _read_text_head(file_path: str, max_size: int) -> str | None:
+    """
+    Reads at most `max_size` characters of a text file and marks the content as truncated.
+    """
+    try:
+        file_size = os.path.getsize(file_path)
+        with open(file_path, 'r', encoding='utf-8') as file:
+            head = file.read(max_size)
+    except Exception as e:
+        print(f"Error reading text file {file_path}: {str(e)}")
+        return None
+    return f"{head}\n... [truncated: file is {file_size} bytes, showing the first {max_size} characters]"
+
+
+def _load_file_content(file_path: str, max_file_size: int | None) -> Tuple[str | None, str | None]:
+    """
+    Loads one file for `iter_file_blocks`.
+
+    Returns:
+        tuple: (content, skip message). Messages are returned rather than printed so that
+               they come out in input order even though files are read concurrently.
+    """
+    path_obj = Path(file_path)
+
+    if not path_obj.exists():
+        return None, f"Skipping non-existent path: {file_path}"
+
+    if path_obj.is_dir():
+        return None, f"Skipping directory: {file_path}"
+
+    if path_obj.suffix.lower() == '.pdf':
+        content = read_pdf(file_path)
+        if content is not None and max_file_size is not None and len(content) > max_file_size:
+            content = f"{content[:max_file_size]}\n... [truncated: showing the first {max_file_size} characters]"
+    elif path_obj.is_file(): # Covers .txt, .py, .md, etc.
+        try:
+            truncate = max_file_size is not None and path_obj.stat().st_size > max_file_size
+        except FileNotFoundError:
+            # The file was removed between the checks above and here.
+            return None, f"Skipping non-existent path: {file_path}"
+        except OSError as e:
+            return None, f"Error reading text file {path_obj}: {str(e)}"
+        content = _read_text_head(file_path, max_file_size) if truncate else read_file(file_path)
+    else:
+        return None, f"Skipping unsupported file type or special file: {file_path}"
+
+    return content, None
+
+
+def format_file_block(file_path: str, content: str) -> str:
+    """
+    Formats one file the way `concat_files_in_str` lays it out: a title followed by the content.
+    """
+    return f"{FILE_TITLE_FORMAT.format(file_path=file_path)}\n{content}\n\n"
+
+
+def split_file_blocks(context: str, block_sizes: Dict[str, int]) -> List[Tuple[str, str]]:
+    """
+    Splits a `concat_files_in_str` string back into its per-file blocks, without touching disk.
+
+    The blocks are cut in order at the boundaries recorded when the context was built (see
+    `ContextBuilder.block_sizes`), so a file whose content contains another file's title
+    cannot move them.
+
+    Args:
+        context (str): A concatenated context string.
+        block_sizes (Dict[str, int]): File path -> length of its block, in context order.
+
+    Returns:
+        List[Tuple[str, str]]: (file path, block) pairs whose blocks join back into `context`.
+
+    Raises:
+        ValueError: If the boundaries do not describe `context`.
+    """
+    blocks = []
+    position = 0
+    for file_path, size in block_sizes.items():
+        block = context[position:position + size]
+        if len(block) != size or not block.startswith(FILE_TITLE_FORMAT.format(file_path=file_path)):
+            raise ValueError(f"The recorded block of {file_path} does not match the context at offset {position}")
+        blocks.append((file_path, block))
+        position += size
+
+    if position != len(context):
+        raise ValueError(f"The recorded blocks cover {position} of {len(context)} characters of the context")
+    return blocks
+
+
+def iter_file_blocks(file_paths: Iterable[str],
+                     max_file_size: int | None = None,
+                     max_total_size: int | None = None,
+                     max_workers: int = DEFAULT_LOADER_WORKERS) -> Iterator[str]:
+    """
+    Reads files on a thread pool and yields their titled blocks in input order.
+
+    See `iter_path_blocks` for the arguments.
+    """
+    for _, block in iter_path_blocks(file_paths, max_file_size, max_total_size, max_workers):
+        yield block
+
+
+def iter_path_blocks(file_paths: Iterable[str],
+                     max_file_size: int | None = None,
+                     max_total_size: int | None = None,
+                     max_workers: int = DEFAULT_LOADER_WORKERS) -> Iterator[Tuple[str, str]]:
+    """
+    Reads files on a thread pool and yields (file path, titled block) pairs in input order.
+
+    At most `2 * max_workers` files are in flight at once, however many paths are passed.
+    Memory is bounded by that many files' contents, each capped by `max_file_size` only when
+    one is given; without it, large files are held whole.
+
+    Args:
+        file_paths (Iterable[str]): Paths to the files (text or PDF).
+        max_file_size (int, optional): Files larger than this are truncated. None disables the limit.
+        max_total_size (int, optional): Blocks that would push the total over this are skipped.
+                                        None disables the limit.
+        max_workers (int, optional): Number of reader threads.
+
+    Yields:
+        tuple: (file path, block) with one "FILE: ..." block per readable file, in the same
+               format as `concat_files_in_str`.
+    """
+    total_size = 0
+    paths = iter(file_paths)
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="file-loader") as executor:
+        pending = deque()
+        for file_path in islice(paths, max_workers * 2):
+            pending.append((file_path, executor.submit(_load_file_content, file_path, max_file_size)))
+
+        while pending:
+            file_path, future = pending.popleft()
+            for next_path in islice(paths, 1):
+                pending.append((next_path, executor.submit(_load_file_content, next_path, max_file_size)))
+
+            content, message = future.result()
+            if message is not None:
+                print(message)
+                continue
+            if content is None:
+                continue
+
+            block = format_file_block(file_path, content)
+            if max_total_size is not None and total_size + len(block) > max_total_size:
+                print(f"Skipping {file_path}: total size budget of {max_total_size} characters reached")
+                continue
+
+            total_size += len(block)
+            yield file_path, block
+
+
+def concat_files_in_str(file_paths: List[str],
+                        max_file_size: int | None = None,
+                        max_total_size: int | None = None) -> str:
     """
     Concatenates the contents of specified files (text or PDF) into a single string,
     with titles for each file.
 
+    Files are read concurrently by `iter_file_blocks` and joined once at the end.
+
     Args:
         file_paths (List[str]): A list of paths to the files.
+        max_file_size (int, optional): Per-file size budget, e.g. DEFAULT_MAX_FILE_SIZE. None (the default)
+                                       disables the limit.
+        max_total_size (int, optional): Total size budget, e.g. DEFAULT_MAX_TOTAL_SIZE. None (the default)
+                                        disables the limit.
 
     Returns:
         str: A concatenated string of file contents.
     """
-    file_title_format = """================================================
-FILE: {file_path}
-================================================"""
-    result = ""
+    if not file_paths:
+        return ""
 
-    for file_path in file_paths:
-        path_obj = Path(file_path)
-        content = None
+    return "".join(iter_file_blocks(file_paths, max_file_size, max_total_size))
 
-        if not path_obj.exists():
-            print(f"Skipping non-existent path: {file_path}")
-            continue
 
-        if path_obj.is_dir():
-            print(f"Skipping directory: {file_path}")
-            continue
+# Extensions skipped without opening the file; anything else is sniffed for NUL bytes.
+DEFAULT_BINARY_EXTENSIONS = {'.pdf', '.png', '.jpg', '.jpeg', '.gif', '.mp3', '.mp4', '.ogg', '.wav', '.zip', '.tar', '.gz'}
+BINARY_SNIFF_SIZE = 8192
+COPY_CHUNK_SIZE = 1024 * 1024
+COMPRESSION_SUFFIXES = {'.gz': 'gzip', '.zst': 'zstd', '.zstd': 'zstd'}
 
-        if path_obj.suffix.lower() == '.pdf':
-            content = read_pdf(file_path)
-        elif path_obj.is_file(): # Covers .txt, .py, .md, etc.
-            content = read_file(file_path)
-        else:
-            print(f"Skipping unsupported file type or special file: {file_path}")
-            continue
 
-        if content is not None:
-            file_title = file_title_format.format(
-                file_path=file_path
-            )
-            result += f"{file_title}\n{content}\n\n"
+def _open_output(output_file: str, compression: str | None):
+    """
+    Opens the concatenation output for binary writing, compressed with gzip or zstd if requested.
+
+    Raises:
+        ValueError: For an unknown compression, or "zstd" when the zstandard package is missing.
+    """
+    if compression is None:
+        compression = COMPRESSION_SUFFIXES.get(os.path.splitext(output_file)[1].lower(), "none")
+
+    if compression == "none":
+        return open(output_file, 'wb')
+    if compression == "gzip":
+        import gzip
+        return gzip.open(output_file, 'wb', compresslevel=6)
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError("zstd output requires the 'zstandard' package (pip install agent[zstd])") from None
+        return zstandard.ZstdCompressor(level=3).stream_writer(open(output_file, 'wb'))
+    raise ValueError(f"Unknown compression: {compression}. Expected 'none', 'gzip' or 'zstd'")
+
+
+def _looks_binary(head: bytes) -> bool:
+    """Treats a block as binary if it contains a NUL byte or is not UTF-8 (a sequence cut at the end is allowed)."""
+    if b'\0' in head:
+        return True
+    try:
+        head.decode('utf-8')
+    except UnicodeDecodeError as e:
+        return e.reason != "unexpected end of data"
+    return False
+
+
+def _utf8_prefix(data: bytes) -> bytes:
+    """Drops a UTF-8 sequence cut off at the end of `data`, so a truncated file stays valid text."""
+    for back in range(1, min(4, len(data)) + 1):
+        byte = data[-back]
+        if byte & 0xC0 != 0x80:
+            # A lead byte: 110xxxxx starts 2 bytes, 1110xxxx 3, 11110xxx 4; ASCII stands alone.
+            length = 1 if byte < 0x80 else 2 if byte < 0xE0 else 3 if byte < 0xF0 else 4
+            return data if back >= length else data[:-back]
+    return data
+
+
+def _iter_chunks(head: bytes, source, limit: int) -> Iterator[Tuple[bytes, bool]]:
+    """
+    Yields (chunk, is last) for the first `limit` bytes of a file, starting with the sniffed head.
+
+    Stops early if the file shrank since it was stat'ed.
+    """
+    remaining = limit
+    chunk = head[:remaining]
+    while chunk:
+        remaining -= len(chunk)
+        next_chunk = source.read(min(COPY_CHUNK_SIZE, remaining)) if remaining else b""
+        yield chunk, not next_chunk
+        chunk = next_chunk
+
 
-    return result
+def _check_utf8(file_size: int, head: bytes, source, limit: int) -> None:
+    """
+    Decodes the first `limit` bytes of a file without keeping them, then rewinds to after the head.
+
+    A sequence cut at `limit` is allowed if the file goes on, since truncation drops it.
 
+    Raises:
+        UnicodeDecodeError: If the bytes are not UTF-8.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    for chunk, last in _iter_chunks(head, source, limit):
+        decoder.decode(chunk, final=last and limit >= file_size)
+    source.seek(len(head))
 
-def concat_folder_to_file(folder_path: str, output_file: str = "concatenated_output.txt", ignore_patterns=None, binary_extensions=None):
+
+def _copy_file_block(file_path: str, file_size: int, head: bytes, source, output,
+                     max_file_size: int | None) -> int:
+    """
+    Writes one titled block, streaming the file's content in chunks after the sniffed head.
+
+    The content is decoded as UTF-8 and its newlines are normalized to "\n", as reading the
+    file in text mode does; `_check_utf8` must have accepted it.
+
+    Returns:
+        int: Number of bytes written.
+    """
+    title = f"{FILE_TITLE_FORMAT.format(file_path=file_path)}\n".encode('utf-8')
+    output.write(title)
+    written = len(title)
+
+    limit = file_size if max_file_size is None else min(file_size, max_file_size)
+    truncated = limit < file_size
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    shown = 0
+    # A "\r" at the end of a chunk may be the first half of a "\r\n".
+    carried = ""
+    for chunk, last in _iter_chunks(head, source, limit):
+        if last and truncated:
+            chunk = _utf8_prefix(chunk)
+        shown += len(chunk)
+        text = carried + decoder.decode(chunk, final=last)
+        carried = "\r" if not last and text.endswith("\r") else ""
+        if carried:
+            text = text[:-1]
+        data = text.replace("\r\n", "\n").replace("\r", "\n").encode('utf-8')
+        output.write(data)
+        written += len(data)
+
+    if truncated:
+        marker = f"\n... [truncated: file is {file_size} bytes, showing the first {shown} bytes]".encode('utf-8')
+        output.write(marker)
+        written += len(marker)
+    output.write(b"\n\n")
+    return written + 2
+
+
+def concat_folder_to_file(folder_path: str, output_file: str = "concatenated_output.txt", ignore_patterns=None,
+                          binary_extensions=None, compression: str | None = None,
+                          max_file_size: int | None = None,
+                          max_total_size: int | None = None, use_gitignore: bool = True):
     """
     Concatenates all files in a folder (and its subfolders) into a single output file,
     excluding files and folders that match the ignore patterns.
 
+    Files are written to the output as the folder is walked, one chunk at a time, so memory
+    use does not grow with the size of the repository. The blocks have the same layout as
+    `concat_files_in_str`: content is decoded as UTF-8 with newlines normalized to "\n", and
+    a file that is not UTF-8 is reported and left out. Binary files are skipped by extension
+    and by content: a file whose first block contains a NUL byte or is not UTF-8 is not copied.
+    A file larger than its first block is read twice, once to check it is UTF-8 before any of
+    it is written.
+
     Args:
         folder_path (str): The path to the folder containing files to concatenate.
         output_file (str, optional): The path to the output file. Defaults to "concatenated_output.txt".
         ignore_patterns (set, optional): A set of file or folder basenames to ignore.
                                         Defaults to DEFAULT_IGNORE_PATTERNS.
         binary_extensions (set, optional): A set of file extensions to treat as binary and skip.
-                                          Defaults to {'.pdf', '.png', '.jpg', '.jpeg', '.gif', '.mp3', '.mp4', '.ogg', '.wav', '.zip', '.tar', '.gz'}.
+                                          Defaults to DEFAULT_BINARY_EXTENSIONS.
+        compression (str, optional): "none", "gzip" or "zstd" (needs the zstandard package).
+                                     Defaults to the one matching the output suffix (.gz, .zst).
+        max_file_size (int, optional): Files larger than this many bytes are truncated. None disables the limit.
+        max_total_size (int, optional): Files that would push the output over this many bytes are skipped.
+                                        None disables the limit.
+        use_gitignore (bool, optional): Also skip what the .gitignore files under folder_path ignore.
+                                        Defaults to True.
 
     Returns:
         bool: True if successful, False otherwise.
     """
     final_ignore_patterns = DEFAULT_IGNORE_PATTERNS if ignore_patterns is None else ignore_patterns
-
-    # Default binary file extensions to skip
-    default_binary_extensions = {'.pdf', '.png', '.jpg', '.jpeg', '.gif', '.mp3', '.mp4', '.ogg', '.wav', '.zip', '.tar', '.gz'}
-    final_binary_extensions = default_binary_extensions if binary_extensions is None else binary_extensions
+    final_binary_extensions = DEFAULT_BINARY_EXTENSIONS if binary_extensions is None else binary_extensions
 
     if not os.path.exists(folder_path):
         print(f"Error: The path '{folder_path}' does not exist.")
@@ -227,47 +479,72 @@ def concat_folder_to_file(folder_path: str, output_file: str = "concatenated_out
         print(f"Error: The path '{folder_path}' is not a directory.")
         return False
 
-    # Collect all file paths
-    file_paths = []
+    output_path = os.path.abspath(output_file)
+    file_count = 0
     skipped_binary_files = 0
+    total_size = 0
 
-    for current_root, dir_names, file_names in os.walk(folder_path, topdown=True):
-        # Filter out directories that match ignore patterns
-        dir_names[:] = [d for d in dir_names if d not in final_ignore_patterns]
-
-        # Filter and collect files that don't match ignore patterns
-        for name in file_names:
-            if name not in final_ignore_patterns:
-                file_path = os.path.join(current_root, name)
-
-                # Skip binary files based on extension
-                file_ext = os.path.splitext(name)[1].lower()
-                if file_ext in final_binary_extensions:
-                    print(f"Skipping binary file: {file_path}")
-                    skipped_binary_files += 1
-                    continue
-
-                file_paths.append(file_path)
-
-    if not file_paths:
-        print(f"No files found in '{folder_path}' after applying ignore patterns and skipping binary files.")
+    try:
+        output = _open_output(output_file, compression)
+    except (OSError, ValueError) as e:
+        print(f"Error writing to output file '{output_file}': {str(e)}")
         return False
 
-    # Concatenate all files
-    concatenated_content = concat_files_in_str(file_paths)
-
-    # Write to output file
     try:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(concatenated_content)
-        print(f"Successfully concatenated {len(file_paths)} files to '{output_file}' (skipped {skipped_binary_files} binary files)")
-        return True
-    except Exception as e:
+        with output:
+            for current_root, _, file_names in walk_project(folder_path, final_ignore_patterns, use_gitignore):
+                for name in file_names:
+                    file_path = os.path.join(current_root, name)
+                    if os.path.abspath(file_path) == output_path:
+                        continue
+
+                    # Skip binary files based on extension
+                    if os.path.splitext(name)[1].lower() in final_binary_extensions:
+                        print(f"Skipping binary file: {file_path}")
+                        skipped_binary_files += 1
+                        continue
+
+                    try:
+                        with open(file_path, 'rb') as source:
+                            file_size = os.fstat(source.fileno()).st_size
+                            head = source.read(BINARY_SNIFF_SIZE)
+                            if _looks_binary(head):
+                                print(f"Skipping binary file: {file_path}")
+                                skipped_binary_files += 1
+                                continue
+
+                            expected_size = file_size if max_file_size is None else min(file_size, max_file_size)
+                            if max_total_size is not None and total_size + expected_size > max_total_size:
+                                print(f"Skipping {file_path}: total size budget of {max_total_size} bytes reached")
+                                continue
+
+                            try:
+                                _check_utf8(file_size, head, source, expected_size)
+                            except UnicodeDecodeError as e:
+                                print(f"Error reading text file {file_path}: {str(e)}")
+                                continue
+
+                            total_size += _copy_file_block(file_path, file_size, head, source, output, max_file_size)
+                            file_count += 1
+                    except OSError as e:
+                        print(f"Error reading file '{file_path}': {str(e)}")
+    except OSError as e:
         print(f"Error writing to output file '{output_file}': {str(e)}")
         return False
+    finally:
+        # The output usually lands inside a project the caches may be holding.
+        invalidate_path(output_path)
+
+    if not file_count:
+        print(f"No files found in '{folder_path}' after applying ignore patterns and skipping binary files.")
+        return False
 
+    print(f"Successfully concatenated {file_count} files to '{output_file}' (skipped {skipped_binary_files} binary files)")
+    return True
 
-def remove_python_comments(folder_path: str, ignore_patterns=None, clean_empty_lines=True):
+
+def remove_python_comments(folder_path: str, ignore_patterns=None, clean_empty_lines=True, max_workers=None,
+                           use_gitignore=True):
     """
     Recursively removes all comments from Python files in the specified folder.
 
@@ -283,6 +560,10 @@ def remove_python_comments(folder_path: str, ignore_patterns=None, clean_empty_l
                                         Defaults to DEFAULT_IGNORE_PATTERNS.
         clean_empty_lines (bool, optional): If True, reduces consecutive empty lines to a single empty line.
                                            Defaults to True.
+        max_workers (int, optional): Processes used to rewrite the files. Defaults to the number of CPUs;
+                                     small folders are processed inline.
+        use_gitignore (bool, optional): Also skip what the .gitignore files under folder_path ignore.
+                                        Defaults to True.
 
     Returns:
         tuple: (int, int) - (number of files processed, number of files with errors)
@@ -300,13 +581,9 @@ def remove_python_comments(folder_path: str, ignore_patterns=None, clean_empty_l
     # Collect all Python file paths
     python_files = []
 
-    for current_root, dir_names, file_names in os.walk(folder_path, topdown=True):
-        # Filter out directories that match ignore patterns
-        dir_names[:] = [d for d in dir_names if d not in final_ignore_patterns]
-
-        # Filter and collect Python files that don't match ignore patterns
+    for current_root, _, file_names in walk_project(folder_path, final_ignore_patterns, use_gitignore):
         for name in file_names:
-            if name not in final_ignore_patterns and name.endswith('.py'):
+            if name.endswith('.py'):
                 file_path = os.path.join(current_root, name)
                 python_files.append(file_path)
 
@@ -317,34 +594,15 @@ def remove_python_comments(folder_path: str, ignore_patterns=None, clean_empty_l
     processed_count = 0
     error_count = 0
 
-    for file_path in python_files:
-        try:
-            # Read the file content
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-
-            # Remove comments while preserving docstrings
-            modified_content = remove_comments_from_python_code(content)
-
-            # Clean up consecutive empty lines if requested
-            if clean_empty_lines:
-                # First, normalize all whitespace-only lines to empty lines
-                modified_content = re.sub(r'\n[ \t]+\n', '\n\n', modified_content)
-                # Then, replace multiple consecutive empty lines (3 or more) with just one empty line
-                modified_content = re.sub(r'\n\n\n+', '\n\n', modified_content)
-                # Make sure we don't have empty lines at the beginning or end of the file
-                modified_content = modified_content.strip('\n') + '\n'
-
-            # Write the modified content back to the file
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(modified_content)
-
-            processed_count += 1
-            print(f"Processed: {file_path}")
-
-        except Exception as e:
-            print(f"Error processing file '{file_path}': {str(e)}")
+    # Files are rewritten in a process pool; each one is replaced atomically.
+    for file_path, error in strip_comments_in_files(python_files, clean_empty=clean_empty_lines,
+                                                     max_workers=max_workers):
+        if error is not None:
+            print(f"Error processing file '{file_path}': {error}")
             error_count += 1
+            continue
+        processed_count += 1
+        print(f"Processed: {file_path}")
 
     print(f"Completed: {processed_count} files processed, {error_count} files with errors")
     return (processed_count, error_count)
@@ -360,71 +618,22 @@ def remove_comments_from_python_code(code: str) -> str:
     Returns:
         str: The code with comments removed
     """
-    # State tracking
-    in_string = False
-    string_char = None
-    triple_quotes = False
-    i = 0
-    result = []
-
-    while i < len(code):
-        # Check for string start/end
-        if not in_string and (code[i] == "'" or code[i] == '"'):
-            in_string = True
-            string_char = code[i]
-
-            # Check for triple quotes
-            if i + 2 < len(code) and code[i:i+3] == string_char * 3:
-                triple_quotes = True
-                result.append(code[i:i+3])
-                i += 3
-                continue
-            else:
-                triple_quotes = False
-                result.append(code[i])
-                i += 1
-                continue
+    return strip_python_comments(code)
 
-        # Check for string end
-        elif in_string and code[i] == string_char:
-            if triple_quotes and i + 2 < len(code) and code[i:i+3] == string_char * 3:
-                result.append(code[i:i+3])
-                in_string = False
-                triple_quotes = False
-                i += 3
-                continue
-            elif not triple_quotes:
-                result.append(code[i])
-                in_string = False
-                i += 1
-                continue
-            else:
-                result.append(code[i])
-                i += 1
-                continue
-
-        # Handle comments - only if not in a string
-        elif not in_string and code[i] == '#':
-            # Skip until end of line
-            while i < len(code) and code[i] != '\n':
-                i += 1
-            continue
-
-        # Add character to result
-        result.append(code[i])
-        i += 1
-
-    return ''.join(result)
-
-def concat_agent_metadata(folder_path: str) -> str:
+def concat_agent_metadata(folder_path: str, ignore_patterns=None, use_gitignore=True) -> str:
     """
     Finds all 'agent_metadata.md' files within a folder and its subfolders,
     concatenates their contents into a single string, each prefixed by its path.
 
+    File locations and the result are cached per folder (see `metadata_index`); a file is
+    only read again when its mtime or size changes.
+
     Args:
         folder_path (str): The path to the root folder to search.
         ignore_patterns (set, optional): A set of directory/file basenames to ignore.
-                                         Defaults to DEFAULT_IGNORE_PATTERNS.
+                                         Defaults to DEFAULT_IGNORE_PATTERNS (without agent_metadata.md itself).
+        use_gitignore (bool, optional): Also skip what the .gitignore files under folder_path ignore.
+                                        Defaults to True.
 
     Returns:
         str: The concatenated content of all found 'agent_metadata.md' files,
@@ -440,35 +649,14 @@ def concat_agent_metadata(folder_path: str) -> str:
         print(f"Error: The path '{folder_path}' is not a directory.")
         return ""
 
-    result_lines = []
-    target_filename = "agent_metadata.md"
+    final_ignore_patterns = DEFAULT_IGNORE_PATTERNS if ignore_patterns is None else ignore_patterns
 
     try:
-        # Walk the directory tree
-        for current_root, dir_names, file_names in os.walk(folder_path, topdown=True):
-            # Modify dir_names in-place to skip ignored directories
-            dir_names[:] = [d for d in dir_names]
-
-            # Check if the target file exists in the current directory
-            if target_filename in file_names and target_filename:
-                file_path = os.path.join(current_root, target_filename)
-                full_file_path = Path(file_path)
-
-                # Attempt to read the file content
-                try:
-                    with open(full_file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    # Combine path prefix and content in a single string
-                    result_lines.append(f"{file_path}: {content}")
-                except Exception as e:
-                    print(f"Warning: Could not read file '{file_path}': {e}")
-
-        # Join all parts with newlines
-        return "\n".join(result_lines)
+        # The index is kept per root path: repeated calls only revalidate directory mtimes
+        # (or nothing, while a watcher reports no change) and reuse the concatenated result.
+        index = get_metadata_index(folder_path, final_ignore_patterns, use_gitignore)
+        return index.concat(display_root=folder_path)
 
     except Exception as e:
         print(f"An unexpected error occurred while scanning '{folder_path}': {e}")
         return ""
-
-lol = get_project_structure_as_string("/home/nnikolovskii/notes")
-print(lol)
\ No newline at end of file
@@ -0,0 +1,259 @@
+"""Ignore rules and the directory walker shared by the file tools.
+
+`IgnoreMatcher` decides whether an entry under a project root is ignored. It combines the
+caller's ignore patterns (exact basenames, or globs such as "*.pyc") with the rules of every
+`.gitignore` from the root down to the current directory. All gitignore rules that apply in
+a directory are compiled into one regular expression, so checking an entry costs a set
+lookup and a single regex match. `walk_project` replaces `os.walk`: it lists each directory
+once with `os.scandir` and prunes ignored directories before descending into them.
+"""
+
+import os
+import re
+from functools import lru_cache
+from typing import FrozenSet, Iterable, Iterator, List, Optional, Pattern, Sequence, Tuple
+
+GITIGNORE_FILE = ".gitignore"
+
+_GLOB_CHARACTERS = frozenset("*?[")
+
+# (regex over the path relative to the root, negated, directory only)
+Rule = Tuple[str, bool, bool]
+
+
+def glob_to_regex(pattern: str) -> str:
+    """
+    Translates a gitignore glob into a regular expression over '/'-separated relative paths.
+
+    '*' and '?' do not match '/', '[...]' is a character class, a backslash escapes the next
+    character, and '**' as a whole path segment matches any number of directories.
+    """
+    parts = []
+    i = 0
+    n = len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            is_segment = (i == 0 or pattern[i - 1] == "/") and pattern.startswith("**", i) and (i + 2 == n or pattern[i + 2] == "/")
+            if is_segment and i + 2 == n:
+                # "dir/**": everything below dir.
+                parts.append(".*")
+                i += 2
+            elif is_segment:
+                # "**/": zero or more directories.
+                parts.append("(?:.*/)?")
+                i += 3
+            else:
+                while i < n and pattern[i] == "*":
+                    i += 1
+                parts.append("[^/]*")
+            continue
+        if c == "?":
+            parts.append("[^/]")
+        elif c == "[":
+            j = i + 1
+            if j < n and pattern[j] in "!^":
+                j += 1
+            if j < n and pattern[j] == "]":
+                j += 1
+            j = pattern.find("]", j)
+            if j == -1:
+                parts.append("\\[")
+            else:
+                body = pattern[i + 1:j].replace("\\", "\\\\")
+                if body[0] in "!^":
+                    body = "^" + body[1:]
+                parts.append(f"[{body}]")
+                i = j
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            parts.append(re.escape(pattern[i]))
+        else:
+            parts.append(re.escape(c))
+        i += 1
+    return "".join(parts)
+
+
+def parse_gitignore(lines: Iterable[str], base: str = "") -> List[Rule]:
+    """
+    Parses the lines of a .gitignore file into rules.
+
+    Args:
+        lines (Iterable[str]): The file's lines.
+        base (str): Directory of the .gitignore relative to the walk root: "" or ending in "/".
+
+    Returns:
+        List[Tuple[str, bool, bool]]: (regex, negated, directory only) per rule, in file order.
+    """
+    rules = []
+    for line in lines:
+        line = line.rstrip("\r\n")
+        # Trailing spaces are ignored unless escaped with a backslash.
+        stripped = line.rstrip(" ")
+        if stripped.endswith("\\") and len(stripped) < len(line):
+            stripped += " "
+        line = stripped
+        if not line or line.startswith("#"):
+            continue
+
+        negated = line.startswith("!")
+        if negated:
+            line = line[1:]
+        directory_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+
+        # A slash anywhere but at the end anchors the pattern to the .gitignore's directory.
+        anchored = "/" in line
+        prefix = re.escape(base) + ("" if anchored else "(?:.*/)?")
+        rules.append((prefix + glob_to_regex(line.lstrip("/")), negated, directory_only))
+    return rules
+
+
+def _compile_rules(rules: Sequence[Rule], directories: bool) -> Tuple[Optional[Pattern], Tuple[bool, ...]]:
+    """
+    Compiles rules into one regex in which the last matching rule wins.
+
+    The rules are joined in reverse order, one capturing group each, so the first alternative
+    that matches is the last rule in file order and `match.lastindex` identifies it.
+    """
+    selected = [rule for rule in rules if directories or not rule[2]]
+    if not selected:
+        return None, ()
+    selected.reverse()
+    pattern = "|".join(f"({regex})" for regex, _, _ in selected)
+    return re.compile(f"(?:{pattern})\\Z", re.DOTALL), (False,) + tuple(negated for _, negated, _ in selected)
+
+
+class IgnoreMatcher:
+    """
+    Ignore decisions for the entries of one directory.
+
+    Args:
+        names (FrozenSet[str]): Basenames that are always ignored.
+        globs (Pattern, optional): Compiled caller glob patterns, always ignored.
+        rules (Sequence[Rule]): Gitignore rules from the root down, in file order.
+    """
+
+    __slots__ = ("names", "globs", "rules", "_directory_regex", "_directory_negated", "_file_regex", "_file_negated")
+
+    def __init__(self, names: FrozenSet[str] = frozenset(), globs: Optional[Pattern] = None,
+                 rules: Sequence[Rule] = ()):
+        self.names = names
+        self.globs = globs
+        self.rules = tuple(rules)
+        self._directory_regex, self._directory_negated = _compile_rules(self.rules, directories=True)
+        self._file_regex, self._file_negated = _compile_rules(self.rules, directories=False)
+
+    def is_ignored(self, relative_path: str, name: str, is_directory: bool, check_names: bool = True) -> bool:
+        """
+        Whether an entry is ignored.
+
+        Args:
+            relative_path (str): '/'-separated path from the walk root.
+            name (str): The entry's basename.
+            is_directory (bool): Directory-only rules ("build/") apply to directories only.
+            check_names (bool): Apply the ignored basenames; False asks whether only they ignore the entry.
+        """
+        if check_names and name in self.names:
+            return True
+        if self.globs is not None and self.globs.match(relative_path):
+            return True
+        if is_directory:
+            regex, negated = self._directory_regex, self._directory_negated
+        else:
+            regex, negated = self._file_regex, self._file_negated
+        if regex is None:
+            return False
+        match = regex.match(relative_path)
+        return match is not None and not negated[match.lastindex]
+
+    def with_gitignore(self, gitignore_path: str, base: str) -> "IgnoreMatcher":
+        """
+        Returns a matcher that also applies the rules of a .gitignore file.
+
+        Args:
+            gitignore_path (str): Path to the .gitignore file.
+            base (str): Its directory relative to the walk root: "" or ending in "/".
+        """
+        try:
+            with open(gitignore_path, "r", encoding="utf-8", errors="replace") as f:
+                rules = parse_gitignore(f, base)
+        except OSError:
+            return self
+        if not rules:
+            return self
+        return IgnoreMatcher(self.names, self.globs, self.rules + tuple(rules))
+
+
+@lru_cache(maxsize=32)
+def _base_matcher(ignore_patterns: FrozenSet[str]) -> IgnoreMatcher:
+    names = frozenset(pattern for pattern in ignore_patterns
+                      if "/" not in pattern and not _GLOB_CHARACTERS.intersection(pattern))
+    globs = [rule for pattern in sorted(ignore_patterns - names) for rule in parse_gitignore([pattern])]
+    globs_regex = re.compile("(?:" + "|".join(regex for regex, _, _ in globs) + ")\\Z", re.DOTALL) if globs else None
+    return IgnoreMatcher(names, globs_regex)
+
+
+def get_ignore_matcher(ignore_patterns: Iterable[str] = ()) -> IgnoreMatcher:
+    """
+    Returns the matcher for a set of ignore patterns, compiled once per distinct set.
+
+    Plain names are matched against basenames. Other patterns follow gitignore syntax:
+    "*.pyc" matches at any depth, "src/gen" and "build/*.js" are relative to the walk root.
+    """
+    return _base_matcher(frozenset(ignore_patterns))
+
+
+def walk_project(root: str, ignore_patterns: Iterable[str] = (),
+                 use_gitignore: bool = True) -> Iterator[Tuple[str, List[str], List[str]]]:
+    """
+    Walks a directory tree top-down like `os.walk`, leaving out ignored entries.
+
+    Ignored directories are never listed. As with `os.walk`, the caller may remove names from
+    the yielded directory list to skip them, and symlinked directories are listed but not
+    descended into.
+
+    Args:
+        root (str): The directory to walk.
+        ignore_patterns (Iterable[str]): Basenames or globs to ignore, see `get_ignore_matcher`.
+        use_gitignore (bool): Also apply the .gitignore files found under the root.
+
+    Yields:
+        tuple: (directory path, directory names, file names).
+    """
+    stack = [(root, "", get_ignore_matcher(ignore_patterns))]
+    while stack:
+        path, relative_dir, matcher = stack.pop()
+        try:
+            with os.scandir(path) as iterator:
+                entries = list(iterator)
+        except OSError:
+            continue
+
+        if use_gitignore and any(entry.name == GITIGNORE_FILE for entry in entries):
+            matcher = matcher.with_gitignore(os.path.join(path, GITIGNORE_FILE), relative_dir)
+
+        dir_names = []
+        file_names = []
+        symlinks = set()
+        for entry in entries:
+            try:
+                is_directory = entry.is_dir()
+            except OSError:
+                is_directory = False
+            if matcher.is_ignored(relative_dir + entry.name, entry.name, is_directory):
+                continue
+            if is_directory:
+                dir_names.append(entry.name)
+                if entry.is_symlink():
+                    symlinks.add(entry.name)
+            else:
+                file_names.append(entry.name)
+
+        yield path, dir_names, file_names
+
+        for name in reversed(dir_names):
+            if name not in symlinks:
+                stack.append((os.path.join(path, name), f"{relative_dir}{name}/", matcher))
@@ -1,12 +1,14 @@
 from dotenv import load_dotenv
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import tool
-from langchain_google_genai import ChatGoogleGenerativeAI
 import os
 import subprocess
 from typing import Callable
 
-from agent.core.ai_models import kimi_llm, gpt5
-from bash_client.client import bash_executor
+from agent.core import ai_models
+from agent.tools.cache_invalidation import invalidate_directory, invalidate_path
+from agent.tools.file_cache import file_content_cache
+from bash_client.pool import bash_executor_pool, executor_key
 
 load_dotenv()
 
@@ -50,13 +52,14 @@ def str_replace(old_str: str, new_str: str, file_path: str) -> str:
     try:
         with open(file_path, 'w') as f:
             f.write(new_content)
+        invalidate_path(file_path)
         return f"Successfully replaced text in {file_path}"
     except Exception as e:
         return f"Error writing to file '{file_path}': {e}"
 
 
 @tool
-def run_bash_command(command: str) -> str:
+def run_bash_command(command: str, config: RunnableConfig) -> str:
     """Executes a bash command in the terminal.
 
     This tool allows you to run shell commands and get their output.
@@ -69,7 +72,14 @@ def run_bash_command(command: str) -> str:
     Returns:
         A string containing the combined stdout and stderr of the command.
     """
-    return bash_executor.execute(command)
+    # Every run gets its own shell, started in the run's project directory.
+    project_path = (config.get("configurable") or {}).get("project_path")
+    try:
+        with bash_executor_pool.checkout(executor_key(config), project_path) as executor:
+            return executor.execute(command)
+    finally:
+        # The command may have changed any file, and a watcher would only report it later.
+        invalidate_directory(project_path or os.getcwd())
 
 
 @tool
@@ -94,6 +104,7 @@ def create_file(file_path: str, file_text: str) -> str:
 
         with open(file_path, 'w') as f:
             f.write(file_text)
+        invalidate_path(file_path)
         return f"File '{file_path}' created successfully."
     except Exception as e:
         return f"Error creating file '{file_path}': {e}"
@@ -113,8 +124,7 @@ def view_file(file_path: str) -> str:
         The content of the file as a string, or an error message if the file cannot be read
     """
     try:
-        with open(file_path, 'r') as f:
-            return f.read()
+        return file_content_cache.read_text(file_path)
     except FileNotFoundError:
         return f"Error: The file '{file_path}' was not found."
     except Exception as e:
@@ -123,4 +133,20 @@ def view_file(file_path: str) -> str:
 
 tools = [str_replace, run_bash_command, create_file, view_file]
 tools_by_name = {tool.name: tool for tool in tools}
-llm_with_tools = gpt5.bind_tools(tools)
\ No newline at end of file
+
+_llm_with_tools = None
+
+
+def get_llm_with_tools():
+    """Returns the agent model with the tools bound, building it on first use."""
+    global _llm_with_tools
+    if _llm_with_tools is None:
+        _llm_with_tools = ai_models.get_model("gpt5").bind_tools(tools)
+    return _llm_with_tools
+
+
+def __getattr__(name: str):
+    # Keeps `from agent.tools.llm_tools import llm_with_tools` working without binding at import time.
+    if name == "llm_with_tools":
+        return get_llm_with_tools()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
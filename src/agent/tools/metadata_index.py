@@ -0,0 +1,178 @@
+"""Cached discovery of agent_metadata.md files.
+
+`build_context` needs the concatenated metadata of a project on every run. A `MetadataIndex`
+finds the metadata files of one project root in the same `ProjectTreeSnapshot` that renders
+its tree, which revalidates them with one `stat` per directory, and memoizes the concatenated result
+against the mtime and size of each metadata file. When a filesystem watcher keeps the index
+up to date (`watched`), no stats are needed at all until it reports a change, a repeated
+lookup is a dictionary hit, and a change only revisits the directories it touched.
+"""
+
+import os
+import threading
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+from .tree_cache import get_tree_snapshot
+
+METADATA_FILE_NAME = "agent_metadata.md"
+
+
+class MetadataIndex:
+    """
+    Locations and memoized concatenation of the agent_metadata.md files under one root.
+
+    Args:
+        root_path (str): The path to the root folder of the project.
+        ignore_patterns (set): Directory/file basenames (or globs) whose subtrees are not searched.
+        use_gitignore (bool): Also skip what the project's .gitignore files ignore.
+    """
+
+    def __init__(self, root_path: str, ignore_patterns: Set[str], use_gitignore: bool = True):
+        self.root_path = root_path
+        # Shared with the project tree; `find_files` still finds metadata files the tree hides by name.
+        self._snapshot = get_tree_snapshot(root_path, ignore_patterns, use_gitignore)
+        # Bumped by every invalidation; cached results remember the generation they were built in.
+        self._generation = 0
+        self._paths: Optional[List[str]] = None
+        self._paths_generation = -1
+        # Snapshot version the paths were found in; the tree may have refreshed the snapshot since.
+        self._paths_version = -1
+        # display root -> (generation, signature of the metadata files, concatenated content)
+        self._results: Dict[str, Tuple[int, tuple, str]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def watched(self) -> bool:
+        """Set by a filesystem watcher that calls `invalidate` on every change under the root."""
+        return self._snapshot.watched
+
+    @watched.setter
+    def watched(self, watched: bool) -> None:
+        self._snapshot.watched = watched
+        self.invalidate()
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """
+        Starts a new generation, so the next lookup of every display root revalidates.
+
+        Args:
+            path (str, optional): The path that changed. None revalidates every directory.
+        """
+        if path is not None and os.path.commonpath([self.root_path, os.path.abspath(path)]) != self.root_path:
+            return
+        self._snapshot.invalidate(path)
+        with self._lock:
+            self._generation += 1
+
+    def metadata_paths(self) -> List[str]:
+        """
+        Returns the absolute paths of the metadata files, in tree order.
+
+        Directories are revalidated by mtime; under a watcher, only the ones it reported as changed.
+        """
+        with self._lock:
+            generation = self._generation
+            if self._paths is None or self._paths_generation != generation or not self.watched:
+                self._snapshot.refresh()
+                version = self._snapshot.version
+                if self._paths is None or self._paths_version != version:
+                    self._paths = [os.path.join(self.root_path, *relative_path.split("/"))
+                                   for relative_path in self._snapshot.find_files(METADATA_FILE_NAME)]
+                    self._paths_version = version
+                self._paths_generation = generation
+            return self._paths
+
+    def concat(self, display_root: Optional[str] = None) -> str:
+        """
+        Concatenates the metadata files, each prefixed by its path.
+
+        Args:
+            display_root (str, optional): Root used in the path prefixes. Defaults to the root path.
+
+        Returns:
+            str: "<path>: <content>" per file, joined with newlines, or "" if there are none.
+        """
+        display_root = self.root_path if display_root is None else display_root
+        cached = self._results.get(display_root)
+        with self._lock:
+            generation = self._generation
+        if self.watched and cached is not None and cached[0] == generation:
+            return cached[2]
+
+        paths = self.metadata_paths()
+
+        signature = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                signature.append((path, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append((path, None, None))
+        signature = tuple(signature)
+
+        if cached is not None and cached[1] == signature:
+            self._results[display_root] = (generation, signature, cached[2])
+            return cached[2]
+
+        result_lines = []
+        for path in paths:
+            display_path = os.path.join(display_root, os.path.relpath(path, self.root_path))
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    content = f.read()
+                result_lines.append(f"{display_path}: {content}")
+            except Exception as e:
+                print(f"Warning: Could not read file '{display_path}': {e}")
+
+        result = "\n".join(result_lines)
+        self._results[display_root] = (generation, signature, result)
+        return result
+
+
+_indexes: Dict[Tuple[str, FrozenSet[str], bool], MetadataIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_metadata_index(folder_path: str, ignore_patterns: Set[str], use_gitignore: bool = True) -> MetadataIndex:
+    """
+    Returns the process-wide metadata index for a project root, creating it on first use.
+
+    Args:
+        folder_path (str): The path to the root folder of the project.
+        ignore_patterns (set): Directory/file basenames (or globs) whose subtrees are not searched.
+        use_gitignore (bool): Also skip what the project's .gitignore files ignore.
+
+    Returns:
+        MetadataIndex: The index keyed by the absolute root path, ignore patterns and gitignore flag.
+    """
+    key = (os.path.abspath(folder_path), frozenset(ignore_patterns), use_gitignore)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = MetadataIndex(*key)
+            _indexes[key] = index
+        return index
+
+
+def invalidate_metadata_indexes(path: Optional[str] = None, recursive: bool = False) -> None:
+    """
+    Marks every index that contains `path` (or every index, if None) as stale.
+
+    With `recursive`, anything below `path` may have changed, so every index whose root
+    contains it or lies below it revalidates all of its directories.
+    """
+    with _indexes_lock:
+        indexes = list(_indexes.values())
+    if recursive and path is not None:
+        path = os.path.abspath(path)
+        indexes = [index for index in indexes
+                   if os.path.commonpath([index.root_path, path]) in (index.root_path, path)]
+        path = None
+    for index in indexes:
+        index.invalidate(path)
+
+
+def clear_metadata_indexes() -> None:
+    """Drops every cached index, forcing the next lookup to rescan from scratch."""
+    with _indexes_lock:
+        _indexes.clear()
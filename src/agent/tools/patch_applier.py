@@ -0,0 +1,227 @@
+"""Context-verified application of unified diff hunks.
+
+Diffs written by an LLM often have slightly wrong line numbers. Instead of trusting the
+`@@ -a,b` header, each hunk is located by its context and deleted lines: first at the
+expected line (the header position shifted by how far the previous hunk moved), then
+anywhere within `max_offset` lines of it, and finally ignoring trailing whitespace. The
+search uses an index from line content to positions, so only lines that can start the
+hunk are checked. All hunks are then applied in one pass over the original lines, and
+every hunk gets an entry in the report. A diff without hunks, such as the diff of two
+identical files, applies as a no-op.
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Literal, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+DEFAULT_MAX_OFFSET = 500
+
+_HEADER_PATTERN = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class HunkReport(BaseModel):
+    index: int = Field(description="Position of the hunk in the diff, starting at 0.")
+    header: str = Field(description="The hunk's @@ header line.")
+    status: Literal["applied", "offset", "fuzzy", "failed"] = Field(
+        description="'applied' at the header line, 'offset' elsewhere, 'fuzzy' ignoring trailing whitespace, or 'failed'."
+    )
+    expected_line: int = Field(description="1-based line the header pointed at.")
+    applied_line: Optional[int] = Field(default=None, description="1-based line the hunk was applied at.")
+    message: str = Field(default="", description="Why the hunk failed, if it did.")
+
+    @property
+    def offset(self) -> Optional[int]:
+        return None if self.applied_line is None else self.applied_line - self.expected_line
+
+
+class PatchReport(BaseModel):
+    hunks: List[HunkReport] = Field(default_factory=list, description="Outcome of each hunk, in diff order.")
+    error: str = Field(default="", description="Set when the diff itself could not be parsed.")
+
+    @property
+    def success(self) -> bool:
+        return not self.error and all(hunk.status != "failed" for hunk in self.hunks)
+
+    def summary(self) -> str:
+        if self.error:
+            return self.error
+        lines = []
+        for hunk in self.hunks:
+            if hunk.status == "failed":
+                lines.append(f"Hunk {hunk.index + 1} failed: {hunk.message}")
+            elif hunk.status != "applied":
+                lines.append(f"Hunk {hunk.index + 1} applied at line {hunk.applied_line} "
+                             f"(offset {hunk.offset:+d}{', ignoring whitespace' if hunk.status == 'fuzzy' else ''})")
+        if not self.hunks:
+            return "The diff contains no hunks, nothing to apply"
+        return "\n".join(lines) or f"All {len(self.hunks)} hunks applied cleanly"
+
+
+class _Hunk:
+    __slots__ = ("header", "start", "ops", "old_lines")
+
+    def __init__(self, header: str, start: int):
+        self.header = header
+        self.start = start
+        # (tag, text) with tag " ", "-" or "+".
+        self.ops: List[Tuple[str, str]] = []
+        # Context and deleted lines: what the hunk expects to find in the file.
+        self.old_lines: List[str] = []
+
+
+def parse_hunks(diff_content: str) -> List[_Hunk]:
+    """
+    Splits a unified diff into hunks.
+
+    Lines before the first @@ header (file names, comments) are ignored, a missing ",count"
+    means one line, and an empty line inside a hunk is read as an empty context line.
+
+    Raises:
+        ValueError: If a header cannot be parsed.
+    """
+    hunks: List[_Hunk] = []
+    # Trailing blank lines are an artifact of how the diff was written, not empty context lines.
+    for line in diff_content.rstrip("\n").splitlines():
+        if line.startswith("@@"):
+            match = _HEADER_PATTERN.match(line)
+            if match is None:
+                raise ValueError(f"Invalid hunk header: {line}")
+            old_start, old_count = int(match.group(1)), match.group(2)
+            # An empty old range points at the line before the insertion.
+            start = old_start if old_count == "0" else old_start - 1
+            hunks.append(_Hunk(line, max(start, 0)))
+            continue
+        if not hunks or line.startswith("\\"):
+            continue
+
+        tag, text = (line[0], line[1:]) if line else (" ", "")
+        if tag not in "+-":
+            # Context lines that lost their leading space are kept whole.
+            tag, text = " ", text if tag == " " else line
+        hunks[-1].ops.append((tag, text))
+        if tag != "+":
+            hunks[-1].old_lines.append(text)
+    return hunks
+
+
+class _LineIndex:
+    """Positions of every line in the file, keyed by its content, for one normalization."""
+
+    def __init__(self, lines: List[str]):
+        self.lines = lines
+        self.positions: Dict[str, List[int]] = {}
+        for position, line in enumerate(lines):
+            self.positions.setdefault(line, []).append(position)
+
+    def matches_at(self, needle: List[str], start: int) -> bool:
+        return self.lines[start:start + len(needle)] == needle
+
+    def find(self, needle: List[str], expected: int, lo: int, hi: int) -> Optional[int]:
+        """The start in [lo, hi] closest to `expected` where `needle` matches, if any."""
+        if lo <= expected <= hi and self.matches_at(needle, expected):
+            return expected
+
+        # Anchor the search on the needle's rarest line, so few candidate starts are checked.
+        anchor = min(range(len(needle)), key=lambda k: len(self.positions.get(needle[k], ())))
+        positions = self.positions.get(needle[anchor], [])
+        first = bisect_left(positions, lo + anchor)
+        last = bisect_right(positions, hi + anchor)
+        starts = sorted((position - anchor for position in positions[first:last]),
+                        key=lambda start: (abs(start - expected), start))
+        for start in starts:
+            if self.matches_at(needle, start):
+                return start
+        return None
+
+
+def apply_hunks(original_lines: List[str], diff_content: str,
+                max_offset: int = DEFAULT_MAX_OFFSET) -> Tuple[List[str], PatchReport]:
+    """
+    Applies a unified diff to lines, locating each hunk by its context.
+
+    Hunks that cannot be located are skipped and reported as failed; the others are applied.
+
+    Args:
+        original_lines (List[str]): File content as from readlines().
+        diff_content (str): The unified diff.
+        max_offset (int): How far from its expected line a hunk may be found.
+
+    Returns:
+        Tuple[List[str], PatchReport]: The patched lines and the per-hunk report.
+    """
+    try:
+        hunks = parse_hunks(diff_content)
+    except ValueError as e:
+        return list(original_lines), PatchReport(error=str(e))
+    if not hunks:
+        return list(original_lines), PatchReport()
+
+    stripped_lines = [line.rstrip("\r\n") for line in original_lines]
+    exact_index = _LineIndex(stripped_lines)
+    loose_index = None
+
+    reports: List[HunkReport] = []
+    placements: List[Tuple[int, _Hunk]] = []
+    drift = 0
+    # Hunks must not overlap, so each one is searched for after the end of the previous one.
+    floor = 0
+    for index, hunk in enumerate(hunks):
+        expected = hunk.start + drift
+        lo = max(floor, expected - max_offset)
+        hi = min(len(stripped_lines) - len(hunk.old_lines), expected + max_offset)
+
+        status = None
+        if not hunk.old_lines:
+            # Pure insertion without context: nothing to verify, trust the shifted header.
+            start = min(max(expected, floor), len(stripped_lines))
+            status = "applied" if start == hunk.start else "offset"
+        elif lo > hi:
+            start = None
+        else:
+            start = exact_index.find(hunk.old_lines, expected, lo, hi)
+            if start is not None:
+                status = "applied" if start == hunk.start else "offset"
+            else:
+                if loose_index is None:
+                    loose_index = _LineIndex([line.rstrip() for line in stripped_lines])
+                start = loose_index.find([line.rstrip() for line in hunk.old_lines], expected, lo, hi)
+                status = "fuzzy" if start is not None else None
+
+        if start is None:
+            reports.append(HunkReport(
+                index=index, header=hunk.header, status="failed", expected_line=hunk.start + 1,
+                message=f"context not found within {max_offset} lines of line {expected + 1}",
+            ))
+            continue
+
+        reports.append(HunkReport(index=index, header=hunk.header, status=status,
+                                  expected_line=hunk.start + 1, applied_line=start + 1))
+        placements.append((start, hunk))
+        drift = start - hunk.start
+        floor = start + len(hunk.old_lines)
+
+    # Single pass: copy untouched stretches and rewrite each located hunk. Context lines are
+    # taken from the file, so their exact whitespace and line endings are preserved.
+    newline = "\r\n" if original_lines and original_lines[0].endswith("\r\n") else "\n"
+    result: List[str] = []
+    position = 0
+    for start, hunk in placements:
+        result.extend(original_lines[position:start])
+        position = start
+        for tag, text in hunk.ops:
+            if tag == "+":
+                result.append(text + newline)
+            else:
+                if tag == " ":
+                    result.append(original_lines[position])
+                position += 1
+    result.extend(original_lines[position:])
+
+    # A last line without a newline may no longer be last.
+    for index in range(len(result) - 1):
+        if not result[index].endswith("\n"):
+            result[index] += newline
+
+    return result, PatchReport(hunks=reports)
@@ -0,0 +1,267 @@
+"""Background filesystem watchers that keep the project caches hot.
+
+A `ProjectWatcher` follows one project directory and pushes every change into the caches
+the graph nodes read from: the project tree snapshot, the agent_metadata.md index and the
+file content cache. While a project is watched, the tree and metadata caches skip their
+mtime revalidation and only revisit the directories that changed, so after the watcher's
+own first scan no node waits for a walk of the project.
+
+Events come from `watchdog` (inotify, FSEvents, ...) when it is installed, and otherwise
+from a polling thread. With watchdog, only the directories the tree shows are watched, one
+non-recursive watch each, and events for ignored paths are dropped. The polling thread
+revalidates its own tree snapshot every `poll_interval` seconds, which costs one `stat` per
+directory, and stats the metadata files, whose edits do not change a directory's mtime.
+Edits to other files need no event: the content cache checks mtimes on every read. Set
+AGENT_WATCH_PROJECTS=1 to have the graph start a watcher for every project it works on.
+"""
+
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+from .file_cache import file_content_cache
+from .file_utils import DEFAULT_IGNORE_PATTERNS, concat_agent_metadata, get_project_structure_as_string
+from .ignore_walker import GITIGNORE_FILE
+from .metadata_index import METADATA_FILE_NAME, get_metadata_index
+from .tree_cache import ProjectTreeSnapshot, get_tree_snapshot
+
+DEFAULT_POLL_INTERVAL = float(os.getenv("AGENT_WATCH_POLL_SECONDS", "1.0"))
+
+# watchdog events that do not change anything on disk.
+_READ_ONLY_EVENTS = {"opened", "closed_no_write"}
+
+
+def watchdog_available() -> bool:
+    """Whether the optional watchdog package can be imported."""
+    try:
+        import watchdog.observers  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class _EventHandler:
+    """Forwards watchdog events to a ProjectWatcher (duck-typed, so watchdog stays optional)."""
+
+    def __init__(self, watcher: "ProjectWatcher"):
+        self.watcher = watcher
+
+    def dispatch(self, event) -> None:
+        if event.event_type in _READ_ONLY_EVENTS:
+            return
+        paths = [os.fsdecode(event.src_path)]
+        dest_path = getattr(event, "dest_path", None)
+        if dest_path:
+            paths.append(os.fsdecode(dest_path))
+        paths = [path for path in paths if not self.watcher.is_ignored(path, event.is_directory)]
+        for path in paths:
+            self.watcher.handle_change(path, event.is_directory)
+        if (event.is_directory and event.event_type != "modified" and paths) or \
+                any(os.path.basename(path) == GITIGNORE_FILE for path in paths):
+            # Directories appeared, went away or changed their ignore rules.
+            self.watcher.sync_watches()
+
+
+class ProjectWatcher:
+    """
+    Watches one project directory and keeps its tree, metadata and content caches up to date.
+
+    Args:
+        project_path (str): The project root.
+        backend (str, optional): "watchdog" or "polling". Defaults to watchdog when it is installed.
+        poll_interval (float): Seconds between scans of the polling backend.
+    """
+
+    def __init__(self, project_path: str, backend: Optional[str] = None,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL):
+        self.project_path = os.path.abspath(project_path)
+        if backend is None:
+            backend = "watchdog" if watchdog_available() else "polling"
+        if backend not in ("watchdog", "polling"):
+            raise ValueError(f"Unknown watcher backend: {backend}. Expected 'watchdog' or 'polling'")
+        self.backend = backend
+        self.poll_interval = poll_interval
+        self.events = 0
+        # The caches the graph nodes use: default ignore patterns, .gitignore applied.
+        self._snapshot = get_tree_snapshot(self.project_path, DEFAULT_IGNORE_PATTERNS)
+        self._metadata_index = get_metadata_index(self.project_path, DEFAULT_IGNORE_PATTERNS)
+        self._observer = None
+        # Directory -> its non-recursive watchdog watch.
+        self._watches: Dict[str, object] = {}
+        self._watches_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self.ready = threading.Event()
+
+    def start(self) -> "ProjectWatcher":
+        """Starts watching in the background; `ready` is set once the caches are primed."""
+        if self.backend == "watchdog":
+            from watchdog.observers import Observer
+
+            self._observer = Observer()
+            self._observer.daemon = True
+            self._observer.start()
+            target = self._prime_watches
+        else:
+            target = self._poll_forever
+
+        self._thread = threading.Thread(target=target, name=f"project-watcher-{os.path.basename(self.project_path)}",
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stops watching; the caches go back to revalidating by mtime."""
+        self._stop_event.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self._snapshot.watched = False
+        self._metadata_index.watched = False
+
+    def handle_change(self, path: str, is_directory: bool = False) -> None:
+        """
+        Pushes one change into the caches.
+
+        Args:
+            path (str): The file or directory that was created, modified, moved or deleted.
+            is_directory (bool): Whether it is a directory.
+        """
+        self.events += 1
+        if not is_directory:
+            file_content_cache.invalidate(path)
+        self._snapshot.invalidate(path)
+        self._metadata_index.invalidate(path)
+
+    def is_ignored(self, path: str, is_directory: bool = False) -> bool:
+        """Whether a change to `path` cannot affect the caches: the tree leaves it out and it is no metadata file."""
+        if not is_directory and os.path.basename(path) == METADATA_FILE_NAME:
+            # The tree hides metadata files, but the metadata index reads them.
+            return self._snapshot.is_ignored(os.path.dirname(path), True)
+        return self._snapshot.is_ignored(path, is_directory)
+
+    def sync_watches(self) -> None:
+        """Watches every directory the tree shows, and only those, after its listing changed."""
+        self._snapshot.refresh()
+        directories = self._snapshot.directories()
+        added = []
+        with self._watches_lock:
+            if self._stop_event.is_set():
+                return
+            for path in set(self._watches) - set(directories):
+                try:
+                    self._observer.unschedule(self._watches.pop(path))
+                except (KeyError, OSError):
+                    pass
+            for path in directories:
+                if path not in self._watches:
+                    try:
+                        self._watches[path] = self._observer.schedule(_EventHandler(self), path, recursive=False)
+                    except OSError:
+                        continue
+                    added.append(path)
+        # Entries created before their directory was watched have sent no events.
+        for path in added:
+            self.handle_change(path, True)
+
+    def _prime(self) -> None:
+        """Hands the caches over to the watcher and does the one cold scan in this thread."""
+        # Events are already flowing, so a full revalidation now misses nothing from before.
+        self._snapshot.watched = True
+        self._snapshot.invalidate()
+        self._metadata_index.watched = True
+        try:
+            get_project_structure_as_string(self.project_path)
+            concat_agent_metadata(self.project_path)
+        finally:
+            self.ready.set()
+
+    def _prime_watches(self) -> None:
+        """Schedules the directory watches, then primes the caches."""
+        self._snapshot.watched = True
+        self._snapshot.invalidate()
+        self.sync_watches()
+        # A full revalidation picks up what changed while the watches were being scheduled.
+        self._prime()
+
+    def _metadata_state(self) -> Dict[str, Tuple[int, int]]:
+        """path -> (mtime_ns, size) of every metadata file."""
+        state = {}
+        for path in self._metadata_index.metadata_paths():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            state[path] = (stat.st_mtime_ns, stat.st_size)
+        return state
+
+    def _poll_forever(self) -> None:
+        # A private snapshot that always revalidates by mtime tells which directories changed.
+        scan_snapshot = ProjectTreeSnapshot(self.project_path, DEFAULT_IGNORE_PATTERNS)
+        scan_snapshot.refresh()
+        previous = self._metadata_state()
+        self._prime()
+        while not self._stop_event.wait(self.poll_interval):
+            for path in scan_snapshot.refresh_directories():
+                self.handle_change(path, True)
+            current = self._metadata_state()
+            for path in current.keys() | previous.keys():
+                if current.get(path) != previous.get(path):
+                    self.handle_change(path)
+            previous = current
+
+
+_watchers: Dict[str, ProjectWatcher] = {}
+_watchers_lock = threading.Lock()
+
+
+def watching_enabled() -> bool:
+    """Whether AGENT_WATCH_PROJECTS asks the graph to watch the projects it works on."""
+    return os.getenv("AGENT_WATCH_PROJECTS", "").lower() in ("1", "true", "yes")
+
+
+def watch_project(project_path: str, backend: Optional[str] = None,
+                  poll_interval: float = DEFAULT_POLL_INTERVAL) -> ProjectWatcher:
+    """
+    Returns the running watcher for a project, starting one on first use.
+
+    Args:
+        project_path (str): The project root.
+        backend (str, optional): "watchdog" or "polling". Defaults to watchdog when it is installed.
+        poll_interval (float): Seconds between scans of the polling backend.
+
+    Returns:
+        ProjectWatcher: The watcher, keyed by the absolute project path.
+    """
+    key = os.path.abspath(project_path)
+    with _watchers_lock:
+        watcher = _watchers.get(key)
+        if watcher is None:
+            watcher = ProjectWatcher(key, backend, poll_interval).start()
+            _watchers[key] = watcher
+        return watcher
+
+
+def ensure_watched(project_path: Optional[str]) -> None:
+    """Starts a watcher for the project if AGENT_WATCH_PROJECTS is set and it is a directory."""
+    if project_path and watching_enabled() and os.path.isdir(project_path):
+        watch_project(project_path)
+
+
+def unwatch_project(project_path: str) -> None:
+    """Stops the watcher of a project, if there is one."""
+    with _watchers_lock:
+        watcher = _watchers.pop(os.path.abspath(project_path), None)
+    if watcher is not None:
+        watcher.stop()
+
+
+def stop_all_watchers() -> None:
+    """Stops every running watcher."""
+    with _watchers_lock:
+        watchers = list(_watchers.values())
+        _watchers.clear()
+    for watcher in watchers:
+        watcher.stop()
@@ -0,0 +1,105 @@
+"""Concurrent execution of the tool calls from one LLM message.
+
+Calls are grouped into lanes by the file they touch. Lanes run concurrently on a bounded
+thread pool while the calls inside a lane run in their original order, so two writes to
+the same path never race. Shell commands share the executor's working directory and can
+touch any file, so each one acts as a barrier: it waits for everything before it and runs
+alone. Results come back in the original order with per-call timings.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.messages import ToolMessage
+from langchain_core.runnables import RunnableConfig
+
+DEFAULT_TOOL_WORKERS = 4
+
+# Tools that run alone, in order with everything else.
+BARRIER_TOOLS = {"run_bash_command"}
+
+_shared_pool: Optional[ThreadPoolExecutor] = None
+_shared_pool_lock = threading.Lock()
+
+
+def _get_shared_pool() -> ThreadPoolExecutor:
+    """Process-wide pool, so concurrent runs together stay within DEFAULT_TOOL_WORKERS threads."""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = ThreadPoolExecutor(max_workers=DEFAULT_TOOL_WORKERS, thread_name_prefix="tool-call")
+        return _shared_pool
+
+
+def _lane_key(tool_call: Dict[str, Any]) -> Tuple[str, str]:
+    file_path = tool_call["args"].get("file_path")
+    if file_path:
+        return "path", os.path.abspath(file_path)
+    # Unknown tools without a path get a lane of their own.
+    return "call", tool_call["id"]
+
+
+def _run_lane(tools_by_name: Dict[str, Any], lane: List[Tuple[int, Dict[str, Any]]],
+              config: Optional[RunnableConfig] = None) -> List[Tuple[int, ToolMessage]]:
+    results = []
+    for index, tool_call in lane:
+        tool = tools_by_name[tool_call["name"]]
+        start = time.perf_counter()
+        observation = tool.invoke(tool_call["args"], config)
+        duration = time.perf_counter() - start
+        results.append((index, ToolMessage(
+            content=observation,
+            tool_call_id=tool_call["id"],
+            response_metadata={"tool_name": tool_call["name"], "duration_seconds": round(duration, 4)},
+        )))
+    return results
+
+
+def execute_tool_calls(tool_calls: List[Dict[str, Any]], tools_by_name: Dict[str, Any],
+                       executor: Optional[ThreadPoolExecutor] = None,
+                       config: Optional[RunnableConfig] = None) -> List[ToolMessage]:
+    """
+    Runs the tool calls of one LLM message, concurrently where it is safe.
+
+    Args:
+        tool_calls (List[dict]): The `tool_calls` of an AIMessage.
+        tools_by_name (dict): Tool name to tool.
+        executor (ThreadPoolExecutor, optional): Pool to run the lanes on. Defaults to a
+                                                 process-wide pool of DEFAULT_TOOL_WORKERS threads.
+        config (RunnableConfig, optional): Passed to every tool, e.g. so shell commands find their run's executor.
+
+    Returns:
+        List[ToolMessage]: One message per call, in the original order. Each message carries
+                           `tool_name` and `duration_seconds` in its `response_metadata`.
+    """
+    # Split into batches at barrier tools; inside a batch, group calls into lanes by path.
+    batches: List[Dict[Tuple[str, str], List[Tuple[int, Dict[str, Any]]]]] = [{}]
+    for index, tool_call in enumerate(tool_calls):
+        if tool_call["name"] in BARRIER_TOOLS:
+            batches.append({("barrier", tool_call["id"]): [(index, tool_call)]})
+            batches.append({})
+        else:
+            batches[-1].setdefault(_lane_key(tool_call), []).append((index, tool_call))
+
+    results: List[Optional[ToolMessage]] = [None] * len(tool_calls)
+    for lanes in batches:
+        if len(lanes) <= 1:
+            lane_results = [_run_lane(tools_by_name, lane, config) for lane in lanes.values()]
+        else:
+            pool = executor or _get_shared_pool()
+            futures = [pool.submit(_run_lane, tools_by_name, lane, config) for lane in lanes.values()]
+            lane_results = [future.result() for future in futures]
+        for lane_result in lane_results:
+            for index, message in lane_result:
+                results[index] = message
+
+    if len(results) > 1:
+        timings = ", ".join(
+            f"{message.response_metadata['tool_name']}={message.response_metadata['duration_seconds']}s"
+            for message in results
+        )
+        print(f"Ran {len(results)} tool calls: {timings}")
+    return results
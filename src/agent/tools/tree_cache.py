@@ -0,0 +1,412 @@
+"""Cached project-tree snapshots.
+
+A `ProjectTreeSnapshot` keeps the directory listing of a project in memory and
+revalidates it with one `stat` per directory. Only directories whose mtime has
+changed are listed again, and the rendered tree is memoized per subtree, so
+repeated calls on an unchanged project cost close to nothing. Entries are filtered
+with the same `IgnoreMatcher` as `walk_project`; a directory is also rescanned,
+with everything below it, when its .gitignore changes. The registry keeps the most
+recently used snapshots, at most `DEFAULT_MAX_SNAPSHOTS` besides the watched ones.
+
+While a filesystem watcher owns a snapshot (`watched`), it reports changed paths with
+`invalidate` and a refresh only revisits those directories instead of the whole tree.
+Other caches built on a shared snapshot, like the metadata index, compare its `version`
+to tell whether anything changed since they last looked.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+from .ignore_walker import GITIGNORE_FILE, IgnoreMatcher, get_ignore_matcher
+
+DEFAULT_MAX_SNAPSHOTS = int(os.getenv("TREE_CACHE_MAX_SNAPSHOTS", "32"))
+
+
+class _DirNode:
+    __slots__ = ("path", "relative_path", "mtime_ns", "gitignore_mtime_ns", "matcher", "children", "hidden_files",
+                 "subdirs", "rendered")
+
+    def __init__(self, path: str, relative_path: str = ""):
+        self.path = path
+        # '/'-separated path from the root with a trailing slash, "" for the root.
+        self.relative_path = relative_path
+        self.mtime_ns: Optional[int] = None
+        # mtime of the directory's own .gitignore, None if it has none.
+        self.gitignore_mtime_ns: Optional[int] = None
+        # Ignore rules in effect for this directory's entries.
+        self.matcher: Optional[IgnoreMatcher] = None
+        # Sorted (name, is_directory) pairs, directories first, like the tree output.
+        self.children: List[Tuple[str, bool]] = []
+        # Files left out only because their basename is an ignore pattern, see `find_files`.
+        self.hidden_files: Tuple[str, ...] = ()
+        # Child directories we descend into (symlinked directories are listed but not walked).
+        self.subdirs: Dict[str, "_DirNode"] = {}
+        # (prefix, rendered lines) of the last render of this subtree.
+        self.rendered: Optional[Tuple[str, str]] = None
+
+
+class ProjectTreeSnapshot:
+    """
+    In-memory snapshot of a project tree that only rescans changed directories.
+
+    Args:
+        root_path (str): The path to the root folder of the project.
+        ignore_patterns (set): File or folder basenames (or globs) to leave out of the tree.
+        use_gitignore (bool): Also leave out what the project's .gitignore files ignore.
+    """
+
+    def __init__(self, root_path: str, ignore_patterns: Set[str], use_gitignore: bool = True):
+        self.root_path = root_path
+        self.ignore_patterns = frozenset(ignore_patterns)
+        self.use_gitignore = use_gitignore
+        self._matcher = get_ignore_matcher(self.ignore_patterns)
+        self._root = _DirNode(root_path)
+        self._lock = threading.Lock()
+        # Set by a filesystem watcher that calls `invalidate` on every change under the root.
+        self.watched = False
+        # Paths reported by the watcher since the last refresh, and whether everything must be revalidated.
+        self._dirty: Set[str] = set()
+        self._full_refresh = True
+        self._dirty_lock = threading.Lock()
+        # Collects the directories listed again during `refresh_directories`.
+        self._rescanned: Optional[List[str]] = None
+        # Bumped whenever a revalidation changes a directory listing.
+        self.version = 0
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """
+        Reports a change for a watched snapshot.
+
+        Args:
+            path (str, optional): The file or directory that changed. None revalidates the whole tree.
+        """
+        with self._dirty_lock:
+            if path is None:
+                self._full_refresh = True
+                self._dirty.clear()
+            elif self.watched and not self._full_refresh:
+                path = os.path.abspath(path)
+                # The entry's own directory lists it; a changed directory may need rescanning itself.
+                self._dirty.add(os.path.dirname(path))
+                self._dirty.add(path)
+
+    def render(self, display_root: Optional[str] = None) -> str:
+        """
+        Revalidates the snapshot and returns the tree-like string representation.
+
+        Args:
+            display_root (str, optional): Name shown on the root line. Defaults to the root path.
+
+        Returns:
+            str: The same output format as `get_project_structure_as_string`.
+        """
+        display_root = self.root_path if display_root is None else display_root
+        with self._lock:
+            self._revalidate()
+            body = self._render(self._root, "")
+
+        if body:
+            return f"└── {display_root}/\n{body}"
+        return f"└── {display_root}/"
+
+    def refresh(self) -> bool:
+        """Revalidates the snapshot without rendering it; returns True if any directory listing changed."""
+        with self._lock:
+            return self._revalidate()
+
+    def refresh_directories(self) -> List[str]:
+        """
+        Revalidates the snapshot and returns the directories that were listed again.
+
+        A directory is listed again when its mtime or ignore rules changed, or when it was
+        removed, so this is what changed on disk apart from edits to existing files.
+
+        Returns:
+            List[str]: Absolute directory paths, parents before their children.
+        """
+        with self._lock:
+            self._rescanned = []
+            try:
+                self._revalidate()
+                return self._rescanned
+            finally:
+                self._rescanned = None
+
+    def directories(self) -> List[str]:
+        """Absolute paths of the directories the snapshot descends into, as of the last refresh, parents first."""
+        found = []
+        with self._lock:
+            stack = [self._root]
+            while stack:
+                node = stack.pop()
+                found.append(node.path)
+                stack.extend(reversed(node.subdirs.values()))
+        return found
+
+    def is_ignored(self, path: str, is_directory: bool = False) -> bool:
+        """
+        Whether the snapshot leaves `path` out, or it is outside the root.
+
+        Each part of the path is checked against the rules of its directory as of the last
+        refresh; below a directory the snapshot has not listed yet, the last known rules apply.
+        """
+        relative_path = os.path.relpath(os.path.abspath(path), self.root_path)
+        if relative_path == os.curdir:
+            return False
+        if relative_path == os.pardir or relative_path.startswith(os.pardir + os.sep):
+            return True
+
+        parts = relative_path.split(os.sep)
+        with self._lock:
+            node = self._root
+            matcher = self._matcher
+            prefix = ""
+            for index, part in enumerate(parts):
+                if node is not None and node.matcher is not None:
+                    matcher = node.matcher
+                part_is_directory = is_directory or index < len(parts) - 1
+                if matcher.is_ignored(prefix + part, part, part_is_directory):
+                    return True
+                prefix += part + "/"
+                node = node.subdirs.get(part) if node is not None else None
+        return False
+
+    def _revalidate(self) -> bool:
+        with self._dirty_lock:
+            full_refresh = self._full_refresh or not self.watched
+            dirty, self._dirty = self._dirty, set()
+            self._full_refresh = False
+        if full_refresh:
+            changed = self._refresh(self._root, self._matcher)
+        else:
+            changed = False
+            # Parents first, so a directory that was just listed is found by its children's paths.
+            for path in sorted(dirty, key=len):
+                if self._refresh_path(path):
+                    changed = True
+        if changed:
+            self.version += 1
+        return changed
+
+    def _refresh_path(self, path: str) -> bool:
+        """Revalidates the deepest known directory on `path` without walking the rest of the tree."""
+        relative_path = os.path.relpath(path, self.root_path)
+        if relative_path == os.pardir or relative_path.startswith(os.pardir + os.sep):
+            return False
+
+        ancestors = []
+        node = self._root
+        for part in relative_path.split(os.sep):
+            child = node.subdirs.get(part) if part != os.curdir else node
+            if child is None:
+                break
+            if child is not node:
+                ancestors.append(node)
+                node = child
+
+        matcher = ancestors[-1].matcher if ancestors else self._matcher
+        if not self._refresh(node, matcher, recursive=False):
+            return False
+        for ancestor in ancestors:
+            ancestor.rendered = None
+        return True
+
+    def find_files(self, name: str) -> List[str]:
+        """
+        Finds the files called `name` in the snapshot as of the last refresh.
+
+        Asking for a name exempts it from the ignored basenames, so a file the tree leaves out
+        only for its name (like agent_metadata.md) is found; other ignore rules still apply.
+
+        Returns:
+            List[str]: '/'-separated paths relative to the root, in tree order.
+        """
+        entry = (name, False)
+        found = []
+        with self._lock:
+            stack = [self._root]
+            while stack:
+                node = stack.pop()
+                if entry in node.children or name in node.hidden_files:
+                    found.append(node.relative_path + name)
+                stack.extend(reversed(node.subdirs.values()))
+        return found
+
+    def _scan(self, node: _DirNode, matcher: IgnoreMatcher) -> None:
+        try:
+            with os.scandir(node.path) as iterator:
+                entries = list(iterator)
+        except OSError:
+            entries = []
+
+        node.gitignore_mtime_ns = None
+        if self.use_gitignore and any(entry.name == GITIGNORE_FILE for entry in entries):
+            gitignore_path = os.path.join(node.path, GITIGNORE_FILE)
+            try:
+                node.gitignore_mtime_ns = os.stat(gitignore_path).st_mtime_ns
+                matcher = matcher.with_gitignore(gitignore_path, node.relative_path)
+            except OSError:
+                pass
+        node.matcher = matcher
+
+        dir_names = []
+        file_names = []
+        hidden_files = []
+        descend = set()
+        for entry in entries:
+            try:
+                is_directory = entry.is_dir()
+            except OSError:
+                is_directory = False
+            relative_path = node.relative_path + entry.name
+            if matcher.is_ignored(relative_path, entry.name, is_directory):
+                if not is_directory and entry.name in matcher.names and \
+                        not matcher.is_ignored(relative_path, entry.name, False, check_names=False):
+                    hidden_files.append(entry.name)
+                continue
+            if is_directory:
+                dir_names.append(entry.name)
+                # os.walk lists symlinked directories but does not descend into them.
+                if not entry.is_symlink():
+                    descend.add(entry.name)
+            else:
+                file_names.append(entry.name)
+
+        node.children = [(name, True) for name in sorted(dir_names)] + [(name, False) for name in sorted(file_names)]
+        node.hidden_files = tuple(sorted(hidden_files))
+        node.subdirs = {
+            name: node.subdirs.get(name) or _DirNode(os.path.join(node.path, name), f"{node.relative_path}{name}/")
+            for name in sorted(descend)
+        }
+
+    def _gitignore_changed(self, node: _DirNode) -> bool:
+        if node.gitignore_mtime_ns is None:
+            # A .gitignore that appears changes the directory's mtime.
+            return False
+        try:
+            return os.stat(os.path.join(node.path, GITIGNORE_FILE)).st_mtime_ns != node.gitignore_mtime_ns
+        except OSError:
+            return True
+
+    def _refresh(self, node: _DirNode, matcher: IgnoreMatcher, force: bool = False, recursive: bool = True) -> bool:
+        """
+        Rescans `node` if its mtime or ignore rules changed and recurses; returns True if anything below it changed.
+
+        `matcher` holds the rules of the parent directory. `force` is set when they changed, which
+        means every directory below has to be filtered again. Without `recursive`, only new
+        subdirectories (and, if forced, all of them) are visited below `node`.
+        """
+        changed = False
+        try:
+            mtime_ns = os.stat(node.path).st_mtime_ns
+        except OSError:
+            mtime_ns = None
+
+        if mtime_ns is None:
+            if node.children or node.mtime_ns is not None:
+                node.children, node.hidden_files, node.subdirs, node.mtime_ns = [], (), {}, None
+                changed = True
+                if self._rescanned is not None:
+                    self._rescanned.append(node.path)
+        elif force or mtime_ns != node.mtime_ns or self._gitignore_changed(node):
+            if self._rescanned is not None:
+                self._rescanned.append(node.path)
+            previous_children = node.children
+            previous_rules = node.matcher.rules if node.matcher is not None else None
+            previous_hidden_files = node.hidden_files
+            self._scan(node, matcher)
+            node.mtime_ns = mtime_ns
+            changed = node.children != previous_children or node.hidden_files != previous_hidden_files
+            force = node.matcher.rules != previous_rules
+
+        for child in node.subdirs.values():
+            if recursive or force or child.mtime_ns is None:
+                if self._refresh(child, node.matcher, force):
+                    changed = True
+
+        if changed:
+            node.rendered = None
+        return changed
+
+    def _render(self, node: _DirNode, current_prefix: str) -> str:
+        if node.rendered is not None and node.rendered[0] == current_prefix:
+            return node.rendered[1]
+
+        lines = []
+        for index, (name, is_directory) in enumerate(node.children):
+            is_last_item = (index == len(node.children) - 1)
+
+            connector = "└── " if is_last_item else "├── "
+
+            display_name = f"{name}/" if is_directory else name
+            lines.append(f"{current_prefix}{connector}{display_name}")
+
+            child = node.subdirs.get(name) if is_directory else None
+            if child is not None:
+                prefix_for_next_level = current_prefix + ("    " if is_last_item else "│   ")
+                block = self._render(child, prefix_for_next_level)
+                if block:
+                    lines.append(block)
+
+        text = "\n".join(lines)
+        node.rendered = (current_prefix, text)
+        return text
+
+
+_snapshots: "OrderedDict[Tuple[str, FrozenSet[str], bool], ProjectTreeSnapshot]" = OrderedDict()
+_snapshots_lock = threading.Lock()
+
+
+def get_tree_snapshot(folder_path: str, ignore_patterns: Set[str], use_gitignore: bool = True) -> ProjectTreeSnapshot:
+    """
+    Returns the process-wide snapshot for a project root, creating it on first use.
+
+    Creating one evicts the least recently used snapshots beyond `DEFAULT_MAX_SNAPSHOTS`;
+    snapshots a watcher keeps up to date are never evicted.
+
+    Args:
+        folder_path (str): The path to the root folder of the project.
+        ignore_patterns (set): File or folder basenames (or globs) to leave out of the tree.
+        use_gitignore (bool): Also leave out what the project's .gitignore files ignore.
+
+    Returns:
+        ProjectTreeSnapshot: The snapshot keyed by the absolute root path, ignore patterns and gitignore flag.
+    """
+    key = (os.path.abspath(folder_path), frozenset(ignore_patterns), use_gitignore)
+    with _snapshots_lock:
+        snapshot = _snapshots.get(key)
+        if snapshot is not None:
+            _snapshots.move_to_end(key)
+            return snapshot
+        snapshot = ProjectTreeSnapshot(*key)
+        _snapshots[key] = snapshot
+        evictable = [other for other, cached in _snapshots.items() if not cached.watched]
+        for other in evictable[:max(len(evictable) - DEFAULT_MAX_SNAPSHOTS, 0)]:
+            del _snapshots[other]
+        return snapshot
+
+
+def invalidate_tree_snapshots(path: Optional[str] = None, recursive: bool = False) -> None:
+    """
+    Reports a changed path (or, if None, a change anywhere) to every snapshot.
+
+    With `recursive`, anything below `path` may have changed, so every snapshot whose root
+    contains it or lies below it revalidates its whole tree.
+    """
+    with _snapshots_lock:
+        snapshots = list(_snapshots.values())
+    if recursive and path is not None:
+        path = os.path.abspath(path)
+        snapshots = [snapshot for snapshot in snapshots
+                     if os.path.commonpath([snapshot.root_path, path]) in (snapshot.root_path, path)]
+        path = None
+    for snapshot in snapshots:
+        snapshot.invalidate(path)
+
+
+def clear_tree_snapshots() -> None:
+    """Drops every cached snapshot, forcing the next call to rescan from scratch."""
+    with _snapshots_lock:
+        _snapshots.clear()
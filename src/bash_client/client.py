@@ -1,21 +1,292 @@
 import subprocess
 import os
+import selectors
+import shlex
+import signal
+import tempfile
+import threading
+import time
+import uuid
+
+DEFAULT_TIMEOUT_SECONDS = float(os.getenv("BASH_TIMEOUT_SECONDS", "300"))
+DEFAULT_MAX_OUTPUT_BYTES = int(os.getenv("BASH_MAX_OUTPUT_BYTES", str(64 * 1024 * 1024)))
+DEFAULT_HEAD_BYTES = 8 * 1024
+DEFAULT_TAIL_BYTES = 8 * 1024
+# "persistent" keeps one bash process per executor; "oneshot" starts a new shell for every command.
+DEFAULT_SESSION_MODE = os.getenv("BASH_SESSION_MODE", "persistent")
+
+_READ_CHUNK_BYTES = 64 * 1024
+# How often a quiet command is checked for exit, and how long output is drained after it exits.
+_POLL_INTERVAL_SECONDS = 0.1
+
+
+class OutputWindow:
+    """
+    Keeps the head and tail of a byte stream and counts everything in between.
+
+    Memory stays bounded by head_bytes + tail_bytes no matter how much output a command writes.
+    """
+
+    def __init__(self, head_bytes: int = DEFAULT_HEAD_BYTES, tail_bytes: int = DEFAULT_TAIL_BYTES):
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total_bytes = 0
+
+    def feed(self, data: bytes) -> None:
+        self.total_bytes += len(data)
+        if len(self.head) < self.head_bytes:
+            taken = self.head_bytes - len(self.head)
+            self.head += data[:taken]
+            data = data[taken:]
+        if data and self.tail_bytes:
+            self.tail += data
+            if len(self.tail) > self.tail_bytes:
+                del self.tail[:len(self.tail) - self.tail_bytes]
+
+    @property
+    def truncated(self) -> bool:
+        return self.total_bytes > len(self.head) + len(self.tail)
+
+    def render(self) -> str:
+        """The captured text, with a marker where bytes were dropped."""
+        head = self.head.decode("utf-8", errors="replace")
+        if not self.truncated:
+            return head + self.tail.decode("utf-8", errors="replace")
+        omitted = self.total_bytes - len(self.head) - len(self.tail)
+        return (f"{head}\n... [{omitted} bytes omitted] ...\n"
+                f"{self.tail.decode('utf-8', errors='replace')}")
+
+
+def _kill_process_group(process: subprocess.Popen) -> None:
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+class _MarkedStream:
+    """Feeds a session's output into a window until the end-of-command marker line shows up."""
+
+    def __init__(self, window: OutputWindow, marker: bytes):
+        self.window = window
+        self.marker = b"\n" + marker
+        self.buffer = bytearray()
+        self.trailer = None
+
+    @property
+    def done(self) -> bool:
+        return self.trailer is not None
+
+    def feed(self, data: bytes) -> None:
+        self.buffer += data
+        index = self.buffer.find(self.marker)
+        if index == -1:
+            # Hold back enough bytes to catch a marker split across reads.
+            keep = len(self.marker)
+            if len(self.buffer) > keep:
+                self.window.feed(bytes(self.buffer[:-keep]))
+                del self.buffer[:-keep]
+            return
+
+        end = self.buffer.find(b"\n", index + len(self.marker))
+        if end == -1:
+            return
+        self.window.feed(bytes(self.buffer[:index]))
+        self.trailer = self.buffer[index + len(self.marker):end].decode("utf-8", errors="replace").strip()
+        self.buffer.clear()
+
+    def flush(self) -> None:
+        self.window.feed(bytes(self.buffer))
+        self.buffer.clear()
+
+
+class ShellSession:
+    """
+    A long-lived bash process that runs commands one after another, like a terminal.
+
+    Each command is sent over stdin through `eval` (so a syntax error does not end the session)
+    followed by a line that prints a unique marker with the exit code and working directory.
+    `cd`, `export`, activated virtualenvs and shell functions carry over between commands.
+    If a command times out, floods the output or exits the shell, the session is closed and
+    the next command starts a fresh one in the last known directory.
+
+    With a `setup_command` (e.g. `ulimit` limits) every command runs in a subshell that runs
+    the setup first, so a CPU limit counts each command on its own rather than the whole
+    session. Only the working directory is carried back from the subshell; variables and
+    functions a command defines do not outlive it.
+    """
+
+    def __init__(self, cwd: str, setup_command: str = None):
+        self.cwd = cwd
+        self.setup_command = setup_command
+        self.process = None
+        self._pwd_file = None
+        self._lock = threading.Lock()
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def _start(self) -> None:
+        if self.setup_command and self._pwd_file is None:
+            fd, self._pwd_file = tempfile.mkstemp(prefix="agent_pwd_")
+            os.close(fd)
+        self.process = subprocess.Popen(
+            ["bash", "--noprofile", "--norc"],
+            cwd=self.cwd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            start_new_session=True,
+        )
+
+    def close(self) -> None:
+        """Kills the shell and everything it started."""
+        if self.process is None:
+            return
+        _kill_process_group(self.process)
+        for pipe in (self.process.stdin, self.process.stdout, self.process.stderr):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+        self.process.wait()
+        self.process = None
+        if self._pwd_file is not None:
+            try:
+                os.remove(self._pwd_file)
+            except OSError:
+                pass
+            self._pwd_file = None
+
+    def run(self, command: str, timeout: float, max_output_bytes: int, head_bytes: int, tail_bytes: int):
+        """
+        Runs one command in the session.
+
+        Returns:
+            tuple: (stdout window, stderr window, exit code or None if the command was killed, notes)
+        """
+        with self._lock:
+            if not self.alive:
+                self._start()
+            return self._run(command, timeout, max_output_bytes, head_bytes, tail_bytes)
+
+    def _run(self, command: str, timeout: float, max_output_bytes: int, head_bytes: int, tail_bytes: int):
+        stdout = OutputWindow(head_bytes, tail_bytes)
+        stderr = OutputWindow(head_bytes, tail_bytes)
+        notes = []
+        marker = f"__agent_command_done_{uuid.uuid4().hex}__"
+        streams = {
+            self.process.stdout.fileno(): _MarkedStream(stdout, marker.encode()),
+            self.process.stderr.fileno(): _MarkedStream(stderr, marker.encode()),
+        }
+
+        # The command reads from /dev/null so it cannot swallow the marker lines that follow it.
+        script = f"eval {shlex.quote(command)} < /dev/null\n__agent_status=$?\n"
+        if self.setup_command:
+            # The subshell leaves its directory in the pwd file, which starts out as the current
+            # one in case the subshell is killed by its limits.
+            pwd_file = shlex.quote(self._pwd_file)
+            script = (
+                f"printf '%s' \"$PWD\" > {pwd_file}\n"
+                f"( {self.setup_command}\n"
+                f"eval {shlex.quote(command)} < /dev/null\n"
+                f"__agent_status=$?\n"
+                f"printf '%s' \"$PWD\" > {pwd_file}\n"
+                f"exit $__agent_status )\n"
+                f"__agent_status=$?\n"
+                f"read -r __agent_pwd < {pwd_file}\n"
+                f"cd \"$__agent_pwd\"\n"
+            )
+        script += (
+            f"printf '\\n{marker} %d %s\\n' \"$__agent_status\" \"$PWD\"\n"
+            f"printf '\\n{marker}\\n' >&2\n"
+        )
+        try:
+            self.process.stdin.write(script.encode("utf-8"))
+            self.process.stdin.flush()
+        except BrokenPipeError:
+            self.close()
+            notes.append("The shell session had ended; a new one will be started for the next command.")
+            return stdout, stderr, None, notes
+
+        deadline = time.monotonic() + timeout
+        with selectors.DefaultSelector() as selector:
+            selector.register(self.process.stdout, selectors.EVENT_READ)
+            selector.register(self.process.stderr, selectors.EVENT_READ)
+
+            while not all(stream.done for stream in streams.values()):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.close()
+                    notes.append(f"Command timed out after {timeout:g}s and was killed; the shell session was restarted.")
+                    return stdout, stderr, None, notes
+
+                ready = selector.select(timeout=min(remaining, _POLL_INTERVAL_SECONDS))
+                ended = not ready and self.process.poll() is not None
+                for key, _ in ready:
+                    data = os.read(key.fd, _READ_CHUNK_BYTES)
+                    if data:
+                        streams[key.fd].feed(data)
+                    else:
+                        selector.unregister(key.fileobj)
+                        ended = ended or not selector.get_map()
+
+                if ended:
+                    # The command exited the shell itself (e.g. `exit 3`).
+                    for stream in streams.values():
+                        stream.flush()
+                    exit_code = self.process.wait()
+                    self.close()
+                    notes.append("The command ended the shell session; a new one will be started for the next command.")
+                    return stdout, stderr, exit_code, notes
+
+                if stdout.total_bytes + stderr.total_bytes > max_output_bytes:
+                    self.close()
+                    notes.append(f"Command was killed after writing more than {max_output_bytes} bytes; "
+                                 f"the shell session was restarted.")
+                    return stdout, stderr, None, notes
+
+        status, _, cwd = streams[self.process.stdout.fileno()].trailer.partition(" ")
+        if cwd:
+            self.cwd = cwd
+        return stdout, stderr, int(status), notes
 
 
 class InteractiveCMDExecutor:
-    def __init__(self, initial_dir="/home/nnikolovskii"):
+    def __init__(self, initial_dir="/home/nnikolovskii", timeout: float = DEFAULT_TIMEOUT_SECONDS,
+                 max_output_bytes: int = DEFAULT_MAX_OUTPUT_BYTES, head_bytes: int = DEFAULT_HEAD_BYTES,
+                 tail_bytes: int = DEFAULT_TAIL_BYTES, persistent: bool = DEFAULT_SESSION_MODE == "persistent",
+                 setup_command: str = None):
         self.current_dir = initial_dir or os.getcwd()
+        self.persistent = persistent
+        # Shell command run in every child shell before the user's commands, e.g. `ulimit` limits.
+        self.setup_command = setup_command
+        self._session = None
+        self.timeout = timeout
+        self.max_output_bytes = max_output_bytes
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
 
     def execute(self, command: str):
         """
         Executes a command like in CMD, supports 'cd' to change directory.
+
+        In persistent mode the command runs in this executor's shell session, so directory and
+        environment changes carry over. Otherwise every command gets a fresh shell and only a
+        leading 'cd' is remembered.
+
+        Output is read while the command runs and only its head and tail are kept. The command
+        is killed if it runs longer than `timeout` seconds or writes more than `max_output_bytes`.
         """
         command = command.strip()
         if not command:
             return "", ""
 
         # Handle 'cd' internally
-        if command.lower().startswith("cd "):
+        if not self.persistent and command.lower().startswith("cd "):
             path = command[3:].strip()
             new_dir = os.path.normpath(os.path.join(self.current_dir, path))
             if os.path.isdir(new_dir):
@@ -24,24 +295,26 @@ class InteractiveCMDExecutor:
             else:
                 return "", f"The system cannot find the path specified: {new_dir}"
 
-        # Run other commands using subprocess
+        # Run other commands in a subprocess, streaming their output
         try:
-            output = ""
+            if self.persistent:
+                stdout, stderr, exit_code, notes = self._run_in_session(command)
+            else:
+                stdout, stderr, exit_code, notes = self._run_streaming(command)
 
-            result = subprocess.run(
-                command,
-                cwd=self.current_dir,
-                shell=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                encoding='utf-8',
-                errors='replace'
-            )
-            if result.stdout:
-                output += f"STDOUT:\n{result.stdout}\n"
-            if result.stderr:
-                output += f"STDERR:\n{result.stderr}\n"
+            if exit_code:
+                notes.append(f"Exit code: {exit_code}")
+
+            output = ""
+            if stdout.total_bytes:
+                output += f"STDOUT:\n{stdout.render()}\n"
+            if stderr.total_bytes:
+                output += f"STDERR:\n{stderr.render()}\n"
+            if stdout.truncated or stderr.truncated:
+                notes.append(f"Output truncated: {stdout.total_bytes} bytes on stdout and "
+                             f"{stderr.total_bytes} bytes on stderr in total; only the head and tail are shown.")
+            if notes:
+                output += "".join(f"[{note}]\n" for note in notes)
             if not output:
                 output = "Command executed successfully with no output."
 
@@ -49,4 +322,76 @@ class InteractiveCMDExecutor:
         except Exception as e:
             return f"An error occurred while executing the command: {e}"
 
-bash_executor = InteractiveCMDExecutor()
\ No newline at end of file
+    def _run_in_session(self, command: str):
+        if self._session is None:
+            self._session = ShellSession(self.current_dir, setup_command=self.setup_command)
+        result = self._session.run(command, self.timeout, self.max_output_bytes, self.head_bytes, self.tail_bytes)
+        self.current_dir = self._session.cwd
+        return result
+
+    def close(self) -> None:
+        """Ends the shell session, if one was started."""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def _run_streaming(self, command: str):
+        """Runs the command in a fresh shell, returning its output windows, exit code and notes about how it ended."""
+        stdout = OutputWindow(self.head_bytes, self.tail_bytes)
+        stderr = OutputWindow(self.head_bytes, self.tail_bytes)
+        notes = []
+        killed = False
+
+        # A new session lets a timeout kill the shell together with everything it started.
+        process = subprocess.Popen(
+            f"{self.setup_command}\n{command}" if self.setup_command else command,
+            cwd=self.current_dir,
+            shell=True,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            start_new_session=True,
+        )
+        windows = {process.stdout.fileno(): stdout, process.stderr.fileno(): stderr}
+        deadline = time.monotonic() + self.timeout
+
+        try:
+            with selectors.DefaultSelector() as selector:
+                selector.register(process.stdout, selectors.EVENT_READ)
+                selector.register(process.stderr, selectors.EVENT_READ)
+
+                while selector.get_map():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        _kill_process_group(process)
+                        killed = True
+                        notes.append(f"Command timed out after {self.timeout:g}s and was killed.")
+                        break
+
+                    ready = selector.select(timeout=min(remaining, _POLL_INTERVAL_SECONDS))
+                    # Background jobs can keep the pipes open after the command itself has exited.
+                    if not ready and process.poll() is not None:
+                        break
+
+                    for key, _ in ready:
+                        data = os.read(key.fd, _READ_CHUNK_BYTES)
+                        if not data:
+                            selector.unregister(key.fileobj)
+                            continue
+                        windows[key.fd].feed(data)
+
+                    if stdout.total_bytes + stderr.total_bytes > self.max_output_bytes:
+                        _kill_process_group(process)
+                        killed = True
+                        notes.append(f"Command was killed after writing more than {self.max_output_bytes} bytes.")
+                        break
+        finally:
+            process.stdout.close()
+            process.stderr.close()
+            try:
+                process.wait(timeout=_POLL_INTERVAL_SECONDS * 10)
+            except subprocess.TimeoutExpired:
+                _kill_process_group(process)
+                process.wait()
+
+        return stdout, stderr, None if killed else process.returncode, notes
@@ -0,0 +1,211 @@
+"""Per-run command executors.
+
+Each agent run gets its own `InteractiveCMDExecutor` (and with it its own shell session and
+working directory), checked out by thread or run id. The pool is bounded: when it is full the
+least recently used idle executor is closed, and executors that sit idle too long are reaped.
+Commands can be given CPU-time and memory limits.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from bash_client.client import InteractiveCMDExecutor
+
+DEFAULT_POOL_SIZE = int(os.getenv("BASH_POOL_SIZE", "8"))
+DEFAULT_IDLE_SECONDS = float(os.getenv("BASH_IDLE_SECONDS", "600"))
+# Unset means no limit.
+DEFAULT_CPU_SECONDS = int(os.getenv("BASH_CPU_SECONDS", "0")) or None
+DEFAULT_MEMORY_BYTES = int(os.getenv("BASH_MEMORY_BYTES", "0")) or None
+
+DEFAULT_EXECUTOR_KEY = "default"
+
+
+def resource_limits_command(cpu_seconds: Optional[int] = None, memory_bytes: Optional[int] = None) -> Optional[str]:
+    """
+    Returns a `ulimit` command that applies CPU-time and address-space limits to a shell.
+
+    Executors run it in front of every command, in the shell (or subshell) that runs just that
+    command, so the limits are inherited by everything the command starts and the CPU budget
+    is per command rather than for the whole session.
+
+    Args:
+        cpu_seconds (int, optional): RLIMIT_CPU in seconds.
+        memory_bytes (int, optional): RLIMIT_AS in bytes, rounded down to whole KiB.
+
+    Returns:
+        str or None: None if no limit is set.
+    """
+    limits = []
+    if cpu_seconds:
+        limits.append(f"ulimit -t {int(cpu_seconds)}")
+    if memory_bytes:
+        limits.append(f"ulimit -v {int(memory_bytes) // 1024}")
+    return "; ".join(limits) or None
+
+
+def executor_key(config: Optional[dict]) -> str:
+    """
+    The pool key for a LangGraph run.
+
+    In order: the key the graph gave the run (`configurable.executor_key`), its thread id, its
+    run id (top level, or under `configurable` as the LangGraph server passes it), else a
+    shared default.
+    """
+    config = config or {}
+    configurable = config.get("configurable") or {}
+    key = (configurable.get("executor_key") or configurable.get("thread_id") or config.get("run_id")
+           or configurable.get("run_id"))
+    return str(key) if key else DEFAULT_EXECUTOR_KEY
+
+
+class _PooledExecutor:
+    __slots__ = ("executor", "working_dir", "last_used", "in_use")
+
+    def __init__(self, executor: InteractiveCMDExecutor, working_dir: Optional[str]):
+        self.executor = executor
+        self.working_dir = working_dir
+        self.last_used = time.monotonic()
+        self.in_use = 0
+
+
+class ExecutorPool:
+    """
+    Bounded pool of executors, one per run key.
+
+    Args:
+        max_executors (int): Most executors alive at once. A checkout that needs a new executor
+                             waits while the pool is full and every executor is in use.
+        idle_seconds (float): Executors unused for this long are closed.
+        cpu_seconds (int, optional): CPU-time limit for each command.
+        memory_bytes (int, optional): Address-space limit for each command.
+        **executor_options: Passed to every InteractiveCMDExecutor (timeout, persistent, ...).
+    """
+
+    def __init__(self, max_executors: int = DEFAULT_POOL_SIZE, idle_seconds: float = DEFAULT_IDLE_SECONDS,
+                 cpu_seconds: Optional[int] = DEFAULT_CPU_SECONDS,
+                 memory_bytes: Optional[int] = DEFAULT_MEMORY_BYTES, **executor_options):
+        self.max_executors = max_executors
+        self.idle_seconds = idle_seconds
+        self.executor_options = executor_options
+        self.setup_command = resource_limits_command(cpu_seconds, memory_bytes)
+        self._executors: Dict[str, _PooledExecutor] = {}
+        self._condition = threading.Condition()
+        self._reaper: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        with self._condition:
+            return len(self._executors)
+
+    @contextmanager
+    def checkout(self, key: str = DEFAULT_EXECUTOR_KEY, working_dir: Optional[str] = None):
+        """
+        Lends out the executor for a run, creating it on first use.
+
+        Args:
+            key (str): Run key, see `executor_key`.
+            working_dir (str, optional): Directory the run's shell starts in, usually the project path.
+                                         If a run switches project, its executor is replaced.
+
+        Yields:
+            InteractiveCMDExecutor: The run's executor. It is not closed while checked out.
+        """
+        entry = self._acquire(key, working_dir)
+        try:
+            yield entry.executor
+        finally:
+            with self._condition:
+                entry.in_use -= 1
+                entry.last_used = time.monotonic()
+                self._condition.notify_all()
+
+    def _acquire(self, key: str, working_dir: Optional[str]) -> _PooledExecutor:
+        to_close = []
+        with self._condition:
+            self._start_reaper()
+            while True:
+                to_close.extend(self._pop_idle())
+                entry = self._executors.get(key)
+                if entry is not None and working_dir and entry.working_dir != working_dir and not entry.in_use:
+                    to_close.append(self._executors.pop(key).executor)
+                    entry = None
+                if entry is not None:
+                    break
+
+                if len(self._executors) < self.max_executors:
+                    entry = self._new_entry(working_dir)
+                    self._executors[key] = entry
+                    break
+
+                # Full: make room by closing the least recently used executor that is not in use.
+                idle = [(candidate.last_used, candidate_key) for candidate_key, candidate in self._executors.items()
+                        if not candidate.in_use]
+                if idle:
+                    to_close.append(self._executors.pop(min(idle)[1]).executor)
+                    continue
+                self._condition.wait()
+
+            entry.in_use += 1
+            entry.last_used = time.monotonic()
+
+        for executor in to_close:
+            executor.close()
+        return entry
+
+    def _new_entry(self, working_dir: Optional[str]) -> _PooledExecutor:
+        options = dict(self.executor_options)
+        if working_dir:
+            options["initial_dir"] = working_dir
+        executor = InteractiveCMDExecutor(setup_command=self.setup_command, **options)
+        return _PooledExecutor(executor, working_dir)
+
+    def _pop_idle(self):
+        """Removes executors idle for longer than idle_seconds; the caller closes them outside the lock."""
+        now = time.monotonic()
+        expired = [key for key, entry in self._executors.items()
+                   if not entry.in_use and now - entry.last_used > self.idle_seconds]
+        return [self._executors.pop(key).executor for key in expired]
+
+    def reap_idle(self) -> int:
+        """Closes executors that have been idle for too long and returns how many were closed."""
+        with self._condition:
+            expired = self._pop_idle()
+            if expired:
+                self._condition.notify_all()
+        for executor in expired:
+            executor.close()
+        return len(expired)
+
+    def _start_reaper(self) -> None:
+        if self._reaper is None:
+            self._reaper = threading.Thread(target=self._reap_forever, name="bash-executor-reaper", daemon=True)
+            self._reaper.start()
+
+    def _reap_forever(self) -> None:
+        while True:
+            time.sleep(max(self.idle_seconds / 2, 1.0))
+            self.reap_idle()
+
+    def release(self, key: str) -> None:
+        """Closes the executor of a finished run, if it is not in use."""
+        with self._condition:
+            entry = self._executors.get(key)
+            if entry is None or entry.in_use:
+                return
+            del self._executors[key]
+            self._condition.notify_all()
+        entry.executor.close()
+
+    def close(self) -> None:
+        """Closes every executor that is not in use."""
+        with self._condition:
+            keys = [key for key, entry in self._executors.items() if not entry.in_use]
+            executors = [self._executors.pop(key).executor for key in keys]
+            self._condition.notify_all()
+        for executor in executors:
+            executor.close()
+
+
+bash_executor_pool = ExecutorPool()
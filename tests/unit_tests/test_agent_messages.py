@@ -0,0 +1,31 @@
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from agent.core.agent import _agent_messages
+from agent.models.step_models import Step
+
+
+def test_agent_messages_append_only_within_a_step() -> None:
+    tool_call = {"name": "view_file", "args": {"file_path": "a.py"}, "id": "call_1", "type": "tool_call"}
+    history = [
+        HumanMessage(content="the plan"),
+        AIMessage(content="", tool_calls=[tool_call]),
+        ToolMessage(content="print(1)", tool_call_id="call_1"),
+    ]
+    state = {
+        "steps": [Step(description="first"), Step(description="second")],
+        "current_step_index": 1,
+        "step_message_indices": {0: 0, 1: 1},
+        "project_structure": "└── project/",
+        "plan": "the plan",
+        "messages": history[:2],
+    }
+
+    before = _agent_messages(state)
+    after = _agent_messages({**state, "messages": history})
+
+    assert isinstance(before[0], SystemMessage)
+    assert "└── project/" in before[0].content and "the plan" in before[0].content
+    assert before[0] is after[0]
+    assert "second" in before[1].content and "- first" in before[1].content
+    assert after[:3] == before
+    assert after[2:] == history[1:]
@@ -0,0 +1,101 @@
+import time
+
+from bash_client.client import InteractiveCMDExecutor, OutputWindow
+
+
+def test_output_window_keeps_head_and_tail() -> None:
+    window = OutputWindow(head_bytes=4, tail_bytes=4)
+    for chunk in (b"0123", b"4567", b"89ab"):
+        window.feed(chunk)
+
+    assert window.total_bytes == 12
+    assert window.truncated
+    assert window.render() == "0123\n... [4 bytes omitted] ...\n89ab"
+
+
+def test_short_output_is_returned_whole(tmp_path) -> None:
+    executor = InteractiveCMDExecutor(initial_dir=str(tmp_path))
+
+    output = executor.execute("echo hello; echo oops >&2")
+
+    assert output == "STDOUT:\nhello\n\nSTDERR:\noops"
+
+
+def test_large_output_is_truncated_with_total(tmp_path) -> None:
+    executor = InteractiveCMDExecutor(initial_dir=str(tmp_path), head_bytes=100, tail_bytes=100)
+
+    output = executor.execute("seq 1 200000")
+
+    assert output.startswith("STDOUT:\n1\n2\n")
+    assert "\n200000\n" in output
+    assert "1288895 bytes on stdout" in output
+    assert len(output) < 1000
+
+
+def test_timeout_kills_the_command(tmp_path) -> None:
+    executor = InteractiveCMDExecutor(initial_dir=str(tmp_path), timeout=0.5)
+
+    start = time.monotonic()
+    output = executor.execute("echo started; sleep 30")
+
+    assert time.monotonic() - start < 5
+    assert "started" in output
+    assert "timed out after 0.5s" in output
+
+
+def test_output_cap_kills_the_command(tmp_path) -> None:
+    executor = InteractiveCMDExecutor(initial_dir=str(tmp_path), max_output_bytes=1024 * 1024)
+
+    output = executor.execute("yes")
+
+    assert "killed after writing more than 1048576 bytes" in output
+
+
+def test_background_job_does_not_block(tmp_path) -> None:
+    executor = InteractiveCMDExecutor(initial_dir=str(tmp_path), timeout=10)
+
+    start = time.monotonic()
+    output = executor.execute("sleep 30 & echo done")
+
+    assert time.monotonic() - start < 5
+    assert output == "STDOUT:\ndone"
+
+
+def test_session_keeps_directory_and_environment(tmp_path) -> None:
+    (tmp_path / "sub").mkdir()
+    executor = InteractiveCMDExecutor(initial_dir=str(tmp_path), persistent=True)
+
+    executor.execute("cd sub && export GREETING=hi")
+    output = executor.execute('echo "$GREETING from $(basename "$PWD")"')
+
+    assert output == "STDOUT:\nhi from sub"
+    assert executor.current_dir == str(tmp_path / "sub")
+    executor.close()
+
+
+def test_session_reports_exit_codes_and_survives_errors(tmp_path) -> None:
+    executor = InteractiveCMDExecutor(initial_dir=str(tmp_path), persistent=True)
+    executor.execute("export KEPT=1")
+
+    assert executor.execute("exit_with() { return $1; }; exit_with 4") == "[Exit code: 4]"
+    assert "[Exit code: 2]" in executor.execute("if then")
+    assert executor.execute("cat") == "Command executed successfully with no output."
+    assert executor.execute("echo $KEPT") == "STDOUT:\n1"
+    executor.close()
+
+
+def test_session_restarts_after_exit(tmp_path) -> None:
+    executor = InteractiveCMDExecutor(initial_dir=str(tmp_path), persistent=True)
+    executor.execute("export KEPT=1")
+
+    output = executor.execute("exit 3")
+
+    assert "ended the shell session" in output and "[Exit code: 3]" in output
+    assert executor.execute("echo ${KEPT:-unset}") == "STDOUT:\nunset"
+    executor.close()
+
+
+def test_oneshot_mode_reports_exit_code(tmp_path) -> None:
+    executor = InteractiveCMDExecutor(initial_dir=str(tmp_path), persistent=False)
+
+    assert executor.execute("echo out; exit 5") == "STDOUT:\nout\n\n[Exit code: 5]"
@@ -0,0 +1,124 @@
+import threading
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from agent.core.agent import tool_node
+from agent.core.graph import _release_run_executor
+from bash_client.pool import ExecutorPool, bash_executor_pool, executor_key
+
+
+def test_runs_get_separate_executors(tmp_path) -> None:
+    first, second = tmp_path / "first", tmp_path / "second"
+    first.mkdir()
+    second.mkdir()
+    pool = ExecutorPool(max_executors=4)
+
+    with pool.checkout("run-1", str(first)) as executor:
+        executor.execute("export NAME=one")
+    with pool.checkout("run-2", str(second)) as executor:
+        assert executor.execute('echo "${NAME:-unset} $PWD"') == f"STDOUT:\nunset {second}"
+    with pool.checkout("run-1", str(first)) as executor:
+        assert executor.execute('echo "$NAME $PWD"') == f"STDOUT:\none {first}"
+
+    assert len(pool) == 2
+    pool.close()
+
+
+def test_full_pool_evicts_least_recently_used(tmp_path) -> None:
+    pool = ExecutorPool(max_executors=2)
+    for key in ("a", "b", "a", "c"):
+        with pool.checkout(key, str(tmp_path)):
+            pass
+
+    assert sorted(pool._executors) == ["a", "c"]
+    pool.close()
+
+
+def test_full_pool_waits_for_a_free_executor(tmp_path) -> None:
+    pool = ExecutorPool(max_executors=1)
+    checked_out = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with pool.checkout("a", str(tmp_path)):
+            checked_out.set()
+            release.wait(5)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    checked_out.wait(5)
+    threading.Timer(0.2, release.set).start()
+
+    with pool.checkout("b", str(tmp_path)) as executor:
+        assert executor.execute("echo b") == "STDOUT:\nb"
+    holder.join()
+    pool.close()
+
+
+def test_idle_executors_are_reaped(tmp_path) -> None:
+    pool = ExecutorPool(idle_seconds=0)
+    with pool.checkout("a", str(tmp_path)) as executor:
+        executor.execute("true")
+
+    assert pool.reap_idle() == 1
+    assert len(pool) == 0
+
+
+@pytest.mark.parametrize("persistent", [True, False])
+def test_limits_apply_to_commands(tmp_path, persistent) -> None:
+    pool = ExecutorPool(cpu_seconds=7, memory_bytes=2 * 1024 ** 3, persistent=persistent)
+    with pool.checkout("a", str(tmp_path)) as executor:
+        assert executor.execute("ulimit -t; ulimit -v") == f"STDOUT:\n7\n{2 * 1024 ** 2}"
+        assert executor.execute("bash -c 'ulimit -t'") == "STDOUT:\n7"
+    pool.close()
+
+
+def test_cpu_limit_is_per_command(tmp_path) -> None:
+    (tmp_path / "sub").mkdir()
+    pool = ExecutorPool(cpu_seconds=1, persistent=True)
+    # Each command burns about 0.6s of CPU in the shell; together they exceed the limit.
+    burn = 'end=$((${EPOCHREALTIME/./} + 600000)); while [ ${EPOCHREALTIME/./} -lt $end ]; do :; done; echo done'
+    with pool.checkout("a", str(tmp_path)) as executor:
+        assert executor.execute(f"cd sub; {burn}") == "STDOUT:\ndone"
+        assert executor.execute(f"{burn}; pwd") == f"STDOUT:\ndone\n{tmp_path / 'sub'}"
+    pool.close()
+
+
+def test_executor_key_prefers_thread_id() -> None:
+    assert executor_key({"configurable": {"executor_key": "k", "thread_id": "t"}}) == "k"
+    assert executor_key({"configurable": {"thread_id": "t", "run_id": "r"}}) == "t"
+    assert executor_key({"run_id": "top", "configurable": {}}) == "top"
+    assert executor_key({"configurable": {"run_id": "r"}}) == "r"
+    assert executor_key({}) == "default"
+
+
+def _bash_call(command: str, call_id: str) -> AIMessage:
+    return AIMessage(content="", tool_calls=[{"name": "run_bash_command", "args": {"command": command}, "id": call_id}])
+
+
+def test_concurrent_runs_without_thread_id_get_separate_shells(tmp_path) -> None:
+    states = [{"project_path": str(tmp_path), "messages": [_bash_call(f"export NAME=run{index}", "set")]}
+              for index in range(2)]
+    both_started = threading.Barrier(2)
+
+    def first_call(state):
+        both_started.wait(5)
+        state.update(tool_node(state, {"configurable": {}}))
+
+    runs = [threading.Thread(target=first_call, args=(state,)) for state in states]
+    for run in runs:
+        run.start()
+    for run in runs:
+        run.join()
+
+    assert states[0]["executor_key"] != states[1]["executor_key"]
+    for index, state in enumerate(states):
+        state["messages"] = [_bash_call('echo "$NAME"', "get")]
+        result = tool_node(state, {"configurable": {}})
+        assert result["messages"][0].content == f"STDOUT:\nrun{index}"
+        assert "executor_key" not in result
+
+        # The end of the run closes its shell.
+        _release_run_executor(state)
+        assert state["executor_key"] not in bash_executor_pool._executors
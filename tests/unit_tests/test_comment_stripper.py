@@ -0,0 +1,82 @@
+import ast
+import os
+
+from agent.tools import comment_stripper
+from agent.tools.comment_stripper import strip_comments_in_files, strip_python_comments
+from agent.tools.file_utils import remove_python_comments
+
+SOURCE = '''#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Module docstring with a # that stays."""
+# a full-line comment
+x = "a # not a comment"  # trailing
+y = 'it\\'s # still a string'
+z = f"{x!r:>10} # kept" + rb'\\d#'
+s = """
+# inside a triple-quoted string
+"""
+t = \'\'\'it's
+# also kept\'\'\'
+
+
+def f():
+    return x  # done
+'''
+
+
+def test_only_comments_are_removed() -> None:
+    result = strip_python_comments(SOURCE)
+
+    assert result.startswith("#!/usr/bin/env python\n# -*- coding: utf-8 -*-\n")
+    assert "# a full-line comment" not in result
+    assert "trailing" not in result and "done" not in result
+    assert 'x = "a # not a comment"\n' in result
+    assert "    return x\n" in result
+    assert ast.dump(ast.parse(result)) == ast.dump(ast.parse(SOURCE))
+
+
+def test_code_without_comments_is_unchanged() -> None:
+    code = 'print("#")\n'
+    assert strip_python_comments(code) is code
+
+
+def _write_tree(root, count: int):
+    paths = []
+    for index in range(count):
+        package = os.path.join(root, f"pkg{index % 3}")
+        os.makedirs(package, exist_ok=True)
+        path = os.path.join(package, f"module_{index}.py")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"# header {index}\nVALUE = {index}  # value\n\n\n\nNAME = '#{index}'\n")
+        paths.append(path)
+    return paths
+
+
+def test_remove_python_comments_rewrites_the_tree(tmp_path) -> None:
+    paths = _write_tree(tmp_path, 5)
+    os.makedirs(tmp_path / ".venv")
+    (tmp_path / ".venv" / "ignored.py").write_text("# keep\n")
+
+    assert remove_python_comments(str(tmp_path)) == (5, 0)
+
+    with open(paths[2], encoding="utf-8") as f:
+        assert f.read() == "VALUE = 2\n\nNAME = '#2'\n"
+    assert (tmp_path / ".venv" / "ignored.py").read_text() == "# keep\n"
+    # Atomic writes leave no temporary files behind.
+    assert not [name for name in os.listdir(tmp_path / "pkg0") if name.startswith(".tmp-")]
+
+
+def test_pool_matches_inline_processing(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(comment_stripper, "MIN_FILES_FOR_POOL", 4)
+    pooled = _write_tree(tmp_path / "pooled", 10)
+    inline = _write_tree(tmp_path / "inline", 10)
+    (tmp_path / "bad.py").write_bytes(b"\xff\xfe")
+
+    pooled_results = strip_comments_in_files(pooled + [str(tmp_path / "bad.py")], max_workers=2)
+    strip_comments_in_files(inline, max_workers=1)
+
+    assert [path for path, _ in pooled_results] == pooled + [str(tmp_path / "bad.py")]
+    assert pooled_results[-1][1] is not None
+    for pooled_path, inline_path in zip(pooled, inline):
+        with open(pooled_path, encoding="utf-8") as a, open(inline_path, encoding="utf-8") as b:
+            assert a.read() == b.read()
@@ -0,0 +1,77 @@
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from agent.core.compaction import HistoryCompactor
+
+
+def _turns(count, output_size):
+    messages = []
+    for index in range(count):
+        call = {"name": "view_file", "args": {"file_path": f"f{index}"}, "id": f"call_{index}", "type": "tool_call"}
+        messages.append(AIMessage(content="", tool_calls=[call], id=f"ai_{index}"))
+        messages.append(ToolMessage(content=str(index) * output_size, tool_call_id=f"call_{index}", id=f"tool_{index}"))
+    return messages
+
+
+def test_short_history_is_untouched() -> None:
+    compactor = HistoryCompactor(max_chars=10_000)
+    messages = _turns(3, 100)
+    assert compactor.compact(messages) is messages
+    assert compactor.metrics()["compactions"] == 0
+
+
+def test_old_tool_outputs_are_digested() -> None:
+    compactor = HistoryCompactor(max_chars=10_000, keep_recent_turns=2)
+    messages = _turns(6, 5_000)
+
+    compacted = compactor.compact(messages)
+
+    assert len(compacted) == len(messages)
+    assert [message.tool_call_id for message in compacted if isinstance(message, ToolMessage)] == \
+        [f"call_{index}" for index in range(6)]
+    assert "omitted" in compacted[1].content and len(compacted[1].content) < 2_000
+    assert compacted[-1] is messages[-1] and compacted[-3] is messages[-3]
+    assert compactor.metrics()["chars_saved"] > 10_000
+
+
+def test_summarizer_replaces_older_turns_once() -> None:
+    calls = []
+
+    def summarizer(messages):
+        calls.append(len(messages))
+        return "viewed files"
+
+    compactor = HistoryCompactor(max_chars=1_000, keep_recent_turns=1, summarizer=summarizer,
+                                 summary_chunk_turns=3)
+    messages = _turns(4, 2_000)
+
+    first = compactor.compact(messages)
+    second = compactor.compact(messages)
+
+    assert isinstance(first[0], HumanMessage) and "viewed files" in first[0].content
+    assert first[1:] == messages[-2:]
+    assert second == first
+    assert calls == [6]
+
+
+def test_summarizer_runs_once_per_chunk_across_turns() -> None:
+    calls = []
+
+    def summarizer(messages):
+        calls.append(messages[0].id)
+        return f"summary of {messages[0].id}"
+
+    compactor = HistoryCompactor(max_chars=1_000, keep_recent_turns=1, summarizer=summarizer,
+                                 summary_chunk_turns=2)
+    messages = _turns(10, 2_000)
+
+    previous = None
+    for count in range(2, 11):
+        compacted = compactor.compact(messages[:2 * count])
+        summaries = [message for message in compacted if isinstance(message, HumanMessage)]
+        assert len(summaries) == (count - 1) // 2
+        if previous:
+            # Earlier chunks keep their summary message, so the prompt prefix does not change.
+            assert summaries[:len(previous)] == previous
+        previous = summaries
+
+    assert calls == ["ai_0", "ai_2", "ai_4", "ai_6"]
@@ -0,0 +1,62 @@
+import pytest
+
+from agent.tools.context_builder import ContextBuilder
+from agent.tools.file_utils import FILE_TITLE_FORMAT, concat_files_in_str
+
+
+def _write_files(tmp_path, names):
+    paths = []
+    for name in names:
+        path = tmp_path / name
+        path.write_text(f"contents of {name}")
+        paths.append(str(path))
+    return paths
+
+
+def test_from_context_keeps_order_and_text(tmp_path) -> None:
+    paths = _write_files(tmp_path, ["b.py", "a.py", "c.py"])
+    loaded = ContextBuilder()
+    loaded.add_files(paths)
+    context = loaded.render()
+    assert context == concat_files_in_str(paths)
+
+    builder = ContextBuilder.from_context(context, loaded.block_sizes)
+    assert builder.file_paths == paths
+    assert builder.render() == context
+
+
+def test_from_context_ignores_titles_inside_file_contents(tmp_path) -> None:
+    a_path, b_path = str(tmp_path / "a.py"), str(tmp_path / "b.py")
+    # a.py quotes the title of b.py, which comes after it in the context.
+    (tmp_path / "a.py").write_text('DOC = """\n' + FILE_TITLE_FORMAT.format(file_path=b_path) + '\n"""\n')
+    (tmp_path / "b.py").write_text("B = 1\n")
+    loaded = ContextBuilder()
+    loaded.add_files([a_path, b_path])
+
+    builder = ContextBuilder.from_context(loaded.render(), loaded.block_sizes)
+
+    assert builder.items() == loaded.items()
+    assert builder.remove_files([a_path]) == [a_path]
+    assert builder.render() == concat_files_in_str([b_path])
+
+
+def test_from_context_rejects_boundaries_of_another_context(tmp_path) -> None:
+    a, b = _write_files(tmp_path, ["a.py", "b.py"])
+    loaded = ContextBuilder()
+    loaded.add_files([a, b])
+
+    with pytest.raises(ValueError):
+        ContextBuilder.from_context(concat_files_in_str([b, a]), loaded.block_sizes)
+
+
+def test_add_and_remove_splice_blocks(tmp_path) -> None:
+    a, b, c = _write_files(tmp_path, ["a.py", "b.py", "c.py"])
+    builder = ContextBuilder()
+
+    assert builder.add_files([a, b]) == [a, b]
+    assert builder.add_files([b, c]) == [c]
+    assert builder.render() == concat_files_in_str([a, b, c])
+
+    assert builder.remove_files([b, str(tmp_path / "unknown.py")]) == [b]
+    assert builder.render() == concat_files_in_str([a, c])
+    assert builder.total_size == len(builder.render())
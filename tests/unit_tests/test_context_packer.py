@@ -0,0 +1,102 @@
+from agent.core.graph import build_context
+from agent.tools.context_builder import ContextBuilder
+from agent.tools.context_packer import _truncate_to_tokens, block_content, estimate_tokens, outline_text, pack_context
+from agent.tools.file_utils import format_file_block
+
+
+def test_estimate_tokens_is_cached_and_monotonic() -> None:
+    text = "def add(a, b):\n    return a + b\n"
+    assert estimate_tokens(text) == estimate_tokens(text) > 0
+    assert estimate_tokens(text * 10) > estimate_tokens(text)
+    assert estimate_tokens("") == 0
+
+
+def test_pack_context_falls_back_for_low_priority_files() -> None:
+    small = ("small.py", "x = 1\n")
+    big_body = "\n".join(f"    value_{index} = compute({index})" for index in range(2000))
+    big = ("big.py", f"import os\n\nclass Big:\n    def method(self):\n{big_body}\n")
+
+    # A truncated head carries more of the file than the three-line outline.
+    packed = pack_context([small, big], budget_tokens=600)
+    modes = {packed_file.file_path: packed_file.mode for packed_file in packed.files}
+
+    assert modes["small.py"] == "full"
+    assert modes["big.py"] == "truncated"
+    assert "class Big:" in packed.context and "value_10 " in packed.context and "value_1999 " not in packed.context
+    assert 0 < packed.used_tokens <= 600
+
+    # Too little room for a truncated head: the outline is all that fits.
+    packed = pack_context([small, big], budget_tokens=400)
+    assert [packed_file.mode for packed_file in packed.files] == ["full", "outline"]
+    assert "class Big:" in packed.context and "value_10 " not in packed.context
+    assert packed.used_tokens <= 400
+
+    packed = pack_context([small, big], budget_tokens=10)
+    assert [packed_file.mode for packed_file in packed.files] == ["omitted", "omitted"]
+    assert packed.context == ""
+
+
+def test_truncation_keeps_the_longest_fitting_lines() -> None:
+    content = "".join(f"line {index}: " + "word, " * (index % 7) + "x" * (index % 13) + "\n" for index in range(500))
+    for max_tokens in (0, 1, 5, 37, 200, 1000):
+        head = _truncate_to_tokens(content, max_tokens)
+        assert content.startswith(head) and estimate_tokens(head) <= max_tokens
+        # Keeping one more line would not fit.
+        next_line_end = content.find("\n", len(head) + 1)
+        if head and next_line_end > 0:
+            assert estimate_tokens(content[:next_line_end + 1]) > max_tokens
+
+    # A first line that does not fit is cut inside the line.
+    assert _truncate_to_tokens("a" * 100 + "\nb", 5) == "a" * 20
+
+
+def test_block_content_round_trips() -> None:
+    assert block_content("a.py", format_file_block("a.py", "print(1)")) == "print(1)"
+    assert outline_text("notes.md", "# Title\ntext\n## Section") == "# Title\n## Section"
+
+
+def _numbered_file(name: str, lines: int) -> str:
+    return "\n".join(f"{name}_value_{index} = {index}" for index in range(lines)) + "\n"
+
+
+def _room_for_one(file_path: str, content: str) -> int:
+    # Enough for this file whole, too little for a second file or a truncated head of it.
+    return estimate_tokens(format_file_block(file_path, "")) + estimate_tokens(content) + 50
+
+
+def test_priority_paths_get_the_budget_first() -> None:
+    files = [("a.py", _numbered_file("a", 60)), ("b.py", _numbered_file("b", 60))]
+    budget = _room_for_one(*files[0])
+
+    packed = pack_context(files, budget_tokens=budget)
+    assert [packed_file.mode for packed_file in packed.files] == ["full", "omitted"]
+
+    packed = pack_context(files, budget_tokens=budget, priority_paths=["b.py"])
+    assert [(packed_file.file_path, packed_file.mode) for packed_file in packed.files] == [
+        ("a.py", "omitted"), ("b.py", "full")]
+    assert packed.context == format_file_block("b.py", files[1][1])
+
+
+def test_build_context_prioritizes_files_named_in_the_task(tmp_path, monkeypatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    project = tmp_path / "project"
+    (project / "src").mkdir(parents=True)
+    paths = []
+    for name in ("a", "b"):
+        (project / "src" / f"{name}.py").write_text(_numbered_file(name, 60))
+        paths.append(str(project / "src" / f"{name}.py"))
+    context_builder = ContextBuilder()
+    context_builder.add_files(paths)
+    budget = _room_for_one(paths[0], _numbered_file("a", 60))
+
+    result = build_context({
+        "user_task": "Rename the values in src/b.py.",
+        "project_path": str(project),
+        "project_structure": "",
+        "context": context_builder.render(),
+        "context_block_sizes": context_builder.block_sizes,
+        "context_token_budget": budget,
+    })
+
+    assert "b_value_59 = 59" in result["context"]
+    assert "a_value_0 = 0" not in result["context"]
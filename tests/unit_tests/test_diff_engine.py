@@ -0,0 +1,81 @@
+import random
+
+import pytest
+
+from agent.tools.diff_engine import intern_lines, matching_blocks
+from agent.tools.diff_utils import generate_diff
+
+
+def _lcs_length(a, b) -> int:
+    previous = [0] * (len(b) + 1)
+    for item in a:
+        current = [0]
+        for j, other in enumerate(b):
+            current.append(previous[j] + 1 if item == other else max(previous[j + 1], current[j]))
+        previous = current
+    return previous[-1]
+
+
+def _apply_unified(original, diff_text):
+    result, position = [], 0
+    for line in diff_text.splitlines(True)[2:]:
+        if line.startswith("@@"):
+            start, count = map(int, line.split()[1][1:].split(","))
+            start = start - 1 if count else start
+            result.extend(original[position:start])
+            position = start
+        elif line[0] == "+":
+            result.append(line[1:])
+        else:
+            assert original[position] == line[1:]
+            if line[0] == " ":
+                result.append(line[1:])
+            position += 1
+    return result + original[position:]
+
+
+def test_intern_lines_maps_equal_lines_to_equal_ids() -> None:
+    assert intern_lines(["x", "y", "x"], ["y", "z"]) == ([0, 1, 0], [1, 2])
+
+
+@pytest.mark.parametrize("algorithm", ["myers", "patience"])
+def test_random_diffs_round_trip(algorithm) -> None:
+    rng = random.Random(7)
+    for _ in range(500):
+        original = [rng.choice("abcd") + "\n" for _ in range(rng.randrange(12))]
+        modified = [rng.choice("abcd") + "\n" for _ in range(rng.randrange(12))]
+
+        blocks = matching_blocks(original, modified, algorithm)
+        for i, j, size in blocks:
+            assert original[i:i + size] == modified[j:j + size]
+        if algorithm == "myers":
+            assert sum(size for _, _, size in blocks) == _lcs_length(original, modified)
+
+        diff_text = generate_diff(original, modified, algorithm=algorithm, context=rng.randrange(4))
+        assert _apply_unified(original, diff_text) == modified
+
+
+def test_generate_diff_output() -> None:
+    original = [f"line {i}\n" for i in range(1, 21)]
+    modified = original[:4] + ["changed\n"] + original[5:15] + original[16:]
+
+    assert generate_diff(original, modified) == (
+        "--- a\n+++ b\n"
+        "@@ -2,7 +2,7 @@\n line 2\n line 3\n line 4\n-line 5\n+changed\n line 6\n line 7\n line 8\n"
+        "@@ -13,7 +13,6 @@\n line 13\n line 14\n line 15\n-line 16\n line 17\n line 18\n line 19\n"
+    )
+
+
+def test_patience_keeps_moved_function_readable() -> None:
+    original = ["def a():\n", "    return 1\n", "\n", "def b():\n", "    return 2\n", "\n"]
+    modified = ["def b():\n", "    return 2\n", "\n", "def a():\n", "    return 1\n", "\n"]
+
+    diff_text = generate_diff(original, modified, algorithm="patience", context=0)
+
+    assert diff_text.count("@@") == 4
+    assert "+def a():\n+    return 1\n" in diff_text or "-def a():\n-    return 1\n" in diff_text
+
+
+def test_unknown_algorithm_raises() -> None:
+    with pytest.raises(ValueError):
+        matching_blocks(["a"], ["b"], "greedy")
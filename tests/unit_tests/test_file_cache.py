@@ -0,0 +1,39 @@
+import os
+
+from agent.tools.file_cache import FileContentCache
+
+
+def test_reads_each_version_once(tmp_path) -> None:
+    cache = FileContentCache()
+    path = tmp_path / "a.txt"
+    path.write_text("one")
+
+    assert cache.read_text(str(path)) == "one"
+    assert cache.read_text(str(path)) == "one"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    path.write_text("three")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert cache.read_text(str(path)) == "three"
+    assert cache.misses == 2
+
+
+def test_evicts_least_recently_used_by_size(tmp_path) -> None:
+    cache = FileContentCache(max_bytes=10)
+    paths = []
+    for name in ("a", "b", "c"):
+        path = tmp_path / name
+        path.write_text(name * 4)
+        paths.append(str(path))
+
+    cache.read_text(paths[0])
+    cache.read_text(paths[1])
+    cache.read_text(paths[0])
+    cache.read_text(paths[2])
+
+    assert cache.current_bytes == 8
+    cache.read_text(paths[0])
+    assert cache.hits == 2
+    cache.read_text(paths[1])
+    assert cache.misses == 4
@@ -0,0 +1,182 @@
+import gzip
+import importlib.util
+import tracemalloc
+
+import pytest
+
+from agent.tools.file_utils import (
+    BINARY_SNIFF_SIZE,
+    DEFAULT_MAX_FILE_SIZE,
+    concat_files_in_str,
+    concat_folder_to_file,
+)
+
+
+def test_concat_files_in_str_keeps_order_and_format(tmp_path) -> None:
+    paths = []
+    for index in range(20):
+        path = tmp_path / f"file_{index}.txt"
+        path.write_text(f"content {index}")
+        paths.append(str(path))
+    paths.insert(3, str(tmp_path / "missing.txt"))
+
+    expected = "".join(
+        f"================================================\n"
+        f"FILE: {path}\n"
+        f"================================================\n"
+        f"content {index}\n\n"
+        for index, path in enumerate(p for p in paths if "missing" not in p)
+    )
+    assert concat_files_in_str(paths) == expected
+
+
+def test_concat_files_in_str_respects_budgets(tmp_path) -> None:
+    big = tmp_path / "big.txt"
+    big.write_text("x" * 1000)
+    small = tmp_path / "small.txt"
+    small.write_text("y" * 10)
+
+    result = concat_files_in_str([str(big), str(small)], max_file_size=100)
+    assert "x" * 100 + "\n... [truncated: file is 1000 bytes" in result
+    assert "x" * 101 not in result
+    assert "y" * 10 in result
+
+    result = concat_files_in_str([str(big), str(small)], max_file_size=None, max_total_size=500)
+    assert "FILE: " + str(big) not in result
+    assert "y" * 10 in result
+
+
+def test_concat_files_in_str_has_no_budget_by_default(tmp_path) -> None:
+    big = tmp_path / "big.txt"
+    big.write_text("x" * (DEFAULT_MAX_FILE_SIZE + 10))
+
+    result = concat_files_in_str([str(big)])
+    assert result.endswith("x" * (DEFAULT_MAX_FILE_SIZE + 10) + "\n\n")
+    assert "truncated" not in result
+
+
+def test_file_removed_while_loading_is_skipped(tmp_path, monkeypatch, capsys) -> None:
+    gone = tmp_path / "gone.txt"
+    kept = tmp_path / "kept.txt"
+    kept.write_text("y")
+    # The existence checks still see gone.txt; the size check runs after it was removed.
+    path_type = type(gone)
+    for name, seen in (("exists", True), ("is_dir", False), ("is_file", True)):
+        real = getattr(path_type, name)
+        monkeypatch.setattr(path_type, name,
+                            lambda path, *args, real=real, seen=seen, **kwargs:
+                            seen if path == gone else real(path, *args, **kwargs))
+
+    result = concat_files_in_str([str(gone), str(kept)], max_file_size=100)
+
+    assert result == concat_files_in_str([str(kept)])
+    assert f"Skipping non-existent path: {gone}" in capsys.readouterr().out
+
+
+def _write_project(root):
+    (root / "src").mkdir()
+    (root / "src" / "a.py").write_text("print('a')\n")
+    (root / "src" / "b.txt").write_text("b" * 50)
+    (root / "node_modules").mkdir()
+    (root / "node_modules" / "dep.js").write_text("dep")
+    (root / "blob.dat").write_bytes(b"header\0" + b"x" * 100)
+    (root / "image.png").write_bytes(b"not really")
+
+
+def test_concat_folder_to_file_streams_text_and_skips_binary(tmp_path) -> None:
+    project = tmp_path / "project"
+    project.mkdir()
+    _write_project(project)
+    output = project / "out.txt"
+
+    assert concat_folder_to_file(str(project), str(output))
+
+    content = output.read_text(encoding="utf-8")
+    paths = [str(project / "src" / "a.py"), str(project / "src" / "b.txt")]
+    assert content == concat_files_in_str(paths) or content == concat_files_in_str(paths[::-1])
+    assert "dep" not in content and "blob.dat" not in content and "image.png" not in content
+
+    # The output inside the folder is not concatenated into itself on a second run.
+    assert concat_folder_to_file(str(project), str(output))
+    assert output.read_text(encoding="utf-8") == content
+
+
+def test_concat_folder_to_file_truncates_on_character_boundaries(tmp_path) -> None:
+    (tmp_path / "wide.txt").write_text("é" * 100, encoding="utf-8")
+    output = tmp_path / "out" / "wide.txt"
+    output.parent.mkdir()
+
+    assert concat_folder_to_file(str(tmp_path), str(output), ignore_patterns={"out"}, max_file_size=51)
+
+    content = output.read_text(encoding="utf-8")
+    assert "é" * 25 + "\n... [truncated: file is 200 bytes, showing the first 50 bytes]" in content
+
+
+
+def test_concat_folder_to_file_normalizes_newlines_like_text_mode(tmp_path) -> None:
+    project = tmp_path / "project"
+    project.mkdir()
+    # A "\r\n" split across the sniffed head and the next chunk, and a lone "\r".
+    text = "a" * (BINARY_SNIFF_SIZE - 1) + "\r\nwindows\r\nold mac\rend\r"
+    (project / "crlf.txt").write_bytes(text.encode("utf-8"))
+    output = tmp_path / "out.txt"
+
+    assert concat_folder_to_file(str(project), str(output))
+
+    assert output.read_bytes() == concat_files_in_str([str(project / "crlf.txt")]).encode("utf-8")
+    assert b"\r" not in output.read_bytes()
+
+
+def test_concat_folder_to_file_skips_invalid_utf8_after_the_head(tmp_path, capsys) -> None:
+    project = tmp_path / "project"
+    project.mkdir()
+    (project / "bad.txt").write_bytes(b"x" * (BINARY_SNIFF_SIZE * 2) + b"\xff\xfe tail\n")
+    (project / "good.txt").write_text("good\n")
+    output = tmp_path / "out.txt"
+
+    assert concat_folder_to_file(str(project), str(output))
+
+    assert output.read_text(encoding="utf-8") == concat_files_in_str([str(project / "good.txt")])
+    assert f"Error reading text file {project / 'bad.txt'}" in capsys.readouterr().out
+    # concat_files_in_str leaves the same file out.
+    assert concat_files_in_str([str(project / "bad.txt")]) == ""
+
+@pytest.mark.parametrize("suffix", [
+    ".gz",
+    pytest.param(".zst", marks=pytest.mark.skipif(importlib.util.find_spec("zstandard") is None,
+                                                  reason="zstandard is not installed")),
+])
+def test_concat_folder_to_file_compresses_by_suffix(tmp_path, suffix) -> None:
+    project = tmp_path / "project"
+    project.mkdir()
+    _write_project(project)
+    plain = tmp_path / "plain.txt"
+    compressed = tmp_path / f"out.txt{suffix}"
+
+    assert concat_folder_to_file(str(project), str(plain))
+    assert concat_folder_to_file(str(project), str(compressed))
+
+    if suffix == ".gz":
+        data = gzip.decompress(compressed.read_bytes())
+    else:
+        import zstandard
+        data = zstandard.ZstdDecompressor().stream_reader(compressed.read_bytes()).read()
+    assert data == plain.read_bytes()
+
+
+def test_concat_folder_to_file_memory_stays_flat(tmp_path) -> None:
+    project = tmp_path / "project"
+    project.mkdir()
+    for index in range(16):
+        (project / f"big_{index}.txt").write_text(("line %d\n" % index) * 200_000)
+    output = tmp_path / "out.txt"
+
+    tracemalloc.start()
+    try:
+        assert concat_folder_to_file(str(project), str(output))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert output.stat().st_size > 20_000_000
+    assert peak < 4 * 1024 * 1024
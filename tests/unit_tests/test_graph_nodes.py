@@ -0,0 +1,53 @@
+import asyncio
+
+from langchain_core.runnables import RunnableLambda
+
+from agent.core import ai_models
+from agent.core.graph import llm_call_evaluator, llm_call_evaluator_async
+from agent.models.models import FileReflectionList
+from agent.tools.context_builder import ContextBuilder
+
+
+class _FakeStructuredModel:
+    """Answers every reflection pass from a list; an exception in the list is raised instead."""
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.prompts = []
+
+    def with_structured_output(self, schema):
+        def answer(prompt):
+            self.prompts.append(prompt)
+            answer = self.answers.pop(0)
+            if isinstance(answer, Exception):
+                raise answer
+            return answer
+
+        return RunnableLambda(answer)
+
+
+def _state(tmp_path):
+    (tmp_path / "a.py").write_text("A = 1\n")
+    (tmp_path / "b.py").write_text("B = 1\n")
+    builder = ContextBuilder()
+    builder.add_files([str(tmp_path / "a.py")])
+    return {"user_task": "Change b", "project_path": str(tmp_path), "context": builder.render(),
+            "context_block_sizes": builder.block_sizes}
+
+
+def test_sync_and_async_evaluator_share_passes_and_error_handling(tmp_path, monkeypatch) -> None:
+    results = []
+    for node in (llm_call_evaluator, lambda state: asyncio.run(llm_call_evaluator_async(state))):
+        reflection = FileReflectionList(additional_file_paths=[str(tmp_path / "b.py")], remove_file_paths=[])
+        model = _FakeStructuredModel([reflection, RuntimeError("model is down")])
+        monkeypatch.setitem(ai_models._models, "gemini_flash_lite", model)
+
+        update = node(_state(tmp_path))
+
+        # The second pass fails: the first pass's additions are kept and the error ends the loop.
+        assert len(model.prompts) == 2 and "B = 1" in model.prompts[1]
+        assert update["file_reflection"] == reflection
+        assert update["priority_file_paths"] == [str(tmp_path / "b.py")]
+        results.append(update)
+
+    assert results[0] == results[1]
@@ -0,0 +1,30 @@
+import pytest
+
+from agent.core import ai_models, configs
+from agent.tools import tree_cache
+
+
+def test_graphs_are_compiled_once() -> None:
+    assert configs.get_graph("exploration") is configs.graph
+    assert configs.get_graph("explore_plan_action") is configs.explore_plan_action_graph
+    assert configs.get_graph("action") is configs.get_graph("action")
+
+
+def test_unknown_graph_raises() -> None:
+    with pytest.raises(KeyError):
+        configs.get_graph("missing")
+
+
+def test_prewarm_fills_the_tree_cache(tmp_path, monkeypatch) -> None:
+    # Stand-in clients, so prewarm needs neither provider API keys nor the network.
+    built = []
+    monkeypatch.setattr(ai_models, "get_model", lambda name: built.append(name) or object())
+    monkeypatch.setattr(configs, "get_llm_with_tools", lambda: built.append("tools"))
+    (tmp_path / "main.py").write_text("print('hi')\n")
+    tree_cache.clear_tree_snapshots()
+
+    configs.prewarm(graph_names=["make_plan_run"], project_path=str(tmp_path))
+
+    assert "make_plan_run" in configs._compiled_graphs
+    assert built == [*configs.PREWARM_MODELS, "tools"]
+    assert len(tree_cache._snapshots) == 1
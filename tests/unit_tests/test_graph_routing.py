@@ -0,0 +1,67 @@
+import asyncio
+import threading
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from agent.core import configs
+
+# Nodes explore_plan_action() builds from sync/async function pairs looked up in configs.
+PAIRED_NODES = ("determine_input_type", "llm_file_explore", "llm_call_evaluator", "build_context",
+                "answer_question", "make_plan", "segment_into_steps", "llm_call", "push_to_git")
+
+QUESTION_PATH = ["join_exploration", "build_context", "answer_question"]
+TASK_PATH = ["join_exploration", "llm_call_evaluator", "build_context", "make_plan", "segment_into_steps",
+             "llm_call", "push_to_git"]
+
+
+def _stub_graph(monkeypatch, input_type: str):
+    """explore_plan_action with every node replaced by a stub that records its name."""
+    visited = []
+    # The two START branches only get past this if they run at the same time.
+    both_branches_started = threading.Barrier(2, timeout=5)
+
+    def stub(name):
+        def func(state):
+            if name in ("determine_input_type", "llm_file_explore"):
+                both_branches_started.wait()
+            visited.append(name)
+            if name == "determine_input_type":
+                return {"input_type": input_type}
+            if name == "llm_call":
+                return {"messages": [AIMessage(content="done")]}
+            return {}
+
+        async def afunc(state):
+            return await asyncio.to_thread(func, state)
+
+        func.__name__ = name
+        return func, afunc
+
+    for name in PAIRED_NODES:
+        func, afunc = stub(name)
+        monkeypatch.setattr(configs, name, func)
+        monkeypatch.setattr(configs, f"{name}_async", afunc)
+    monkeypatch.setattr(configs, "join_exploration", stub("join_exploration")[0])
+    monkeypatch.setattr(configs, "tool_node", stub("environment")[0])
+    return configs.explore_plan_action().compile(), visited
+
+
+@pytest.mark.parametrize("input_type, expected_path", [("question", QUESTION_PATH), ("task", TASK_PATH)])
+def test_branches_run_concurrently_and_route_by_input_type(monkeypatch, input_type, expected_path) -> None:
+    graph, visited = _stub_graph(monkeypatch, input_type)
+
+    graph.invoke({"user_task": "stub", "project_path": ""})
+
+    assert sorted(visited[:2]) == ["determine_input_type", "llm_file_explore"]
+    assert visited[2:] == expected_path
+
+
+@pytest.mark.parametrize("input_type, expected_path", [("question", QUESTION_PATH), ("task", TASK_PATH)])
+def test_async_run_routes_by_input_type(monkeypatch, input_type, expected_path) -> None:
+    graph, visited = _stub_graph(monkeypatch, input_type)
+
+    asyncio.run(graph.ainvoke({"user_task": "stub", "project_path": ""}))
+
+    assert sorted(visited[:2]) == ["determine_input_type", "llm_file_explore"]
+    assert visited[2:] == expected_path
@@ -0,0 +1,75 @@
+import os
+
+from agent.tools.file_utils import concat_agent_metadata, get_project_structure_as_string
+from agent.tools.ignore_walker import get_ignore_matcher, walk_project
+from agent.tools.tree_cache import clear_tree_snapshots
+
+
+def _touch(root, *paths):
+    for path in paths:
+        full = root / path
+        full.parent.mkdir(parents=True, exist_ok=True)
+        full.write_text("")
+
+
+def _walked(root, ignore_patterns=(), use_gitignore=True):
+    return sorted(
+        os.path.relpath(os.path.join(path, name), root).replace(os.sep, "/")
+        for path, _, file_names in walk_project(str(root), ignore_patterns, use_gitignore)
+        for name in file_names
+    )
+
+
+def test_gitignore_rules(tmp_path) -> None:
+    _touch(tmp_path, "app.log", "keep.log", "build/out.js", "src/build/x.js", "docs/private/a.md",
+           "src/docs/private/b.md", "a/b/c/d.txt", "m.pyc", "src/main.py", "sub/notes.txt", "sub/x/notes.txt",
+           "sub/important.txt", "sub/only_here", "sub/x/only_here")
+    (tmp_path / ".gitignore").write_text("*.log\n!keep.log\nbuild/\n/docs/private\na/**/d.txt\n*.py[co]\n")
+    (tmp_path / "sub" / ".gitignore").write_text("*.txt\n!important.txt\n/only_here\n")
+
+    assert _walked(tmp_path) == [
+        ".gitignore", "keep.log", "src/docs/private/b.md", "src/main.py",
+        "sub/.gitignore", "sub/important.txt", "sub/x/only_here",
+    ]
+    assert "app.log" in _walked(tmp_path, use_gitignore=False)
+
+
+def test_ignore_patterns_prune_directories_and_accept_globs(tmp_path) -> None:
+    _touch(tmp_path, "node_modules/pkg/index.js", "src/app.js", "src/app.min.js", "src/gen/x.js")
+
+    assert _walked(tmp_path, {"node_modules", "*.min.js", "src/gen"}) == ["src/app.js"]
+    walked_dirs = [path for path, _, _ in walk_project(str(tmp_path), {"node_modules"})]
+    assert not any("node_modules" in path for path in walked_dirs)
+
+    matcher = get_ignore_matcher({"*.min.js"})
+    assert matcher is get_ignore_matcher(["*.min.js"])
+    assert matcher.is_ignored("deep/dir/a.min.js", "a.min.js", False)
+
+
+def test_tree_follows_gitignore_changes(tmp_path) -> None:
+    clear_tree_snapshots()
+    _touch(tmp_path, "src/main.py", "src/cache.tmp", "out/result.txt")
+    gitignore = tmp_path / ".gitignore"
+    gitignore.write_text("*.tmp\n")
+
+    tree = get_project_structure_as_string(str(tmp_path))
+    assert "cache.tmp" not in tree and "result.txt" in tree
+
+    gitignore.write_text("out/\n")
+    stat = os.stat(gitignore)
+    os.utime(gitignore, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    tree = get_project_structure_as_string(str(tmp_path))
+    assert "cache.tmp" in tree and "out/" not in tree
+
+
+def test_concat_agent_metadata_skips_ignored_directories(tmp_path) -> None:
+    (tmp_path / "agent_metadata.md").write_text("root")
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "agent_metadata.md").write_text("pkg")
+    (tmp_path / "node_modules" / "dep").mkdir(parents=True)
+    (tmp_path / "node_modules" / "dep" / "agent_metadata.md").write_text("dep")
+
+    result = concat_agent_metadata(str(tmp_path))
+    assert f"{tmp_path / 'agent_metadata.md'}: root" in result
+    assert f"{tmp_path / 'pkg' / 'agent_metadata.md'}: pkg" in result
+    assert "dep" not in result
@@ -0,0 +1,71 @@
+import os
+import subprocess
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "src")
+
+# `import agent` measured at about 1 ms; the budget leaves room for slow CI machines.
+IMPORT_AGENT_BUDGET_US = 50_000
+
+HEAVY_MODULES = ("langchain_openai", "langchain_groq", "langchain_together", "langchain_google_genai", "langgraph")
+
+PROVIDER_MODULES = ("langchain_openai", "langchain_groq", "langchain_together", "langchain_google_genai")
+
+
+def _run(code: str, *flags: str) -> subprocess.CompletedProcess:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = SRC_DIR
+    return subprocess.run([sys.executable, *flags, "-c", code], env=env, capture_output=True, text=True,
+                          check=True, timeout=60)
+
+
+def _cumulative_import_us(importtime_output: str, module: str) -> int:
+    # Lines look like "import time:  self [us] | cumulative | imported package".
+    for line in importtime_output.splitlines():
+        parts = line.split("|")
+        if line.startswith("import time:") and len(parts) == 3 and parts[2].strip() == module:
+            return int(parts[1])
+    raise AssertionError(f"{module} not found in -X importtime output")
+
+
+def test_import_agent_is_within_budget() -> None:
+    result = _run("import agent", "-X", "importtime")
+    assert _cumulative_import_us(result.stderr, "agent") < IMPORT_AGENT_BUDGET_US
+
+
+def test_import_agent_has_no_side_effects() -> None:
+    result = _run(
+        "import sys, agent\n"
+        f"print(sorted(m for m in sys.modules if m.startswith({HEAVY_MODULES!r})))"
+    )
+    assert result.stdout.strip() == "[]"
+
+
+def test_import_tool_modules_prints_nothing() -> None:
+    result = _run("import agent.tools.file_utils, agent.tools.diff_utils")
+    assert result.stdout == ""
+
+
+def test_lazy_attributes_resolve() -> None:
+    import agent
+    from agent.models.task_models import Task
+
+    assert agent.Task is Task
+    assert "State" in dir(agent)
+
+
+def test_import_configs_compiles_no_graph() -> None:
+    result = _run("from agent.core import configs\nprint(sorted(configs._compiled_graphs))", "-W", "ignore")
+    assert result.stdout.strip() == "[]"
+
+
+def test_compiling_the_graphs_builds_no_model() -> None:
+    # Nodes look models up when they run; compiling the graphs must not import a provider SDK.
+    result = _run(
+        "import sys\n"
+        "from agent.core import configs\n"
+        "configs.get_graph('exploration'); configs.get_graph('explore_plan_action')\n"
+        f"print(sorted(m for m in sys.modules if m.startswith({PROVIDER_MODULES!r})))",
+        "-W", "ignore",
+    )
+    assert result.stdout.strip() == "[]"
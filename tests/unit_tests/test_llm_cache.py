@@ -0,0 +1,35 @@
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from agent.core.llm_cache import SQLiteLLMCache, cached_model
+
+
+def test_repeated_prompt_is_answered_from_disk(tmp_path) -> None:
+    cache = SQLiteLLMCache(str(tmp_path / "cache.sqlite3"))
+    model = cached_model(FakeListChatModel(responses=["first", "second", "third"]), cache=cache)
+
+    assert model.invoke("same prompt").content == "first"
+    assert model.invoke("same prompt").content == "first"
+    assert model.invoke("other prompt").content == "second"
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    # A new process with the same database reuses the stored response.
+    reopened = SQLiteLLMCache(str(tmp_path / "cache.sqlite3"))
+    model = cached_model(FakeListChatModel(responses=["first", "second", "third"]), cache=reopened)
+    assert model.invoke("same prompt").content == "first"
+    assert reopened.hits == 1
+
+    # Different model parameters do not share entries.
+    model = cached_model(FakeListChatModel(responses=["fresh"]), cache=reopened)
+    assert model.invoke("same prompt").content == "fresh"
+
+
+def test_expired_and_evicted_entries_miss(tmp_path) -> None:
+    cache = SQLiteLLMCache(str(tmp_path / "cache.sqlite3"), ttl_seconds=-1)
+    model = cached_model(FakeListChatModel(responses=["first", "second"]), cache=cache)
+    model.invoke("prompt")
+    assert model.invoke("prompt").content == "second"
+
+    cache = SQLiteLLMCache(str(tmp_path / "small.sqlite3"), max_bytes=1)
+    model = cached_model(FakeListChatModel(responses=["first", "second"]), cache=cache)
+    model.invoke("prompt")
+    assert model.invoke("prompt").content == "second"
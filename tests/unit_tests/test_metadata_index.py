@@ -0,0 +1,100 @@
+import os
+
+from agent.tools.file_utils import DEFAULT_IGNORE_PATTERNS, concat_agent_metadata, get_project_structure_as_string
+from agent.tools.metadata_index import clear_metadata_indexes, get_metadata_index
+from agent.tools.tree_cache import clear_tree_snapshots, get_tree_snapshot
+
+
+def _bump_mtime(path, seconds: int = 1) -> None:
+    # Make sure the mtime changes even on filesystems with coarse timestamps.
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + seconds * 1_000_000_000))
+
+
+def _make_project(root):
+    (root / "agent_metadata.md").write_text("root")
+    (root / "pkg").mkdir()
+    (root / "pkg" / "agent_metadata.md").write_text("pkg")
+
+
+def test_result_is_memoized_and_follows_changes(tmp_path) -> None:
+    clear_metadata_indexes()
+    _make_project(tmp_path)
+
+    first = concat_agent_metadata(str(tmp_path))
+    assert first == f"{tmp_path / 'agent_metadata.md'}: root\n{tmp_path / 'pkg' / 'agent_metadata.md'}: pkg"
+    assert concat_agent_metadata(str(tmp_path)) is first
+
+    # Content edits are seen through the file's own mtime and size.
+    (tmp_path / "pkg" / "agent_metadata.md").write_text("pkg v2")
+    _bump_mtime(tmp_path / "pkg" / "agent_metadata.md")
+    assert concat_agent_metadata(str(tmp_path)).endswith("pkg v2")
+
+    # New files are found through the directory's mtime.
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs" / "agent_metadata.md").write_text("docs")
+    _bump_mtime(tmp_path, 2)
+    assert f"{tmp_path / 'docs' / 'agent_metadata.md'}: docs" in concat_agent_metadata(str(tmp_path))
+
+
+def test_watched_index_skips_directory_revalidation(tmp_path, monkeypatch) -> None:
+    clear_metadata_indexes()
+    _make_project(tmp_path)
+    index = get_metadata_index(str(tmp_path), set())
+    index.watched = True
+    # Becoming watched revalidates once, to catch changes made before the watcher started.
+    index.concat()
+
+    refreshes = []
+    original_refresh = index._snapshot.refresh
+    monkeypatch.setattr(index._snapshot, "refresh", lambda: refreshes.append(1) or original_refresh())
+
+    (tmp_path / "new").mkdir()
+    (tmp_path / "new" / "agent_metadata.md").write_text("new")
+    _bump_mtime(tmp_path)
+    assert "new" not in index.concat()
+    assert refreshes == []
+
+    index.invalidate(str(tmp_path / "new" / "agent_metadata.md"))
+    assert f"{tmp_path / 'new' / 'agent_metadata.md'}: new" in index.concat()
+    assert refreshes == [1]
+
+
+def test_invalidation_reaches_every_display_root(tmp_path) -> None:
+    clear_metadata_indexes()
+    _make_project(tmp_path)
+    index = get_metadata_index(str(tmp_path), set())
+    index.watched = True
+    relative_root = os.path.relpath(tmp_path)
+    index.concat(display_root=relative_root)
+    index.concat()
+
+    (tmp_path / "pkg" / "agent_metadata.md").write_text("pkg v2")
+    index.invalidate(str(tmp_path / "pkg" / "agent_metadata.md"))
+
+    # The first lookup after the invalidation must not hide it from the other display root.
+    assert index.concat(display_root=relative_root).endswith("pkg v2")
+    assert index.concat() == f"{tmp_path / 'agent_metadata.md'}: root\n{tmp_path / 'pkg' / 'agent_metadata.md'}: pkg v2"
+
+
+def test_index_shares_the_tree_snapshot(tmp_path) -> None:
+    clear_metadata_indexes()
+    clear_tree_snapshots()
+    _make_project(tmp_path)
+    (tmp_path / ".gitignore").write_text("build/\nskipped/agent_metadata.md\n")
+    for directory in ("build", "skipped"):
+        (tmp_path / directory).mkdir()
+        (tmp_path / directory / "agent_metadata.md").write_text(directory)
+
+    index = get_metadata_index(str(tmp_path), DEFAULT_IGNORE_PATTERNS)
+    assert index._snapshot is get_tree_snapshot(str(tmp_path), DEFAULT_IGNORE_PATTERNS)
+    # The tree hides metadata files by name; the index still finds them, except where .gitignore hides them.
+    assert "agent_metadata.md" not in get_project_structure_as_string(str(tmp_path))
+    assert index.metadata_paths() == [str(tmp_path / "agent_metadata.md"), str(tmp_path / "pkg" / "agent_metadata.md")]
+
+    # A rendering of the tree that refreshes the shared snapshot first does not hide a new file.
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs" / "agent_metadata.md").write_text("docs")
+    _bump_mtime(tmp_path, 2)
+    assert "docs/" in get_project_structure_as_string(str(tmp_path))
+    assert str(tmp_path / "docs" / "agent_metadata.md") in index.metadata_paths()
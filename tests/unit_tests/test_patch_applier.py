@@ -0,0 +1,102 @@
+import random
+
+from agent.tools.diff_utils import generate_diff, patch_file
+from agent.tools.patch_applier import apply_hunks
+
+
+def _lines(count: int):
+    return [f"line {i}\n" for i in range(1, count + 1)]
+
+
+def test_generated_multi_hunk_diffs_apply() -> None:
+    rng = random.Random(3)
+    for _ in range(200):
+        original = [f"{rng.randrange(30)}\n" for _ in range(rng.randrange(40))]
+        modified = list(original)
+        for _ in range(rng.randrange(6)):
+            position = rng.randrange(len(modified) + 1)
+            if rng.random() < 0.5 or not modified[position:]:
+                modified.insert(position, f"new {rng.random()}\n")
+            else:
+                del modified[position]
+
+        patched, report = apply_hunks(original, generate_diff(original, modified))
+
+        assert patched == modified
+        assert all(hunk.status == "applied" for hunk in report.hunks)
+
+
+def test_wrong_line_numbers_are_found_by_context() -> None:
+    original = _lines(100)
+    diff_text = (
+        "@@ -10,3 +10,3 @@\n line 40\n-line 41\n+line forty-one\n line 42\n"
+        "@@ -20,3 +20,3 @@\n line 51\n-line 52\n+line fifty-two\n line 53\n"
+    )
+
+    patched, report = apply_hunks(original, diff_text)
+
+    assert patched[40] == "line forty-one\n" and patched[51] == "line fifty-two\n"
+    assert [(hunk.status, hunk.applied_line, hunk.offset) for hunk in report.hunks] == [
+        ("offset", 40, 30), ("offset", 51, 31)]
+
+
+def test_closest_match_wins() -> None:
+    original = ["x\n", "dup\n", "y\n"] * 5
+    diff_text = "@@ -8,1 +8,1 @@\n-dup\n+changed\n"
+
+    patched, report = apply_hunks(original, diff_text)
+
+    assert report.hunks[0].applied_line == 8
+    assert patched.count("dup\n") == 4 and patched[7] == "changed\n"
+
+
+def test_trailing_whitespace_is_fuzzy_and_context_is_kept_from_the_file() -> None:
+    original = ["def f():  \n", "    return 1\n"]
+    diff_text = "@@ -1,2 +1,2 @@\n def f():\n-    return 1\n+    return 2\n"
+
+    patched, report = apply_hunks(original, diff_text)
+
+    assert patched == ["def f():  \n", "    return 2\n"]
+    assert report.hunks[0].status == "fuzzy"
+
+
+def test_missing_context_fails_without_writing(tmp_path) -> None:
+    path = tmp_path / "a.txt"
+    path.write_text("one\ntwo\nthree\n")
+    diff_text = "@@ -1,2 +1,2 @@\n one\n-two\n+TWO\n@@ -3,1 +3,1 @@\n-four\n+FOUR\n"
+
+    report = patch_file(str(path), diff_text)
+
+    assert not report.success
+    assert [hunk.status for hunk in report.hunks] == ["applied", "failed"]
+    assert path.read_text() == "one\ntwo\nthree\n"
+
+
+def test_patch_file_keeps_crlf_line_endings(tmp_path) -> None:
+    path = tmp_path / "a.txt"
+    path.write_bytes(b"one\r\ntwo\r\nthree\r\n")
+
+    report = patch_file(str(path), "--- a\n+++ b\n@@ -2,1 +2,2 @@\n-two\n+2\n+2.5\n")
+
+    assert report.success
+    assert path.read_bytes() == b"one\r\n2\r\n2.5\r\nthree\r\n"
+
+
+def test_diff_of_identical_files_is_a_no_op(tmp_path) -> None:
+    original = ["one\n", "two\n"]
+    diff_text = generate_diff(original, list(original))
+    assert diff_text == "--- a\n+++ b\n"
+
+    patched, report = apply_hunks(original, diff_text)
+    assert report.success and patched == original
+
+    path = tmp_path / "a.txt"
+    path.write_text("".join(original))
+    assert patch_file(str(path), diff_text).success
+    assert path.read_text() == "one\ntwo\n"
+
+
+def test_unparseable_header_is_an_error() -> None:
+    patched, report = apply_hunks(["one\n"], "@@ -x +y @@\n-one\n")
+    assert not report.success and "Invalid hunk header" in report.error
+    assert patched == ["one\n"]
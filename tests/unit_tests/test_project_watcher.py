@@ -0,0 +1,173 @@
+import time
+
+import pytest
+
+from agent.tools import project_watcher
+from agent.tools.file_cache import file_content_cache
+from agent.tools.diff_utils import patch_file
+from agent.tools.file_utils import DEFAULT_IGNORE_PATTERNS, concat_agent_metadata, get_project_structure_as_string
+from agent.tools.metadata_index import clear_metadata_indexes
+from agent.tools.llm_tools import create_file, run_bash_command, str_replace
+from bash_client.pool import bash_executor_pool
+from agent.tools.tree_cache import clear_tree_snapshots, get_tree_snapshot
+
+
+def _make_project(root):
+    for index in range(5):
+        (root / f"pkg{index}").mkdir()
+        (root / f"pkg{index}" / "module.py").write_text("x = 1\n")
+    (root / "agent_metadata.md").write_text("root")
+
+
+def _wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+def test_watched_snapshot_only_rescans_reported_directories(tmp_path, monkeypatch) -> None:
+    clear_tree_snapshots()
+    _make_project(tmp_path)
+    snapshot = get_tree_snapshot(str(tmp_path), DEFAULT_IGNORE_PATTERNS)
+    snapshot.watched = True
+    snapshot.render()
+
+    scanned = []
+    original_scan = snapshot._scan
+    monkeypatch.setattr(snapshot, "_scan", lambda node, matcher: scanned.append(node.path) or original_scan(node, matcher))
+
+    (tmp_path / "pkg3" / "new.py").write_text("")
+    assert "new.py" not in snapshot.render()
+
+    snapshot.invalidate(str(tmp_path / "pkg3" / "new.py"))
+    assert "new.py" in snapshot.render()
+    assert scanned == [str(tmp_path / "pkg3")]
+
+
+@pytest.mark.parametrize("backend", ["polling", "watchdog"])
+def test_watcher_keeps_caches_current(tmp_path, backend) -> None:
+    if backend == "watchdog":
+        pytest.importorskip("watchdog")
+    clear_tree_snapshots()
+    clear_metadata_indexes()
+    _make_project(tmp_path)
+    watcher = project_watcher.watch_project(str(tmp_path), backend=backend, poll_interval=0.05)
+    try:
+        assert watcher.ready.wait(5)
+        assert project_watcher.watch_project(str(tmp_path)) is watcher
+        assert "pkg4/" in get_project_structure_as_string(str(tmp_path))
+        assert file_content_cache.read_text(str(tmp_path / "pkg0" / "module.py")) == "x = 1\n"
+
+        (tmp_path / "docs").mkdir()
+        (tmp_path / "docs" / "agent_metadata.md").write_text("docs")
+        (tmp_path / "pkg0" / "module.py").write_text("x = 22\n")
+
+        docs_metadata = f"{tmp_path / 'docs' / 'agent_metadata.md'}: docs"
+        _wait_for(lambda: docs_metadata in concat_agent_metadata(str(tmp_path)))
+        assert "docs/" in get_project_structure_as_string(str(tmp_path))
+        assert file_content_cache.read_text(str(tmp_path / "pkg0" / "module.py")) == "x = 22\n"
+    finally:
+        project_watcher.unwatch_project(str(tmp_path))
+
+    assert not get_tree_snapshot(str(tmp_path), DEFAULT_IGNORE_PATTERNS).watched
+
+
+def test_tool_writes_are_visible_before_the_watcher_reports_them(tmp_path) -> None:
+    clear_tree_snapshots()
+    clear_metadata_indexes()
+    _make_project(tmp_path)
+    # The watcher never polls again, so only the tools' own invalidation can update the caches.
+    watcher = project_watcher.watch_project(str(tmp_path), backend="polling", poll_interval=3600)
+    try:
+        assert watcher.ready.wait(5)
+        module_path = str(tmp_path / "pkg0" / "module.py")
+        assert file_content_cache.read_text(module_path) == "x = 1\n"
+
+        create_file.invoke({"file_path": str(tmp_path / "docs" / "guide" / "agent_metadata.md"), "file_text": "docs"})
+        structure = get_project_structure_as_string(str(tmp_path))
+        assert "docs/" in structure and "guide/" in structure
+        assert f"{tmp_path / 'docs' / 'guide' / 'agent_metadata.md'}: docs" in concat_agent_metadata(str(tmp_path))
+
+        str_replace.invoke({"old_str": "x = 1", "new_str": "x = 2", "file_path": module_path})
+        assert file_content_cache.read_text(module_path) == "x = 2\n"
+
+        assert patch_file(module_path, "@@ -1 +1 @@\n-x = 2\n+x = 3\n").success
+        assert file_content_cache.read_text(module_path) == "x = 3\n"
+        assert watcher.events == 0
+    finally:
+        project_watcher.unwatch_project(str(tmp_path))
+
+
+def test_polling_reports_metadata_edits_in_place(tmp_path) -> None:
+    clear_tree_snapshots()
+    clear_metadata_indexes()
+    _make_project(tmp_path)
+    watcher = project_watcher.watch_project(str(tmp_path), backend="polling", poll_interval=0.05)
+    try:
+        assert watcher.ready.wait(5)
+        assert f"{tmp_path / 'agent_metadata.md'}: root" in concat_agent_metadata(str(tmp_path))
+
+        # Rewriting a file in place leaves its directory's mtime alone.
+        (tmp_path / "agent_metadata.md").write_text("root, edited")
+        _wait_for(lambda: "root, edited" in concat_agent_metadata(str(tmp_path)))
+    finally:
+        project_watcher.unwatch_project(str(tmp_path))
+
+
+def test_watchdog_skips_ignored_directories(tmp_path) -> None:
+    pytest.importorskip("watchdog")
+    clear_tree_snapshots()
+    clear_metadata_indexes()
+    _make_project(tmp_path)
+    (tmp_path / "node_modules" / "dep").mkdir(parents=True)
+    watcher = project_watcher.watch_project(str(tmp_path), backend="watchdog")
+    try:
+        assert watcher.ready.wait(5)
+        assert str(tmp_path / "pkg0") in watcher._watches
+        assert not any("node_modules" in path for path in watcher._watches)
+
+        events = watcher.events
+        (tmp_path / "node_modules" / "dep" / "index.js").write_text("")
+        (tmp_path / "node_modules" / "new.js").write_text("")
+        (tmp_path / "pkg1" / "sub").mkdir()
+        (tmp_path / "pkg1" / "sub" / "agent_metadata.md").write_text("sub")
+
+        sub_metadata = f"{tmp_path / 'pkg1' / 'sub' / 'agent_metadata.md'}: sub"
+        _wait_for(lambda: sub_metadata in concat_agent_metadata(str(tmp_path)))
+        assert str(tmp_path / "pkg1" / "sub") in watcher._watches
+        assert watcher.events > events
+        assert "node_modules" not in get_project_structure_as_string(str(tmp_path))
+    finally:
+        project_watcher.unwatch_project(str(tmp_path))
+
+
+def test_bash_commands_invalidate_the_project(tmp_path) -> None:
+    clear_tree_snapshots()
+    clear_metadata_indexes()
+    _make_project(tmp_path)
+    watcher = project_watcher.watch_project(str(tmp_path), backend="polling", poll_interval=3600)
+    config = {"configurable": {"project_path": str(tmp_path), "executor_key": "watcher-test"}}
+    try:
+        assert watcher.ready.wait(5)
+        run_bash_command.invoke({"command": "mkdir -p deep/er && echo deep > deep/er/agent_metadata.md"}, config)
+
+        assert "er/" in get_project_structure_as_string(str(tmp_path))
+        assert f"{tmp_path / 'deep' / 'er' / 'agent_metadata.md'}: deep" in concat_agent_metadata(str(tmp_path))
+        assert watcher.events == 0
+    finally:
+        bash_executor_pool.release("watcher-test")
+        project_watcher.unwatch_project(str(tmp_path))
+
+
+def test_ensure_watched_is_opt_in(tmp_path, monkeypatch) -> None:
+    started = []
+    monkeypatch.setattr(project_watcher, "watch_project", started.append)
+
+    monkeypatch.delenv("AGENT_WATCH_PROJECTS", raising=False)
+    project_watcher.ensure_watched(str(tmp_path))
+    monkeypatch.setenv("AGENT_WATCH_PROJECTS", "1")
+    project_watcher.ensure_watched(str(tmp_path / "missing"))
+    project_watcher.ensure_watched(str(tmp_path))
+
+    assert started == [str(tmp_path)]
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langgraph.graph import END, START, StateGraph
+
+from agent.core import ai_models, graph as graph_nodes
+from agent.core.graph import answer_question, answer_question_async, make_plan, make_plan_async
+from agent.core.state import State
+
+
+def _fake_kimi(monkeypatch) -> None:
+    model = GenericFakeChatModel(messages=iter([AIMessage(content="The answer is 42.")]))
+    monkeypatch.setitem(ai_models._models, "kimi_llm", model)
+
+
+def _fake_gpt5(monkeypatch) -> None:
+    model = GenericFakeChatModel(messages=iter([AIMessage(content="1. Read the code. 2. Change it.")]))
+    monkeypatch.setitem(ai_models._models, "gpt5", model)
+
+
+def _single_node_graph(name, node):
+    graph = StateGraph(State)
+    graph.add_node(name, node)
+    graph.add_edge(START, name)
+    graph.add_edge(name, END)
+    return graph.compile()
+
+
+def _answer_graph(node):
+    return _single_node_graph("answer_question", node)
+
+
+def test_answer_question_streams_tokens_and_file(tmp_path, monkeypatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    _fake_kimi(monkeypatch)
+
+    events = list(_answer_graph(answer_question).stream(
+        {"user_task": "What is the answer?", "context": ""}, stream_mode=["custom", "values"]))
+
+    tokens = [payload["token"] for mode, payload in events if mode == "custom"]
+    assert len(tokens) > 1
+    assert "".join(tokens) == "The answer is 42."
+    assert events[-1][1]["answer"] == "The answer is 42."
+    assert (tmp_path / "answer.md").read_text() == "The answer is 42."
+
+
+def test_answer_question_async_streams_tokens(tmp_path, monkeypatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    _fake_kimi(monkeypatch)
+
+    async def collect():
+        graph = _answer_graph(answer_question_async)
+        return [chunk async for chunk in graph.astream(
+            {"user_task": "What is the answer?", "context": ""}, stream_mode="custom")]
+
+    chunks = asyncio.run(collect())
+
+    assert {chunk["node"] for chunk in chunks} == {"answer_question"}
+    assert "".join(chunk["token"] for chunk in chunks) == "The answer is 42."
+    assert (tmp_path / "answer.md").read_text() == "The answer is 42."
+
+
+def test_answer_question_outside_a_graph(tmp_path, monkeypatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    _fake_kimi(monkeypatch)
+
+    result = answer_question({"user_task": "What is the answer?", "context": ""})
+
+    assert result["answer"] == "The answer is 42."
+
+
+PLAN_STATE = {"user_task": "Add a flag", "context": "", "project_structure": "", "agent_metadata": ""}
+
+
+def test_make_plan_streams_tokens_and_file(tmp_path, monkeypatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    _fake_gpt5(monkeypatch)
+
+    events = list(_single_node_graph("make_plan", make_plan).stream(PLAN_STATE, stream_mode=["custom", "values"]))
+
+    tokens = [payload["token"] for mode, payload in events if mode == "custom"]
+    assert len(tokens) > 1
+    assert "".join(tokens) == "1. Read the code. 2. Change it."
+    assert events[-1][1]["plan"] == "1. Read the code. 2. Change it."
+    assert (tmp_path / "example.md").read_text() == "1. Read the code. 2. Change it."
+
+
+def test_make_plan_async_writes_off_the_event_loop(tmp_path, monkeypatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    _fake_gpt5(monkeypatch)
+    # One write per token unless the batching works.
+    monkeypatch.setattr(graph_nodes, "STREAM_FILE_BATCH_SECONDS", 60)
+    writes = []
+    original_write = graph_nodes._write_and_flush
+
+    def record_write(output_file, text):
+        writes.append((threading.current_thread(), text))
+        original_write(output_file, text)
+
+    monkeypatch.setattr(graph_nodes, "_write_and_flush", record_write)
+
+    async def collect():
+        loop_thread = threading.current_thread()
+        chunks = [chunk async for chunk in _single_node_graph("make_plan", make_plan_async).astream(
+            PLAN_STATE, stream_mode="custom")]
+        return loop_thread, chunks
+
+    loop_thread, chunks = asyncio.run(collect())
+
+    assert len(chunks) > 1
+    assert "".join(chunk["token"] for chunk in chunks) == "1. Read the code. 2. Change it."
+    assert [text for _, text in writes] == ["1. Read the code. 2. Change it."]
+    assert all(thread is not loop_thread for thread, _ in writes)
+    assert (tmp_path / "example.md").read_text() == "1. Read the code. 2. Change it."
@@ -0,0 +1,76 @@
+import threading
+import time
+
+from langchain_core.tools import tool
+
+from agent.tools.tool_executor import execute_tool_calls
+
+events = []
+events_lock = threading.Lock()
+
+
+def _record(name: str, file_path: str) -> str:
+    with events_lock:
+        events.append(("start", name, file_path))
+    time.sleep(0.05)
+    with events_lock:
+        events.append(("end", name, file_path))
+    return f"{name}:{file_path}"
+
+
+@tool
+def view_file(file_path: str) -> str:
+    """Fake read."""
+    return _record("view_file", file_path)
+
+
+@tool
+def create_file(file_path: str, file_text: str) -> str:
+    """Fake write."""
+    return _record("create_file", file_path)
+
+
+@tool
+def run_bash_command(command: str) -> str:
+    """Fake shell."""
+    return _record("run_bash_command", command)
+
+
+tools_by_name = {t.name: t for t in (view_file, create_file, run_bash_command)}
+
+
+def _call(index, name, **args):
+    return {"name": name, "args": args, "id": f"call_{index}", "type": "tool_call"}
+
+
+def test_results_keep_order_and_reads_overlap() -> None:
+    events.clear()
+    calls = [_call(index, "view_file", file_path=f"/tmp/file_{index}") for index in range(4)]
+
+    start = time.perf_counter()
+    messages = execute_tool_calls(calls, tools_by_name)
+    elapsed = time.perf_counter() - start
+
+    assert [message.tool_call_id for message in messages] == [call["id"] for call in calls]
+    assert [message.content for message in messages] == [f"view_file:/tmp/file_{index}" for index in range(4)]
+    assert all("duration_seconds" in message.response_metadata for message in messages)
+    assert elapsed < 0.15
+
+
+def test_same_path_and_shell_calls_are_serialized() -> None:
+    events.clear()
+    calls = [
+        _call(0, "create_file", file_path="/tmp/a", file_text="1"),
+        _call(1, "view_file", file_path="/tmp/a"),
+        _call(2, "run_bash_command", command="ls"),
+        _call(3, "view_file", file_path="/tmp/b"),
+    ]
+    execute_tool_calls(calls, tools_by_name)
+
+    order = [(kind, name) for kind, name, _ in events]
+    assert order == [
+        ("start", "create_file"), ("end", "create_file"),
+        ("start", "view_file"), ("end", "view_file"),
+        ("start", "run_bash_command"), ("end", "run_bash_command"),
+        ("start", "view_file"), ("end", "view_file"),
+    ]
@@ -0,0 +1,84 @@
+import os
+
+from agent.tools import tree_cache
+from agent.tools.file_utils import get_project_structure_as_string
+from agent.tools.tree_cache import ProjectTreeSnapshot, clear_tree_snapshots, get_tree_snapshot
+
+
+def _make_project(root):
+    (root / "src").mkdir()
+    (root / "src" / "main.py").write_text("print('hi')\n")
+    (root / "src" / "util.py").write_text("")
+    (root / "node_modules").mkdir()
+    (root / "node_modules" / "dep.js").write_text("")
+    (root / "README.md").write_text("# readme\n")
+
+
+def test_renders_tree_like_os_walk(tmp_path) -> None:
+    clear_tree_snapshots()
+    _make_project(tmp_path)
+
+    assert get_project_structure_as_string(str(tmp_path)) == "\n".join([
+        f"└── {tmp_path}/",
+        "├── src/",
+        "│   ├── main.py",
+        "│   └── util.py",
+        "└── README.md",
+    ])
+
+
+def test_rescans_only_changed_directories(tmp_path) -> None:
+    clear_tree_snapshots()
+    _make_project(tmp_path)
+    first = get_project_structure_as_string(str(tmp_path))
+
+    snapshot = get_tree_snapshot(str(tmp_path), {"node_modules"})
+    snapshot.render()
+    src_node = snapshot._root.subdirs["src"]
+    cached_src = src_node.rendered
+
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs" / "guide.md").write_text("")
+    # Make sure the mtime changes even on filesystems with coarse timestamps.
+    stat = os.stat(tmp_path)
+    os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    rendered = snapshot.render()
+    assert "├── docs/\n│   └── guide.md" in rendered
+    assert src_node.rendered is cached_src
+    assert "docs/" in get_project_structure_as_string(str(tmp_path))
+    assert "docs/" not in first
+
+
+def test_refresh_directories_reports_only_changed_directories(tmp_path) -> None:
+    _make_project(tmp_path)
+    (tmp_path / "src" / "pkg").mkdir()
+    snapshot = ProjectTreeSnapshot(str(tmp_path), {"node_modules"})
+    snapshot.refresh()
+    assert snapshot.refresh_directories() == []
+
+    (tmp_path / "src" / "pkg" / "new.py").write_text("")
+    (tmp_path / "src" / "main.py").write_text("print('changed')\n")
+    (tmp_path / "node_modules" / "other.js").write_text("")
+    assert snapshot.refresh_directories() == [str(tmp_path / "src" / "pkg")]
+
+    assert snapshot.is_ignored(str(tmp_path / "node_modules" / "other.js"))
+    assert not snapshot.is_ignored(str(tmp_path / "src" / "pkg" / "new.py"))
+    assert snapshot.is_ignored(str(tmp_path.parent))
+
+
+def test_registry_evicts_least_recently_used_unwatched_snapshots(tmp_path, monkeypatch) -> None:
+    clear_tree_snapshots()
+    monkeypatch.setattr(tree_cache, "DEFAULT_MAX_SNAPSHOTS", 2)
+    roots = [str(tmp_path / name) for name in ("a", "b", "c", "d")]
+
+    watched = get_tree_snapshot(roots[0], set())
+    watched.watched = True
+    first = get_tree_snapshot(roots[1], set())
+    get_tree_snapshot(roots[2], set())
+    assert get_tree_snapshot(roots[1], set()) is first
+    get_tree_snapshot(roots[3], set())
+
+    assert [key[0] for key in tree_cache._snapshots] == [roots[0], roots[1], roots[3]]
+    assert get_tree_snapshot(roots[0], set()) is watched
+    clear_tree_snapshots()